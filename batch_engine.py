@@ -0,0 +1,194 @@
+import numpy as np
+
+from domino import Direction, START_HAND_SIZE
+from domino_tables import get_num_doms, nums_table
+
+NORTH, EAST, SOUTH, WEST = (d.value for d in Direction)
+
+
+class BatchGame:
+    # Runs num_games independent All Fives games in lockstep. Every call to step() is one ply for every unfinished
+    # round, mirroring a single call to Game.take_turn (play, draw or forced pass).
+    # Actions are dom_id * 4 + Direction.value, with one extra draw action at the end. Domino ids follow Domino.get_id.
+    def __init__(self, num_games: int, max_num: int, score_to_win: int, num_players: int, seed: int = None):
+        assert num_players * START_HAND_SIZE <= get_num_doms(max_num)
+        self.num_games, self.max_num, self.score_to_win, self.num_players = num_games, max_num, score_to_win, num_players
+        self.rng = np.random.default_rng(seed)
+        self.num_doms = get_num_doms(max_num)
+        self.num_actions = self.num_doms * len(Direction) + 1
+        self.draw_action = self.num_actions - 1
+        self.__init_tables()
+
+        self.scores = np.zeros((num_games, num_players), dtype=np.int64)
+        self.current_turn = self.rng.integers(0, num_players, size=num_games)
+        self.last_played = np.full(num_games, -1)
+        self.winner = np.full(num_games, -1)
+
+        self.hands = np.zeros((num_games, num_players, self.num_doms), dtype=bool)
+        self.deck = np.zeros((num_games, self.num_doms), dtype=np.int64)
+        self.deck_pos = np.zeros(num_games, dtype=np.int64)
+        self.spinner = np.full(num_games, -1)
+        self.ends = np.full((num_games, len(Direction)), -1)  # Out facing number of each arm, -1 if the arm is empty
+        self.end_double = np.zeros((num_games, len(Direction)), dtype=bool)
+        self.num_played = np.zeros(num_games, dtype=np.int64)
+        self.played = np.zeros((num_games, self.num_doms), dtype=bool)
+        self.round_over = np.ones(num_games, dtype=bool)
+        self.new_round()
+
+    def __init_tables(self):
+        self.num_a, self.num_b = np.array(nums_table(self.max_num), dtype=np.int64).T
+        self.is_double = self.num_a == self.num_b
+        self.pip_sum = self.num_a + self.num_b
+        # has_num[n, id] is True if domino id shows the number n. The extra last row stands in for a closed end
+        self.has_num = np.zeros((self.max_num + 2, self.num_doms), dtype=bool)
+        self.has_num[self.num_a, np.arange(self.num_doms)] = True
+        self.has_num[self.num_b, np.arange(self.num_doms)] = True
+
+    @property
+    def pile_size(self) -> np.ndarray:
+        return self.num_doms - self.deck_pos
+
+    @property
+    def match_over(self) -> np.ndarray:
+        return self.winner != -1
+
+    def new_round(self, mask: np.ndarray = None, decks: np.ndarray = None):
+        # Deals a new round for every game in mask. decks optionally fixes the draw order, one row per dealt game
+        games = np.arange(self.num_games) if mask is None else np.flatnonzero(mask)
+        if decks is None:
+            decks = np.argsort(self.rng.random((len(games), self.num_doms)), axis=1)
+        dealt = self.num_players * START_HAND_SIZE
+        self.deck[games] = decks
+        self.deck_pos[games] = dealt
+        self.hands[games] = False
+        seats = np.repeat(np.arange(self.num_players), START_HAND_SIZE)
+        self.hands[games[:, None], seats[None, :], self.deck[games, :dealt]] = True
+        self.spinner[games] = -1
+        self.ends[games] = -1
+        self.end_double[games] = False
+        self.num_played[games] = 0
+        self.played[games] = False
+        self.round_over[games] = False
+
+    def new_match(self, mask: np.ndarray = None):
+        games = np.arange(self.num_games) if mask is None else np.flatnonzero(mask)
+        self.scores[games] = 0
+        self.winner[games] = -1
+        self.last_played[games] = -1
+        self.current_turn[games] = self.rng.integers(0, self.num_players, size=len(games))
+        self.new_round(np.isin(np.arange(self.num_games), games))
+
+    def get_open_numbers(self) -> np.ndarray:
+        # Number playable in each direction, -1 where nothing can be played. Matches Board.get_out_facing_numbers
+        has_spinner = self.spinner != -1
+        opens = np.where(has_spinner[:, None] & (self.ends == -1), self.spinner[:, None], self.ends)
+        arms_ready = has_spinner & (self.ends[:, NORTH] != -1) & (self.ends[:, SOUTH] != -1)
+        opens[~arms_ready, EAST] = -1
+        opens[~arms_ready, WEST] = -1
+        return opens
+
+    def get_board_sums(self) -> np.ndarray:
+        # Same semantics as Board.get_board_sum
+        occupied = self.ends != -1
+        arm_sum = np.where(occupied, self.ends * (1 + self.end_double), 0).sum(axis=1)
+        spinner_exposed = (self.spinner != -1) & ~(occupied[:, NORTH] & occupied[:, SOUTH])
+        return arm_sum + np.where(spinner_exposed, 2 * self.spinner, 0)
+
+    def legal_actions(self) -> np.ndarray:
+        games = np.arange(self.num_games)
+        hand = self.hands[games, self.current_turn]
+        opens = self.get_open_numbers()
+        plays = self.has_num[np.where(opens == -1, self.max_num + 1, opens)] & hand[:, None, :]
+        empty = self.num_played == 0
+        plays[empty, NORTH] = hand[empty]  # The first domino is always played north, as RandomPlayer does
+        legal = np.zeros((self.num_games, self.num_actions), dtype=bool)
+        legal[:, :-1] = plays.transpose(0, 2, 1).reshape(self.num_games, -1)
+        legal[:, -1] = self.pile_size > 0
+        legal[self.round_over] = False
+        return legal
+
+    def random_actions(self) -> np.ndarray:
+        legal = self.legal_actions()
+        return np.argmax(self.rng.random(legal.shape) * legal, axis=1)
+
+    def step(self, actions: np.ndarray, mask: np.ndarray = None) -> np.ndarray:
+        # Actions are ignored for finished rounds and for players that have to pass. mask optionally limits the ply to
+        # some games, the others keep waiting. Returns round_over
+        actions = np.asarray(actions)
+        legal = self.legal_actions()
+        active = ~self.round_over if mask is None else ~self.round_over & mask
+        passing = active & ~legal.any(axis=1)
+        moving = np.flatnonzero(active & ~passing)
+        if not legal[moving, actions[moving]].all():
+            raise ValueError("Illegal action")
+        drawing = actions[moving] == self.draw_action
+        self.__pass(np.flatnonzero(passing))
+        self.__draw(moving[drawing])
+        self.__play(moving[~drawing], actions[moving[~drawing]])
+        return self.round_over.copy()
+
+    def __pass(self, games: np.ndarray):
+        seats = self.current_turn[games]
+        self.current_turn[games] = (seats + 1) % self.num_players
+        self.round_over[games[self.last_played[games] == seats]] = True  # Full cycle of lock
+
+    def __draw(self, games: np.ndarray):
+        self.hands[games, self.current_turn[games], self.deck[games, self.deck_pos[games]]] = True
+        self.deck_pos[games] += 1
+
+    def __play(self, games: np.ndarray, actions: np.ndarray):
+        dom, direction = actions // len(Direction), actions % len(Direction)
+        seats = self.current_turn[games]
+        opens = self.get_open_numbers()[games, direction]
+        double = self.is_double[dom]
+        first = self.num_played[games] == 0
+        line = ~first & (self.spinner[games] == -1)
+        self.hands[games, seats, dom] = False
+
+        # First domino: doubles become the spinner, anything else starts the north/south line
+        new_spinner = first & double
+        self.spinner[games[new_spinner]] = self.num_a[dom[new_spinner]]
+        starts_line = games[first & ~double]
+        self.ends[starts_line, NORTH] = self.num_b[dom[first & ~double]]
+        self.ends[starts_line, SOUTH] = self.num_a[dom[first & ~double]]
+
+        # First double on the line becomes the spinner, the line becomes the arm on the opposite side
+        to_spinner = line & double
+        self.spinner[games[to_spinner]] = opens[to_spinner]
+        self.ends[games[to_spinner], direction[to_spinner]] = -1
+
+        extends = ~first & ~to_spinner
+        self.ends[games[extends], direction[extends]] = self.pip_sum[dom[extends]] - opens[extends]
+        self.end_double[games[extends], direction[extends]] = double[extends]
+
+        self.num_played[games] += 1
+        self.played[games, dom] = True
+        self.last_played[games] = seats
+        board_sums = self.get_board_sums()[games]
+        self.scores[games, seats] += np.where(board_sums % 5 == 0, board_sums, 0)
+
+        domino = ~self.hands[games, seats].any(axis=1)
+        hand_sums = (self.hands[games[domino]] * self.pip_sum).sum(axis=2)
+        self.scores[games[domino], seats[domino]] += ((hand_sums + 2) // 5 * 5).sum(axis=1)  # Rounds each hand to the nearest 5
+        self.round_over[games[domino]] = True
+        self.current_turn[games[~domino]] = (seats[~domino] + 1) % self.num_players
+
+        reached = self.scores[games] >= self.score_to_win
+        won = reached.any(axis=1)
+        self.winner[games[won]] = np.argmax(reached[won], axis=1)
+        self.round_over[games[won]] = True
+
+    def play_random_rounds(self) -> int:
+        # Plays every unfinished round to the end with uniformly random legal actions. Returns the number of plies
+        plies = 0
+        while not self.round_over.all():
+            plies += int((~self.round_over).sum())
+            self.step(self.random_actions())
+        return plies
+
+    def play_random_matches(self) -> int:
+        plies = self.play_random_rounds()
+        while not self.match_over.all():
+            self.new_round(~self.match_over)
+            plies += self.play_random_rounds()
+        return plies
@@ -0,0 +1,169 @@
+import math
+import random
+from functools import lru_cache
+
+import numpy as np
+
+from domino import Board, Direction, DIRECTIONS, Domino, Game
+from domino_tables import get_num_doms, nums_table, num_mask_table
+
+
+@lru_cache(maxsize=None)
+def _choose(n: int, k: int) -> int:
+    return math.factorial(n) // (math.factorial(k) * math.factorial(n - k))
+
+
+class BeliefTracker(Game.Observer):
+    # What player_num can know about the hidden dominoes, kept up to date from game events. Subscribe it to the game.
+    # possible[seat] is a bitmask over dom ids of the dominoes seat may hold (the last entry is the pile), voids[seat]
+    # a bitmask of the numbers seat is known to lack since its last draw. A pass means the passer holds none of the open numbers; with
+    # draw_means_void a draw means the same for the hand held before drawing (only sound for players that draw only
+    # when they can't play, which Game does not enforce). Every event costs O(open ends + players) bit operations;
+    # get_probabilities and sample_hands count the deals that fit the masks and the public hand sizes on demand
+    def __init__(self, player_num: int, draw_means_void: bool = False):
+        self.player_num, self.draw_means_void = player_num, draw_means_void
+        self.possible, self.voids, self.sizes, self.played = None, None, None, 0
+        self.probabilities = None  # Cached until the next event
+
+    def on_game_start(self, game: Game):
+        self.max_num = game.max_num
+        self.num_masks = num_mask_table(game.max_num)
+        hands = [game.hands[player] for player in game.players]
+        own = sum(1 << dom.get_id() for dom in hands[self.player_num])
+        unseen = (1 << get_num_doms(game.max_num)) - 1 & ~own
+        self.possible = [unseen] * len(hands) + [unseen]
+        self.possible[self.player_num] = own
+        self.voids = [0] * len(hands)
+        self.sizes = [len(hand) for hand in hands] + [len(game.pile)]
+        self.played = 0
+        self.probabilities = None
+
+    def on_play(self, game: Game, player_num: int, dom: Domino, direction: Direction):
+        bit = 1 << dom.get_id()
+        for i in range(len(self.possible)):
+            self.possible[i] &= ~bit
+        self.played |= bit
+        self.sizes[player_num] -= 1
+        self.probabilities = None
+
+    def on_draw(self, game: Game, player_num: int):
+        if self.draw_means_void and player_num != self.player_num:
+            self.__mark_void(game.board, player_num)
+        self.sizes[player_num] += 1
+        self.sizes[-1] -= 1
+        if player_num == self.player_num:  # Our own draw is seen
+            bit = 1 << game.hands[game.players[player_num]][-1].get_id()
+            for i in range(len(self.possible)):
+                self.possible[i] &= ~bit
+            self.possible[player_num] |= bit
+        else:  # Whatever the pile may hold, the drawer may now hold, so no number is known to be missing any more
+            self.possible[player_num] |= self.possible[-1]
+            self.voids[player_num] = 0
+        self.probabilities = None
+
+    def on_pass(self, game: Game, player_num: int):
+        if player_num != self.player_num:
+            self.__mark_void(game.board, player_num)
+            self.probabilities = None
+
+    def __mark_void(self, board: Board, player_num: int):
+        for direction in DIRECTIONS:
+            number = board.get_open_number(direction)
+            if number != -1:
+                self.voids[player_num] |= 1 << number
+                self.possible[player_num] &= ~self.num_masks[number]
+
+    def get_probabilities(self) -> np.ndarray:
+        # (players + 1, dom ids) chance that each seat (last row: the pile) holds each domino, over all deals of the
+        # unseen dominoes that fit the possible masks and the hand sizes, each deal equally likely. Our own row is exact
+        if self.probabilities is None:
+            self.__count_deals()
+        return self.probabilities
+
+    def sample_hands(self, rng: random.Random) -> (list, list):
+        # A deal of the unseen dominoes drawn uniformly from those get_probabilities counts: (hands as lists of Domino
+        # per seat, our own included, and the pile)
+        if self.probabilities is None:
+            self.__count_deals()
+        table = nums_table(self.max_num)
+        output = [[] for _ in range(len(self.possible))]
+        for dom_id in range(len(table)):
+            if self.possible[self.player_num] >> dom_id & 1:
+                output[self.player_num].append(Domino(*table[dom_id], self.max_num))
+        space = self.start
+        for g in range(len(self.groups)):
+            ids = self.groups[g][1]
+            choices = [(split, weight * self.__ways(g + 1, after)) for split, weight, after in self.__splits(g, space)]
+            split = rng.choices([choice[0] for choice in choices], [choice[1] for choice in choices])[0]
+            ids = list(ids)
+            rng.shuffle(ids)
+            position = 0
+            for i in range(len(self.rows)):
+                for dom_id in ids[position:position + split[i]]:
+                    output[self.rows[i]].append(Domino(*table[dom_id], self.max_num))
+                position += split[i]
+            space = tuple(space[i] - split[i] for i in range(len(space)))
+        return output[:-1], output[-1]
+
+    def __count_deals(self):
+        # Unseen dominoes that may go to the same rows are interchangeable, so deals are counted per such group: how
+        # many of the group each opponent gets, the pile taking the rest. ways(g, space) counts the deals of groups g..
+        # given the space the opponents have left. If the masks admit no deal at all (a player drew with a playable
+        # domino under draw_means_void), the masks are dropped
+        self.rows = [i for i in range(len(self.possible)) if i != self.player_num]
+        seen = self.possible[self.player_num]
+        unseen = [i for i in range(get_num_doms(self.max_num)) if not (seen | self.played) >> i & 1]
+        self.start = tuple(self.sizes[row] for row in self.rows[:-1])
+        for relaxed in (False, True):
+            groups = {}
+            for dom_id in unseen:
+                allowed = sum(1 << j for j in range(len(self.rows))
+                              if relaxed or self.possible[self.rows[j]] >> dom_id & 1)
+                groups.setdefault(allowed, []).append(dom_id)
+            self.groups = list(groups.items())
+            self.ways = {}
+            if self.__ways(0, self.start) > 0:
+                break
+        total = self.__ways(0, self.start)
+        probabilities = np.zeros((len(self.possible), get_num_doms(self.max_num)))
+        forward = {self.start: 1.0}
+        for g in range(len(self.groups)):
+            ids = self.groups[g][1]
+            expected = [0.0] * len(self.rows)  # Expected number of the group each row gets, times total
+            following = {}
+            for space, before in forward.items():
+                for split, weight, after in self.__splits(g, space):
+                    ways = before * weight
+                    rest = self.__ways(g + 1, after)
+                    if rest > 0:
+                        for i in range(len(split)):
+                            expected[i] += ways * rest * split[i]
+                        following[after] = following.get(after, 0.0) + ways
+            forward = following
+            for i in range(len(self.rows)):
+                probabilities[self.rows[i], ids] = expected[i] / (total * len(ids))
+        for i in range(probabilities.shape[1]):
+            probabilities[self.player_num, i] = seen >> i & 1
+        self.probabilities = probabilities
+
+    def __ways(self, g: int, space: tuple) -> float:
+        if g == len(self.groups):
+            return 1.0 if not any(space) else 0.0
+        key = (g, space)
+        if key not in self.ways:
+            self.ways[key] = sum(weight * self.__ways(g + 1, after) for _, weight, after in self.__splits(g, space))
+        return self.ways[key]
+
+    def __splits(self, g: int, space: tuple) -> list:
+        # (count per row with the pile last, number of ways to pick them, opponents' space left) for every way to
+        # share out group g
+        allowed, ids = self.groups[g]
+        size = len(ids)
+        splits = [((), 1, size)]  # (counts so far, ways, dominoes left)
+        for i in range(len(space)):
+            top = min(space[i], size) if allowed >> i & 1 else 0
+            splits = [(counts + (n,), ways * _choose(left, n), left - n)
+                      for counts, ways, left in splits for n in range(min(top, left) + 1)]
+        pile = len(space)
+        return [(counts + (left,), ways, tuple(space[i] - counts[i] for i in range(len(space))))
+                for counts, ways, left in splits if left == 0 or allowed >> pile & 1]
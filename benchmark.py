@@ -0,0 +1,288 @@
+import os
+import random
+import threading
+import time
+
+import numpy as np
+
+from batch_engine import BatchGame
+from benchmark_suite import time_per_call
+from domino import CompactBoard, Direction, Domino, Game, RandomPlayer, START_HAND_SIZE
+from domino_tables import get_num_doms, nums_table
+from encoder import ObservationEncoder
+from endgame import EndgamePlayer
+from env import AsyncVectorEnv, VectorEnv
+from inference import InferenceServer
+from model import Model
+from profiler import Profiler
+from self_play import SelfPlay
+
+
+def benchmark_batch_engine(num_games: int = 4096, max_num: int = 6, num_players: int = 4, scalar_rounds: int = 200):
+    # Rounds per second of the scalar Game with RandomPlayers against BatchGame with random legal actions
+    game = Game(max_num, 10 ** 9, [RandomPlayer(seed=seat) for seat in range(num_players)], seed=0)
+    start = time.perf_counter()
+    for _ in range(scalar_rounds):
+        game.play_game()
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = BatchGame(num_games, max_num, 10 ** 9, num_players, seed=0)
+    plies = batch.play_random_rounds()
+    batch_time = time.perf_counter() - start
+
+    scalar_rate, batch_rate = scalar_rounds / scalar_time, num_games / batch_time
+    print(f"Scalar Game: {scalar_rate:.0f} rounds/s")
+    print(f"BatchGame:   {batch_rate:.0f} rounds/s, {plies / batch_time:.0f} plies/s ({num_games} games)")
+    print(f"Speedup:     {batch_rate / scalar_rate:.1f}x")
+
+
+# Loop based versions of Domino.get_id, Domino.id_to_nums and Domino.check_match from before the lookup tables
+def _loop_get_id(dom: Domino) -> int:
+    dom_id = 0
+    for i in range(dom.num_a):
+        dom_id += dom.num_max - i + 1
+    return dom_id + dom.num_max - dom.num_b
+
+
+def _loop_id_to_nums(domino_id: int, num_max: int) -> (int, int):
+    id_max = get_num_doms(num_max) - 1
+    i = 0
+    while domino_id < id_max - i:
+        id_max -= i + 1
+        i += 1
+    return num_max - i, domino_id - id_max + num_max
+
+
+def _loop_check_match(dom: Domino, other: Domino) -> (int, int):
+    if dom.is_double():
+        if dom.num_a == other.num_a:
+            return 0, 1
+        if dom.num_a == other.num_b:
+            return 0, -1
+    if other.is_double():
+        if dom.num_a == other.num_a:
+            return -1, 0
+        if dom.num_b == other.num_a:
+            return 1, 0
+    if dom.num_b == other.num_a:
+        return 1, 1
+    elif dom.num_b == other.num_b:
+        return 1, -1
+    elif dom.num_a == other.num_a:
+        return -1, 1
+    elif dom.num_a == other.num_b:
+        return -1, -1
+    return None
+
+
+def benchmark_domino_tables(max_nums: tuple = (6, 9, 12, 15), repeats: int = 20):
+    # Nanoseconds per call of the loop based domino functions against the lookup tables
+    print(f"{'max_num':>8} {'function':>12} {'loop ns':>9} {'table ns':>9} {'speedup':>8}")
+    for max_num in max_nums:
+        doms = [Domino(num_a, num_b, max_num) for num_a, num_b in nums_table(max_num)] * repeats
+        pairs = [(dom, other) for dom, other in zip(doms, reversed(doms))]
+        ids = [(dom_id, max_num) for dom_id in range(get_num_doms(max_num))] * repeats
+        Domino.id_to_nums(0, max_num), doms[0].get_id(), doms[0].check_match(doms[1])  # Build the tables up front
+        for name, loop, table, args in (
+                ("get_id", _loop_get_id, Domino.get_id, [(dom,) for dom in doms]),
+                ("id_to_nums", _loop_id_to_nums, Domino.id_to_nums, ids),
+                ("check_match", _loop_check_match, Domino.check_match, pairs)):
+            loop_ns, table_ns = time_per_call(loop, args), time_per_call(table, args)
+            print(f"{max_num:>8} {name:>12} {loop_ns:>9.0f} {table_ns:>9.0f} {loop_ns / table_ns:>7.1f}x")
+
+
+def _trial_legal_moves(hand: list, board: CompactBoard) -> list:
+    # Finds legal moves the way Game.take_turn used to, by attempting plays and catching the failures
+    moves = []
+    for direction in Direction:
+        for i in range(len(hand)):
+            try:
+                board.play_domino(hand[i], direction)
+            except AssertionError:
+                continue
+            board.undo()
+            moves.append((i, direction))
+    return moves
+
+
+def _random_positions(num_positions: int, max_num: int = 6, seed: int = 0) -> list:
+    # (hand, board) pairs from random legal play, with a random hand of unplayed dominoes
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < num_positions:
+        pile = [Domino(num_a, num_b, max_num) for num_a, num_b in nums_table(max_num)]
+        rng.shuffle(pile)
+        board = CompactBoard()
+        while len(pile) > START_HAND_SIZE:
+            hand = pile[-START_HAND_SIZE:]
+            positions.append((hand, board.to_board()))
+            moves = Game.legal_moves(pile, board)
+            if len(moves) == 0:
+                break
+            dom_index, direction = rng.choice(moves)
+            board.play_domino(pile.pop(dom_index), direction)
+    return positions[:num_positions]
+
+
+def benchmark_legal_moves(num_positions: int = 2000):
+    positions = _random_positions(num_positions)
+    compact_positions = [(hand, board.to_compact()) for hand, board in positions]
+    trial_ns = time_per_call(_trial_legal_moves, compact_positions)
+    legal_ns = time_per_call(Game.legal_moves, positions)
+    print(f"Trial and error: {trial_ns:.0f} ns/position")
+    print(f"Game.legal_moves: {legal_ns:.0f} ns/position ({trial_ns / legal_ns:.1f}x)")
+
+
+def benchmark_self_play(num_matches: int = 64, num_players: int = 4):
+    # Match throughput of SelfPlay with a growing number of worker processes
+    process_counts = sorted({1, 2, 4, os.cpu_count()})
+    for processes in process_counts:
+        runner = SelfPlay([RandomPlayer] * num_players, processes=processes)
+        for _ in runner.play(num_matches):
+            pass
+        rates = runner.get_worker_rates().values()
+        print(f"{processes:>3} processes: {runner.get_total_rate():.1f} matches/s, "
+              f"{sum(rates) / len(rates):.1f} matches/s per worker")
+
+
+def benchmark_inference(num_requests: int = 4096, threads: int = 64, max_num: int = 6):
+    # Evaluations per second one observation at a time versus micro-batched by an InferenceServer fed by many threads
+    encoder = ObservationEncoder(max_num)
+    model = Model(encoder.size, get_num_doms(max_num) * len(Direction) + 1, seed=0)
+    observations = [encoder.allocate() + i % 7 for i in range(num_requests)]
+    server = InferenceServer(model, cache_size=0)
+    start = time.perf_counter()
+    for observation in observations:
+        server.evaluate(observation)
+    single_rate = num_requests / (time.perf_counter() - start)
+
+    server = InferenceServer(model, cache_size=0)
+
+    def evaluate(part: list):
+        for observation in part:
+            server.evaluate(observation)
+
+    workers = [threading.Thread(target=evaluate, args=(observations[t::threads],)) for t in range(threads)]
+    start = time.perf_counter()
+    with server:
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    batched_rate = num_requests / (time.perf_counter() - start)
+    print(f"One at a time: {single_rate:.0f} evaluations/s")
+    print(f"Micro-batched: {batched_rate:.0f} evaluations/s ({batched_rate / single_rate:.1f}x, {threads} threads)")
+    print(server.summary())
+
+    stacked = np.stack(observations)
+    server = InferenceServer(model, cache_size=0)
+    start = time.perf_counter()
+    for i in range(0, num_requests, server.max_batch_size):
+        server.evaluate_batch(stacked[i:i + server.max_batch_size])
+    stacked_rate = num_requests / (time.perf_counter() - start)
+    print(f"evaluate_batch: {stacked_rate:.0f} evaluations/s ({stacked_rate / single_rate:.1f}x)")
+
+
+def _deal_by_random_index(pile: list, rng: random.Random):
+    while len(pile) != 0:
+        pile.pop(rng.randrange(len(pile)))
+
+
+def _deal_from_shuffled_deck(pile: list, rng: random.Random):
+    rng.shuffle(pile)
+    while len(pile) != 0:
+        pile.pop()
+
+
+def _play_seeded_matches(num_matches: int, num_players: int) -> list:
+    results = []
+    for seed in range(num_matches):
+        players = [RandomPlayer(seed=seed * num_players + seat) for seat in range(num_players)]
+        game = Game(6, 150, players, seed=seed)
+        game.play_match()
+        results.append((game.history, [game.scores[player] for player in players]))
+    return results
+
+
+def benchmark_seeded_games(num_matches: int = 100, num_players: int = 4, repeats: int = 200):
+    # Regression check for Game's own RNG: emptying a pile by list.pop(random index), as Game used to draw, against
+    # popping a shuffled deck, then seeded matches played twice must match move for move
+    rng = random.Random(0)
+    print(f"{'max_num':>8} {'pop(i) us':>10} {'deck us':>9} {'speedup':>8}")
+    for max_num in (6, 9, 12, 15):
+        pile = [Domino(a, b, max_num) for a, b in nums_table(max_num)]
+        timings = []
+        for deal in (_deal_by_random_index, _deal_from_shuffled_deck):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                deal(list(pile), rng)
+            timings.append((time.perf_counter() - start) / repeats * 1e6)
+        print(f"{max_num:>8} {timings[0]:>10.1f} {timings[1]:>9.1f} {timings[0] / timings[1]:>7.1f}x")
+    start = time.perf_counter()
+    first = _play_seeded_matches(num_matches, num_players)
+    seconds = time.perf_counter() - start
+    reproducible = first == _play_seeded_matches(num_matches, num_players)
+    print(f"Seeded matches: {num_matches / seconds:.1f} matches/s, reproducible: {'yes' if reproducible else 'NO'}")
+    return reproducible
+
+
+def benchmark_profiler(rounds: int = 300, num_players: int = 4, folded_path: str = None):
+    # Cost of Game's profiling hooks: rounds per second without and with a Profiler, then the profile itself
+    rates = []
+    for profiler in (None, Profiler()):
+        game = Game(6, 10 ** 9, [RandomPlayer(seed=seat) for seat in range(num_players)], seed=0)
+        game.profiler = profiler
+        start = time.perf_counter()
+        for _ in range(rounds):
+            game.play_game()
+        rates.append(rounds / (time.perf_counter() - start))
+    print(f"Profiler off: {rates[0]:.0f} rounds/s, on: {rates[1]:.0f} rounds/s")
+    print(profiler.summary())
+    if folded_path is not None:
+        profiler.write_folded(folded_path)
+
+
+def benchmark_endgame(rounds: int = 40, max_dominoes: int = 12):
+    # Endgame solver speed and memo hit rate over the endgames of rounds against a RandomPlayer, and the points it
+    # gains over random endgame play
+    margin = 0
+    player = EndgamePlayer(max_dominoes=max_dominoes, seed=0)
+    for i in range(rounds):
+        opponent = RandomPlayer(seed=i)
+        game = Game(6, 10 ** 9, [player, opponent] if i % 2 == 0 else [opponent, player], seed=i)
+        game.subscribe(player)
+        game.play_game()
+        margin += game.scores[player] - game.scores[opponent]
+    solver = player.solver
+    print(f"Endgame solver: {solver.nodes} nodes in {solver.seconds:.2f}s, {solver.get_nodes_per_second():.0f} nodes/s, "
+          f"{solver.get_hit_rate():.1%} memo hits, {margin / rounds:+.1f} points/round against random")
+
+
+def benchmark_env(num_envs: int = 1024, steps: int = 200, workers: int = None):
+    # Agent steps per second of VectorEnv in process and of AsyncVectorEnv over worker processes, random agent actions
+    workers = workers if workers is not None else os.cpu_count()
+    rng = np.random.default_rng(0)
+    for name, make_env in (("VectorEnv", lambda: VectorEnv(num_envs, seed=0)),
+                           (f"AsyncVectorEnv ({workers} workers)",
+                            lambda: AsyncVectorEnv(workers, num_envs // workers, seed=0))):
+        env = make_env()  # Built here so AsyncVectorEnv's workers don't start while VectorEnv is timed
+        _, masks = env.reset()
+        start = time.perf_counter()
+        for _ in range(steps):
+            _, masks, _, _, _ = env.step(np.argmax(rng.random(masks.shape) * masks, axis=1))
+        seconds = time.perf_counter() - start
+        env.close()
+        print(f"{name}: {env.num_envs * steps / seconds:.0f} steps/s ({env.num_envs} games)")
+
+
+if __name__ == '__main__':
+    benchmark_batch_engine()
+    benchmark_domino_tables()
+    benchmark_legal_moves()
+    benchmark_self_play()
+    benchmark_inference()
+    benchmark_seeded_games()
+    benchmark_profiler()
+    benchmark_endgame()
+    benchmark_env()
@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from domino import Board, Direction, Domino, Game, RandomPlayer
+from domino_tables import nums_table
+
+MAX_NUMS = (6, 9, 12, 15)
+PLAYER_COUNTS = (2, 3, 4)
+# Metrics where a smaller value is better; every other metric is a rate
+LOWER_IS_BETTER = ("seconds", "bytes", "us", "ns")
+
+
+def best_of(repeats: int, function) -> float:
+    # Fastest of repeats timings of function(), in seconds
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def time_per_call(function, args: list, repeats: int = 1) -> float:
+    # Nanoseconds per call of function(*arg) over every arg in args, the fastest of repeats passes
+    def run():
+        for arg in args:
+            function(*arg)
+
+    return best_of(repeats, run) / len(args) * 1e9
+
+
+def _new_game(max_num: int, num_players: int, seed: int) -> Game:
+    return Game(max_num, 10 ** 9, [RandomPlayer(seed=seed + seat) for seat in range(num_players)], seed=seed)
+
+
+def measure_games(max_num: int, num_players: int, rounds: int, repeats: int, seed: int = 0) -> dict:
+    # Rounds (games) and plies per second of RandomPlayers, the time to set up a game and deal, and the memory a game
+    # holds after a round plus the peak while playing it
+    plies = []
+
+    def play():
+        game = _new_game(max_num, num_players, seed)
+        for _ in range(rounds):
+            game.play_game()
+        plies.append(sum(len(moves) for moves in game.history))
+
+    seconds = best_of(repeats, play)
+
+    def set_up():
+        for i in range(rounds):
+            _new_game(max_num, num_players, seed + i)._Game__init_round()
+
+    setup_seconds = best_of(repeats, set_up)
+
+    tracemalloc.start()
+    game = _new_game(max_num, num_players, seed)
+    game.play_game()
+    game.history.clear()  # History grows with every round played; what is left is the game's own state
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"games_per_second": rounds / seconds, "plies_per_second": plies[-1] / seconds,
+            "setup_us": setup_seconds / rounds * 1e6, "memory_bytes": held, "peak_memory_bytes": peak}
+
+
+def measure_calls(max_num: int, repeats: int, seed: int = 0) -> dict:
+    # Nanoseconds per call of Domino.get_id, Domino.check_match and Board.get_board_sum
+    doms = [Domino(a, b, max_num) for a, b in nums_table(max_num)]
+    pairs = [(doms[i], doms[(i * 7 + seed) % len(doms)]) for i in range(len(doms))]
+    board = Board()  # Spinner with all four arms out
+    board.play_domino(Domino(max_num, max_num, max_num), Direction.NORTH)
+    for direction in (Direction.NORTH, Direction.SOUTH, Direction.EAST, Direction.WEST):
+        board.play_domino(Domino(direction.value, max_num, max_num), direction)
+    loops = 200
+    return {"get_id_ns": time_per_call(Domino.get_id, [(dom,) for dom in doms] * loops, repeats),
+            "check_match_ns": time_per_call(Domino.check_match, pairs * loops, repeats),
+            "get_board_sum_ns": time_per_call(Board.get_board_sum, [(board,)] * (loops * len(doms)), repeats)}
+
+
+def measure_import(repeats: int) -> float:
+    # Seconds for a fresh interpreter to import domino, less a bare interpreter start
+    directory = os.path.dirname(os.path.abspath(__file__))
+
+    def run(code: str):
+        subprocess.run([sys.executable, "-c", code], cwd=directory, check=True, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+
+    return max(best_of(repeats, lambda: run("import domino")) - best_of(repeats, lambda: run("pass")), 0.0)
+
+
+def get_version() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(max_nums: tuple = MAX_NUMS, player_counts: tuple = PLAYER_COUNTS, rounds: int = 100, repeats: int = 3,
+              seed: int = 0) -> dict:
+    # Every measurement, keyed by benchmark name, with what produced it. Seeds are fixed so runs play the same games
+    results = {"import": {"import_seconds": measure_import(repeats)}}
+    for max_num in max_nums:
+        for num_players in player_counts:
+            results[f"game/max_num={max_num}/players={num_players}"] = measure_games(max_num, num_players, rounds,
+                                                                                    repeats, seed)
+        results[f"calls/max_num={max_num}"] = measure_calls(max_num, repeats, seed)
+    return {"version": get_version(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+            "machine": platform.machine(), "settings": {"rounds": rounds, "repeats": repeats, "seed": seed},
+            "results": results}
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1) -> list:
+    # (benchmark, metric, baseline value, current value, relative change) for every metric that got worse by more
+    # than threshold. Benchmarks missing from either run are skipped
+    regressions = []
+    for name, metrics in current["results"].items():
+        for metric, value in metrics.items():
+            old = baseline["results"].get(name, {}).get(metric)
+            if old is None or old == 0:
+                continue
+            change = value / old - 1
+            worse = change > threshold if metric.endswith(LOWER_IS_BETTER) else change < -threshold
+            if worse:
+                regressions.append((name, metric, old, value, change))
+    return regressions
+
+
+def to_string(suite: dict) -> str:
+    rows = [f"{suite['version']} {suite['time']} Python {suite['python']} {suite['machine']}"]
+    for name, metrics in suite["results"].items():
+        rows.append(f"{name:<28} " + "  ".join(f"{metric} {value:.4g}" for metric, value in metrics.items()))
+    return "\n".join(rows)
+
+
+def main(args: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Engine throughput benchmarks, stored as JSON")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown that counts as a regression")
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=3)
+    options = parser.parse_args(args)
+    suite = run_suite(rounds=options.rounds, repeats=options.repeats)
+    print(to_string(suite))
+    if options.output is not None:
+        with open(options.output, "w") as output_file:
+            json.dump(suite, output_file, indent=1)
+    if options.baseline is not None:
+        with open(options.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(baseline, suite, options.threshold)
+        for name, metric, old, new, change in regressions:
+            print(f"Regression: {name} {metric} {old:.4g} -> {new:.4g} ({change:+.0%})")
+        if len(regressions) != 0:
+            return 1
+        print(f"No regressions against {baseline['version']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
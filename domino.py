@@ -2,7 +2,9 @@ import enum
 import random
 from abc import ABC, abstractmethod
 
-random = random.Random()
+from domino_tables import get_num_doms, id_table, id_to_nums_table, match_table, num_mask_table, pair_index
+from zobrist import get_zobrist_keys, hash_ends
+
 START_HAND_SIZE = 7
 
 
@@ -13,56 +15,30 @@ class Direction(enum.Enum):
     WEST = 3
 
 
+DIRECTIONS = tuple(Direction)  # Iterating the enum itself is slow, so hot loops use this instead
+
+
 class Domino:
     def __init__(self, num_a: int, num_b: int, num_max: int):
         self.num_a, self.num_b, self.num_max = num_a, num_b, num_max
+        self.pair = pair_index(num_a, num_b, num_max)
 
     def get_id(self) -> int:
-        i = 0
-        __dom_id = 0
-        while i < self.num_a:
-            __dom_id += self.num_max - i + 1
-            i += 1
-        return __dom_id + self.num_max - self.num_b
+        return id_table(self.num_max)[self.pair]
 
     @staticmethod
     def id_to_nums(domino_id: int, num_max) -> (int, int):
-        assert 0 <= domino_id < ((num_max + 1) * (num_max + 2) / 2) and num_max >= 0
-        id_max = int((num_max + 1) * (num_max + 2) / 2) - 1
-        i = 0
-        while domino_id < id_max - i:
-            id_max -= i + 1
-            i += 1
-        return num_max - i, domino_id - id_max + num_max
+        assert 0 <= domino_id < get_num_doms(num_max) and num_max >= 0
+        return id_to_nums_table(num_max)[domino_id]
 
     def check_match(self, other: "Domino") -> (int,
                                                int):  # Note: Since there is only one copy of every number pair domino, if a_1 matches b_1, it is impossible for a_2 to match b_2 also. Thus only one return will ever be possible.
-        if other is None or not issubclass(type(other), Domino):
+        if not isinstance(other, Domino):
             return None
-
-        if self.is_double():
-            if self.num_a is other.num_a:
-                return 0, 1
-            if self.num_a is other.num_b:
-                return 0, -1
-        if other.is_double():
-            if self.num_a is other.num_a:
-                return -1, 0
-            if self.num_b is other.num_a:
-                return 1, 0
-        if self.num_b is other.num_a:
-            return 1, 1
-        elif self.num_b is other.num_b:
-            return 1, -1
-        elif self.num_a is other.num_a:
-            return -1, 1
-        elif self.num_a is other.num_b:
-            return -1, -1
-        else:
-            return None  # Should not reach here
+        return match_table(self.num_max)[self.pair][other.pair]
 
     def is_double(self) -> bool:
-        return self.num_a is self.num_b
+        return self.num_a == self.num_b
 
 
 class Board:
@@ -96,6 +72,9 @@ class Board:
         self.south = []
         self.east = []
         self.west = []
+        self.keys = None  # Zobrist keys, picked on the first play from the domino set
+        self.played_hash = 0
+        self.hash = 0
 
     def play_domino(self, dom: Domino, direction: Direction):
         assert (self.spinner is not None and (direction is Direction.NORTH or direction is Direction.SOUTH) or (
@@ -142,6 +121,23 @@ class Board:
                 self.__add_dom_to_stack(self.south, dom)
             elif direction is Direction.WEST:
                 self.__add_dom_to_stack(self.west, dom)
+        if self.keys is None:
+            self.keys = get_zobrist_keys(dom.num_max)
+        self.played_hash ^= self.keys.played[dom.get_id()]
+        self.hash = self.played_hash ^ self.__hash_ends()
+
+    def __hash_ends(self) -> int:
+        # Same features as CompactBoard: the spinner and each open end, so both boards hash a position alike
+        if self.spinner is None:
+            return hash_ends(-1, [self.north[-1].get_out_facing_number(), -1, self.north[0].get_in_facing_number(), -1],
+                             (False, False, False, False), self.keys)
+        stacks = (self.north, self.east, self.south, self.west)
+        return hash_ends(self.spinner.num_a, [stack[-1].get_out_facing_number() if len(stack) != 0 else -1 for stack in stacks],
+                         [len(stack) != 0 and stack[-1].is_double() for stack in stacks], self.keys)
+
+    def get_hash(self) -> int:
+        # 64 bit Zobrist hash of the played dominoes and the open ends, 0 for an empty board
+        return self.hash
 
     def __add_dom_to_stack(self, stack: list,
                            dom: Domino):  # Should not be called if no spinner and stack length is more than 0
@@ -195,7 +191,7 @@ class Board:
         north = self.north[-1].get_id() if len(self.north) is not 0 else None
         east = self.east[-1].get_id() if len(self.east) is not 0 else None
         south = self.south[-1].get_id() if len(self.south) is not 0 else self.north[0].get_id() if len(
-            self.north) is not 0 else None
+            self.north) is not 0 and self.spinner is None else None
         west = self.west[-1].get_id() if len(self.west) is not 0 else None
         return spinner, north, east, south, west
 
@@ -215,9 +211,165 @@ class Board:
             output.append(self.spinner.get_out_facing_number())
         return output
 
+    def get_open_number(self, direction: Direction) -> int:
+        # Number a domino played in direction has to match, -1 if nothing can be played there (or the board is empty)
+        if self.spinner is None:
+            if len(self.north) == 0:
+                return -1
+            if direction is Direction.NORTH:
+                return self.north[-1].get_out_facing_number()
+            if direction is Direction.SOUTH:
+                return self.north[0].get_in_facing_number()
+            return -1
+        if direction is Direction.NORTH:
+            stack = self.north
+        elif direction is Direction.SOUTH:
+            stack = self.south
+        elif len(self.north) == 0 or len(self.south) == 0:
+            return -1
+        else:
+            stack = self.east if direction is Direction.EAST else self.west
+        return stack[-1].get_out_facing_number() if len(stack) != 0 else self.spinner.get_out_facing_number()
+
     def is_empty(self):
         return self.spinner is None and len(self.north) is 0 and len(self.south) is 0 and len(self.east) is 0 and len(self.west) is 0
 
+    def to_compact(self) -> "CompactBoard":
+        return CompactBoard.from_board(self)
+
+
+class CompactBoard:
+    # Board reduced to the spinner and the four open ends, with the board sum updated on every play.
+    # Numbers and ids are ints, -1 meaning empty. Without a spinner the line's two ends are stored as north and south.
+    # Each play records only what it overwrote, so undo is O(1) and search can explore moves without copying.
+    __slots__ = ("spinner", "spinner_id", "ends", "end_ids", "end_doubles", "board_sum", "history", "keys", "played_hash",
+                 "hash")
+
+    def __init__(self):
+        self.spinner = -1
+        self.spinner_id = -1
+        self.ends = [-1, -1, -1, -1]
+        self.end_ids = [-1, -1, -1, -1]
+        self.end_doubles = [False, False, False, False]
+        self.board_sum = 0
+        self.history = []
+        self.keys = None
+        self.played_hash = 0
+        self.hash = 0
+
+    @staticmethod
+    def from_board(board: Board) -> "CompactBoard":
+        # Replays the board outward from the spinner (or any domino of the line still facing its original way)
+        compact = CompactBoard()
+        if board.spinner is not None:
+            compact.play_domino(board.spinner, Direction.NORTH)
+            for stack, direction in ((board.north, Direction.NORTH), (board.south, Direction.SOUTH),
+                                     (board.east, Direction.EAST), (board.west, Direction.WEST)):
+                for dom in stack:
+                    compact.play_domino(dom, direction)
+        elif len(board.north) != 0:
+            start = next(i for i in range(len(board.north)) if not board.north[i].reverse)
+            compact.play_domino(board.north[start], Direction.NORTH)
+            for dom in board.north[start + 1:]:
+                compact.play_domino(dom, Direction.NORTH)
+            for dom in reversed(board.north[:start]):
+                compact.play_domino(dom, Direction.SOUTH)
+        return compact
+
+    def to_board(self) -> Board:
+        board = Board()
+        for dom, direction, *_ in self.history:
+            board.play_domino(dom, direction)
+        return board
+
+    def get_open_number(self, direction: Direction) -> int:
+        # Number a domino played in direction has to match, -1 if nothing can be played there (or the board is empty)
+        d = direction.value
+        if self.spinner == -1:
+            return self.ends[d] if direction is Direction.NORTH or direction is Direction.SOUTH else -1
+        if (direction is Direction.EAST or direction is Direction.WEST) and (
+                self.ends[Direction.NORTH.value] == -1 or self.ends[Direction.SOUTH.value] == -1):
+            return -1
+        return self.ends[d] if self.ends[d] != -1 else self.spinner
+
+    def play_domino(self, dom: Domino, direction: Direction):
+        d = direction.value
+        num_a, num_b = dom.num_a, dom.num_b
+        if len(self.history) != 0:
+            open_number = self.get_open_number(direction)
+            assert open_number != -1 and (num_a == open_number or num_b == open_number)
+        else:
+            assert direction is Direction.NORTH or direction is Direction.SOUTH
+        self.history.append((dom, direction, self.ends[d], self.end_ids[d], self.end_doubles[d], self.spinner,
+                             self.spinner_id, self.board_sum))
+
+        if len(self.history) == 1:  # If first piece
+            if num_a == num_b:
+                self.spinner, self.spinner_id, self.board_sum = num_a, dom.get_id(), num_a * 2
+            else:
+                self.ends[Direction.NORTH.value], self.ends[Direction.SOUTH.value] = num_b, num_a
+                self.end_ids[Direction.NORTH.value] = self.end_ids[Direction.SOUTH.value] = dom.get_id()
+                self.board_sum = num_a + num_b
+        elif self.spinner == -1:
+            if num_a == num_b:  # The first double becomes the spinner, the line becomes the opposite arm
+                self.spinner, self.spinner_id = num_a, dom.get_id()
+                self.ends[d], self.end_ids[d] = -1, -1
+                self.board_sum += num_a
+            else:
+                self.ends[d], self.end_ids[d] = num_a + num_b - open_number, dom.get_id()
+                self.board_sum += self.ends[d] - open_number
+        else:
+            self.board_sum -= self.__arm_sum(d) + self.__exposed_spinner_sum()
+            self.ends[d], self.end_ids[d], self.end_doubles[d] = num_a + num_b - open_number, dom.get_id(), num_a == num_b
+            self.board_sum += self.__arm_sum(d) + self.__exposed_spinner_sum()
+        if self.keys is None:
+            self.keys = get_zobrist_keys(dom.num_max)
+        self.played_hash ^= self.keys.played[dom.get_id()]
+        self.hash = self.played_hash ^ hash_ends(self.spinner, self.ends, self.end_doubles, self.keys)
+
+    def undo(self) -> Domino:
+        # Takes back the last play and returns the domino that was played
+        dom, direction, end, end_id, end_double, spinner, spinner_id, board_sum = self.history.pop()
+        if len(self.history) == 0:
+            self.ends = [-1, -1, -1, -1]
+            self.end_ids = [-1, -1, -1, -1]
+        else:
+            d = direction.value
+            self.ends[d], self.end_ids[d], self.end_doubles[d] = end, end_id, end_double
+        self.spinner, self.spinner_id, self.board_sum = spinner, spinner_id, board_sum
+        self.played_hash ^= self.keys.played[dom.get_id()]
+        self.hash = self.played_hash ^ hash_ends(self.spinner, self.ends, self.end_doubles, self.keys)
+        return dom
+
+    def __arm_sum(self, d: int) -> int:
+        if self.ends[d] == -1:
+            return 0
+        return self.ends[d] * 2 if self.end_doubles[d] else self.ends[d]
+
+    def __exposed_spinner_sum(self) -> int:
+        if self.ends[Direction.NORTH.value] == -1 or self.ends[Direction.SOUTH.value] == -1:
+            return self.spinner * 2
+        return 0
+
+    def get_board_sum(self) -> int:
+        return self.board_sum
+
+    def get_hash(self) -> int:
+        # Equal to Board.get_hash for the same position
+        return self.hash
+
+    def get_board_state(self) -> (int, int, int, int, int):
+        return tuple(x if x != -1 else None for x in (self.spinner_id, *self.end_ids))
+
+    def get_out_facing_numbers(self):
+        output = [x for x in self.ends if x != -1]
+        if self.spinner != -1 and -1 in self.ends:
+            output.append(self.spinner)
+        return output
+
+    def is_empty(self):
+        return len(self.history) == 0
+
 
 class Game:
     class Player(ABC):
@@ -225,37 +377,141 @@ class Game:
         def take_turn(self, current_board: Board, current_hand: list, curr_player_num: int, players: list, scores: dict, pile_size: int):
             pass
 
-    def __init__(self, max_num: int, score_to_win: int, players: list):  # players list must contain objects with a take_turn(current_board, current_hand) method
+    class Observer:
+        # Receives game events once subscribed with Game.subscribe. Every method is a no-op unless overridden.
+        # With no observers subscribed the game does no rendering or event work at all
+        def on_match_start(self, game: "Game"):
+            pass
+
+        def on_game_start(self, game: "Game"):
+            pass
+
+        def on_turn(self, game: "Game", player_num: int):
+            pass
+
+        def on_play(self, game: "Game", player_num: int, dom: Domino, direction: Direction):
+            pass
+
+        def on_draw(self, game: "Game", player_num: int):
+            pass
+
+        def on_pass(self, game: "Game", player_num: int):
+            pass
+
+        def on_score(self, game: "Game", player_num: int, points: int):
+            pass
+
+        def on_game_end(self, game: "Game"):
+            pass
+
+        def on_match_end(self, game: "Game"):
+            pass
+
+    @staticmethod
+    def legal_moves(hand: list, board: Board) -> list:
+        # Every playable (hand index, Direction) by direction then hand index, read off num_mask_table (dominoes
+        # showing each number, by id) masked with the hand's ids instead of trying moves. Works with Board and
+        # CompactBoard. The first domino is always played north
+        if board.is_empty():
+            return [(i, Direction.NORTH) for i in range(len(hand))]
+        if len(hand) == 0:
+            return []
+        num_masks = num_mask_table(hand[0].num_max)
+        ids = id_table(hand[0].num_max)
+        held, index = 0, {}
+        for i in range(len(hand)):
+            dom_id = ids[hand[i].pair]
+            held |= 1 << dom_id
+            index[dom_id] = i
+        moves = []
+        for direction in DIRECTIONS:
+            number = board.get_open_number(direction)
+            if number == -1:
+                continue
+            bits = num_masks[number] & held
+            if bits & bits - 1 == 0:  # At most one domino
+                if bits:
+                    moves.append((index[bits.bit_length() - 1], direction))
+                continue
+            found = []
+            while bits:
+                lowest = bits & -bits
+                found.append(index[lowest.bit_length() - 1])
+                bits ^= lowest
+            found.sort()
+            for i in found:
+                moves.append((i, direction))
+        return moves
+
+    @staticmethod
+    def action_mask(hand: list, board: Board, pile_size: int, max_num: int) -> list:
+        # Fixed size mask over actions dom_id * 4 + Direction.value plus a final draw action, as used by BatchGame
+        mask = [False] * (get_num_doms(max_num) * len(Direction) + 1)
+        for dom_index, direction in Game.legal_moves(hand, board):
+            mask[hand[dom_index].get_id() * len(Direction) + direction.value] = True
+        mask[-1] = pile_size > 0
+        return mask
+
+    def __init__(self, max_num: int, score_to_win: int, players: list, seed: int = None, rng: random.Random = None):  # players list must contain objects with a take_turn(current_board, current_hand) method
+        # All randomness (first turn, shuffling the pile) comes from rng, or from random.Random(seed) if rng is None
+        self.seed = seed
+        self.rng = rng if rng is not None else random.Random(seed)
         self.score_to_win = score_to_win
         self.max_num = max_num
         self.players = players
         self.scores = self.__init_scores()
         self.__shuffle_current_turn()
         self.last_played = None
+        self.history = []  # Moves of each round as (player number, dom id, Direction), dom id -1 for a draw and None for a pass
+        self.observers = []
+        self.keys = get_zobrist_keys(max_num, len(players))
+        self.hands_hash = 0
+        self.profiler = None  # Set to a profiler.Profiler to time the phases of play and count events
+
+    @staticmethod
+    def replay(max_num: int, score_to_win: int, num_players: int, history: list, seed: int = None,
+               rng: random.Random = None) -> "Game":
+        # Re-executes a match from its Game.history and the seed (or a fresh copy of the rng) it was played with.
+        # Returns the finished game, whose history and scores match the original
+        seat_moves = [[] for _ in range(num_players)]
+        for moves in history:
+            for seat, dom_id, direction in moves:
+                if dom_id is not None:  # Passes are not asked of the player
+                    seat_moves[seat].append((dom_id, direction))
+        game = Game(max_num, score_to_win, [ReplayPlayer(moves) for moves in seat_moves], seed, rng)
+        game.play_match()
+        return game
+
+    def subscribe(self, observer: Observer):
+        self.observers.append(observer)
+
+    def unsubscribe(self, observer: Observer):
+        self.observers.remove(observer)
 
     def __shuffle_current_turn(self):
-        self.current_turn = random.randint(0, len(self.players) - 1)
+        self.current_turn = self.rng.randrange(len(self.players))
 
     def __find_max_double_player(self):
         pass  # TODO: This
 
     def __init_round(self, shuffle_current_player: bool = False):
         self.board = Board()
+        self.history.append([])
         self.pile = self.__init_pile(self.max_num)
         self.hands = self.__init_hands()
+        self.hands_hash = 0
         if shuffle_current_player:
             self.__shuffle_current_turn()
-        for hand in self.hands.values():
+        for seat in range(len(self.players)):
+            hand = self.hands[self.players[seat]]
             for _ in range(START_HAND_SIZE):
                 hand.append(self.__draw_random_dom_from_pile())
+                self.hands_hash ^= self.keys.hands[seat][hand[-1].get_id()]
 
     def __init_pile(self, max_num: int):
-        pile = []
-        max_dom = Domino(max_num, max_num, max_num)  # Create largest possible domino double, get its id to find max id
-        max_id = max_dom.get_id()
-        for id in range(max_id):
-            pile.append(Domino(*Domino.id_to_nums(id, max_num), max_num))
-        pile.append(max_dom)
+        # Shuffled once per round, so drawing takes from the end in O(1)
+        pile = [Domino(num_a, num_b, max_num) for num_a, num_b in id_to_nums_table(max_num)]
+        self.rng.shuffle(pile)
         return pile
 
     def __init_hands(self):
@@ -266,7 +522,12 @@ class Game:
 
     def __draw_random_dom_from_pile(self):
         assert len(self.pile) > 0
-        return self.pile.pop(random.randint(0, len(self.pile) - 1))
+        return self.pile.pop()
+
+    def get_hash(self) -> int:
+        # 64 bit Zobrist hash of the full position: board, every hand and whose turn it is (the pile is what is left).
+        # Kept up to date in O(1) per play, draw and turn change. Scores are not included
+        return self.board.get_hash() ^ self.hands_hash ^ self.keys.turn[self.current_turn]
 
     def __check_for_winner(self):
         for player in self.players:
@@ -275,60 +536,102 @@ class Game:
         return None
 
     def play_match(self):
-        print("Starting new match")
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.count("matches")
+            profiler.start("match")
+        for observer in self.observers:
+            observer.on_match_start(self)
         while self.__check_for_winner() is None:
             self.play_game()
-        scores_string = ""
-        for player in self.players:
-            scores_string += f"{self.scores[player]} "
-        print(f"Scores: {scores_string}")
-        print("Finished match")
+        for observer in self.observers:
+            observer.on_match_end(self)
+        if profiler is not None:
+            profiler.stop()
 
     def play_game(self):
-        print("Starting new game")
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.count("rounds")
+            profiler.start("round")
         self.__init_round(False)
+        for observer in self.observers:
+            observer.on_game_start(self)
         game_over = False
         while not game_over:
             game_over = self.take_turn()
-        print("Finished game")
-
-    def __check_if_can_play(self, player: Player):
-        board_numbers = set(self.board.get_out_facing_numbers())
-        hand = self.hands[player]
-        hand_numbers = set()
-        for x in hand:
-            hand_numbers.add(x.num_a)
-            hand_numbers.add(x.num_b)
-        return len(board_numbers.intersection(hand_numbers)) is not 0 or self.board.is_empty()
+        for observer in self.observers:
+            observer.on_game_end(self)
+        if profiler is not None:
+            profiler.stop()
 
     def take_turn(self) -> bool:
         current_player = self.players[self.current_turn]
         current_hand = self.hands[current_player]
         current_board = self.board
-        if not self.__check_if_can_play(current_player) and len(self.pile) == 0:
+        profiler = self.profiler
+        if self.observers:
+            for observer in self.observers:
+                observer.on_turn(self, self.current_turn)
+        if profiler is not None:
+            profiler.start("legal_moves")
+        legal_moves = Game.legal_moves(current_hand, current_board)
+        if profiler is not None:
+            profiler.stop()
+        if len(legal_moves) == 0 and len(self.pile) == 0:
             # print(f"Can't play. Full cycle?: {self.last_played == self.current_turn}, ({self.last_played}, {self.current_turn})")
             actual_current_turn = self.current_turn
+            self.history[-1].append((actual_current_turn, None, None))
+            if self.observers:
+                for observer in self.observers:
+                    observer.on_pass(self, actual_current_turn)
             self.current_turn = (self.current_turn + 1) % len(self.players)
+            if profiler is not None:
+                profiler.count("passes")
+                if self.last_played == actual_current_turn:
+                    profiler.count("locked rounds")
             return self.last_played == actual_current_turn  # Check if full cycle of lock
-        successful = False
-        while not successful:
+        while True:
+            if profiler is not None:
+                profiler.start("player")
             (dom_index, direction) = current_player.take_turn(current_board, current_hand, self.current_turn, self.players, self.scores, len(self.pile))  # Note: Giving the player the board allows them to cheat. For security, change to a copy of the board in the future
+            if profiler is not None:
+                profiler.stop()
             if dom_index != -1:
-                dom_to_play = current_hand[dom_index]
-                try:  # TODO: This method sucks
-                    self.board.play_domino(dom_to_play, direction)
-                    successful = True
-                    current_hand.pop(dom_index)
-                    self.last_played = self.current_turn
-                except:
-                    pass
-            else:
-                if len(self.pile) > 0:
-                    current_hand.append(self.__draw_random_dom_from_pile())
-                    return False
+                if (dom_index, direction) in legal_moves:
+                    break
+            elif len(self.pile) > 0:
+                if profiler is not None:
+                    profiler.count("draws")
+                current_hand.append(self.__draw_random_dom_from_pile())
+                self.hands_hash ^= self.keys.hands[self.current_turn][current_hand[-1].get_id()]
+                self.history[-1].append((self.current_turn, -1, None))
+                if self.observers:
+                    for observer in self.observers:
+                        observer.on_draw(self, self.current_turn)
+                return False
+            if profiler is not None:
+                profiler.count("illegal attempts")
+        dom_to_play = current_hand.pop(dom_index)
+        self.hands_hash ^= self.keys.hands[self.current_turn][dom_to_play.get_id()]
+        if profiler is not None:
+            profiler.count("plays")
+            profiler.start("play_domino")
+        self.board.play_domino(dom_to_play, direction)
+        if profiler is not None:
+            profiler.stop()
+        self.history[-1].append((self.current_turn, dom_to_play.get_id(), direction))
+        self.last_played = self.current_turn
+        if self.observers:
+            for observer in self.observers:
+                observer.on_play(self, self.current_turn, dom_to_play, direction)
+        if profiler is not None:
+            profiler.start("get_board_sum")
         board_sum = self.board.get_board_sum()
+        if profiler is not None:
+            profiler.stop()
         if board_sum % 5 == 0:
-            self.scores[current_player] += board_sum
+            self.__add_score(current_player, board_sum)
         if len(current_hand) == 0:
             sum = 0
             for hand in self.hands.values():
@@ -336,11 +639,17 @@ class Game:
                 for dom in hand:
                     current_sum += dom.num_a + dom.num_b
                 sum += int(5 * round(float(current_sum) / 5))  # Rounds each hand to the nearest 5
-            self.scores[current_player] += sum
+            self.__add_score(current_player, sum)
             return True
         self.current_turn = (self.current_turn + 1) % len(self.players)
         return self.__check_for_winner()
 
+    def __add_score(self, player: Player, points: int):
+        self.scores[player] += points
+        if self.observers and points != 0:
+            for observer in self.observers:
+                observer.on_score(self, self.current_turn, points)
+
     def __init_scores(self):
         scores = {}
         for player in self.players:
@@ -348,58 +657,50 @@ class Game:
         return scores
 
 
+def hand_to_string(hand: list) -> str:
+    to_print_1 = "    "
+    to_print_2 = "    "
+    to_print_3 = "    "
+    to_print_4 = "    "
+    for i in range(len(hand)):
+        to_print_1 += "-----    "
+        to_print_2 += f"|{hand[i].num_a}|{hand[i].num_b}|    "
+        to_print_3 += "-----    "
+        to_print_4 += f"  {i + 1}"
+        for _ in range(7 - len(str(i + 1))):
+            to_print_4 += " "
+    return to_print_1 + "\n" + to_print_2 + "\n" + to_print_3 + "\n" + to_print_4
+
+
 class RandomPlayer(Game.Player):
+    def __init__(self, seed: int = None, rng: random.Random = None):
+        self.rng = rng if rng is not None else random.Random(seed)
+
     def take_turn(self, current_board: Board, current_hand: list, curr_player_num: int, players: list, scores: dict, pile_size: int):
-        options = []
+        options = Game.legal_moves(current_hand, current_board)
         if pile_size > 0:
             options.append((-1, None))
-        if current_board.is_empty():
-            for i in range(len(current_hand)):
-                options.append((i, Direction.NORTH))
-        else:
-            out_facing_numbers = []
-            if len(current_board.north) != 0:
-                out_facing_numbers.append((current_board.north[-1].get_out_facing_number(), Direction.NORTH))
-            elif current_board.spinner is not None:
-                out_facing_numbers.append((current_board.spinner.get_out_facing_number(), Direction.NORTH))
-            if len(current_board.south) != 0:
-                out_facing_numbers.append((current_board.south[-1].get_out_facing_number(), Direction.SOUTH))
-            else:
-                if len(current_board.north) != 0 and current_board.spinner is None:
-                    out_facing_numbers.append((current_board.north[0].get_in_facing_number(), Direction.SOUTH))
-                if current_board.spinner is not None:
-                    out_facing_numbers.append((current_board.spinner.get_out_facing_number(), Direction.SOUTH))
-            if len(current_board.east) != 0:
-                out_facing_numbers.append((current_board.east[-1].get_out_facing_number(), Direction.EAST))
-            elif current_board.spinner is not None:
-                out_facing_numbers.append((current_board.spinner.get_out_facing_number(), Direction.EAST))
-            if len(current_board.west) != 0:
-                out_facing_numbers.append((current_board.west[-1].get_out_facing_number(), Direction.WEST))
-            elif current_board.spinner is not None:
-                out_facing_numbers.append((current_board.spinner.get_out_facing_number(), Direction.WEST))
-
-            for num, direction in out_facing_numbers:
-                for i in range(len(current_hand)):
-                    curr_dom = current_hand[i]
-                    if curr_dom.num_a == num or curr_dom.num_b == num:
-                        options.append((i, direction))
-
-
-
-        print("Rando's hand:")
-        to_print_1 = "    "
-        to_print_2 = "    "
-        to_print_3 = "    "
-        to_print_4 = "    "
+        return options[self.rng.randrange(len(options))]
+
+
+class ReplayPlayer(Game.Player):
+    # Plays back one seat's recorded moves from Game.history, in order across rounds. Raises ValueError if the game
+    # asks for a move the recording doesn't have
+    def __init__(self, moves: list):
+        self.moves = moves  # (dom id or -1 for a draw, Direction)
+        self.position = 0
+
+    def take_turn(self, current_board: Board, current_hand: list, curr_player_num: int, players: list, scores: dict, pile_size: int):
+        if self.position == len(self.moves):
+            raise ValueError("Replay ran out of moves")
+        dom_id, direction = self.moves[self.position]
+        self.position += 1
+        if dom_id == -1:
+            return -1, None
         for i in range(len(current_hand)):
-            to_print_1 += "-----    "
-            to_print_2 += f"|{current_hand[i].num_a}|{current_hand[i].num_b}|    "
-            to_print_3 += "-----    "
-            to_print_4 += f"  {i + 1}"
-            for _ in range(7 - len(str(i + 1))):
-                to_print_4 += " "
-        print(to_print_1 + "\n" + to_print_2 + "\n" + to_print_3 + "\n" + to_print_4)
-        return options[random.randint(0, len(options) - 1)]
+            if current_hand[i].get_id() == dom_id:
+                return i, direction
+        raise ValueError(f"Replay diverged: domino {dom_id} is not in the hand")
 
 
 class ConsolePlayer(Game.Player):
@@ -413,18 +714,7 @@ class ConsolePlayer(Game.Player):
         print(str(current_board))
         print(f"Pile size: {pile_size}")
         print("Your hand:")
-        to_print_1 = "    "
-        to_print_2 = "    "
-        to_print_3 = "    "
-        to_print_4 = "    "
-        for i in range(len(current_hand)):
-            to_print_1 += "-----    "
-            to_print_2 += f"|{current_hand[i].num_a}|{current_hand[i].num_b}|    "
-            to_print_3 += "-----    "
-            to_print_4 += f"  {i + 1}"
-            for _ in range(7 - len(str(i + 1))):
-                to_print_4 += " "
-        print(to_print_1 + "\n" + to_print_2 + "\n" + to_print_3 + "\n" + to_print_4)
+        print(hand_to_string(current_hand))
         while True:
             try:
                 action = int(input("Choose domino number, or 0 to draw another: "))
@@ -445,11 +735,53 @@ class ConsolePlayer(Game.Player):
                 except:
                     pass
                 print("Bad input")
-            return action - 1, Direction(direction - 1)
+            move = (action - 1, Direction(direction - 1))
+            if move not in Game.legal_moves(current_hand, current_board):
+                print("Illegal move")
+            return move
+
+
+class ConsoleObserver(Game.Observer):
+    # Prints match progress. show_moves also prints every play, draw and pass
+    def __init__(self, show_moves: bool = False):
+        self.show_moves = show_moves
+
+    def on_match_start(self, game: Game):
+        print("Starting new match")
+
+    def on_game_start(self, game: Game):
+        print("Starting new game")
+
+    def on_play(self, game: Game, player_num: int, dom: Domino, direction: Direction):
+        if self.show_moves:
+            print(f"Player {player_num + 1} plays ({dom.num_a}, {dom.num_b}) {direction.name}")
+
+    def on_draw(self, game: Game, player_num: int):
+        if self.show_moves:
+            print(f"Player {player_num + 1} draws")
+
+    def on_pass(self, game: Game, player_num: int):
+        if self.show_moves:
+            print(f"Player {player_num + 1} passes")
+
+    def on_score(self, game: Game, player_num: int, points: int):
+        if self.show_moves:
+            print(f"Player {player_num + 1} scores {points}")
+
+    def on_game_end(self, game: Game):
+        print("Finished game")
+
+    def on_match_end(self, game: Game):
+        scores_string = ""
+        for player in game.players:
+            scores_string += f"{game.scores[player]} "
+        print(f"Scores: {scores_string}")
+        print("Finished match")
 
 
 if __name__ == '__main__':
     # player_1 = ConsolePlayer()
     # player_2 = ConsolePlayer()
     game = Game(max_num=6, score_to_win=200, players=[RandomPlayer(), RandomPlayer(), RandomPlayer(), RandomPlayer()])
+    game.subscribe(ConsoleObserver(show_moves=True))
     game.play_match()
@@ -0,0 +1,85 @@
+from functools import lru_cache
+
+# Lookup tables for a set of dominoes with numbers 0..num_max, built once per num_max.
+# Dominoes are indexed either by id (Domino.get_id numbering) or by pair index num_a * (num_max + 1) + num_b, which
+# also covers dominoes constructed with num_a > num_b.
+
+
+def get_num_doms(num_max: int) -> int:
+    return (num_max + 1) * (num_max + 2) // 2
+
+
+def pair_index(num_a: int, num_b: int, num_max: int) -> int:
+    return num_a * (num_max + 1) + num_b
+
+
+@lru_cache(maxsize=None)
+def id_table(num_max: int) -> list:
+    # Domino.get_id for every pair index
+    ids = []
+    for num_a in range(num_max + 1):
+        row_start = sum(num_max - i + 1 for i in range(num_a))
+        for num_b in range(num_max + 1):
+            ids.append(row_start + num_max - num_b)
+    return ids
+
+
+@lru_cache(maxsize=None)
+def nums_table(num_max: int) -> list:
+    # (num_a, num_b) with num_a <= num_b for every id, the inverse of Domino.get_id
+    nums = [None] * get_num_doms(num_max)
+    ids = id_table(num_max)
+    for num_a in range(num_max + 1):
+        for num_b in range(num_a, num_max + 1):
+            nums[ids[pair_index(num_a, num_b, num_max)]] = (num_a, num_b)
+    return nums
+
+
+@lru_cache(maxsize=None)
+def id_to_nums_table(num_max: int) -> list:
+    # Domino.id_to_nums for every id. Note this numbering differs from Domino.get_id within each row
+    nums = []
+    for num_a in range(num_max + 1):
+        for num_b in range(num_a, num_max + 1):
+            nums.append((num_a, num_b))
+    return nums
+
+
+@lru_cache(maxsize=None)
+def num_mask_table(num_max: int) -> list:
+    # Bitmask over ids of the dominoes showing each number
+    masks = [0] * (num_max + 1)
+    for dom_id, (num_a, num_b) in enumerate(nums_table(num_max)):
+        masks[num_a] |= 1 << dom_id
+        masks[num_b] |= 1 << dom_id
+    return masks
+
+
+@lru_cache(maxsize=None)
+def match_table(num_max: int) -> list:
+    # Domino.check_match result for every (pair index, pair index)
+    pairs = [(num_a, num_b) for num_a in range(num_max + 1) for num_b in range(num_max + 1)]
+    return [[_check_match_nums(*pair, *other) for other in pairs] for pair in pairs]
+
+
+def _check_match_nums(self_a: int, self_b: int, other_a: int, other_b: int) -> (int, int):
+    if self_a == self_b:
+        if self_a == other_a:
+            return 0, 1
+        if self_a == other_b:
+            return 0, -1
+    if other_a == other_b:
+        if self_a == other_a:
+            return -1, 0
+        if self_b == other_a:
+            return 1, 0
+    if self_b == other_a:
+        return 1, 1
+    elif self_b == other_b:
+        return 1, -1
+    elif self_a == other_a:
+        return -1, 1
+    elif self_a == other_b:
+        return -1, -1
+    else:
+        return None
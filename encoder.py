@@ -0,0 +1,107 @@
+import numpy as np
+
+from batch_engine import BatchGame
+from domino import Board, CompactBoard, Direction, DIRECTIONS, Game
+from domino_tables import get_num_doms
+
+
+class ObservationEncoder:
+    # Encodes a position from the mover's point of view as a fixed length vector, written into a caller supplied buffer:
+    #   open number of each direction (one-hot per direction), spinner number (one-hot), which arms are occupied,
+    #   which arm ends are doubles, the hand and the played dominoes (multi-hot over ids), pile size, score differential.
+    # Float dtypes scale pile size by the set size and the score differential by score_scale. Integer dtypes store the
+    # pile size as is and the score differential in fives offset by 128, clipped to 0..255
+    def __init__(self, max_num: int, score_scale: float = 200.0, dtype=np.float32):
+        self.max_num, self.score_scale, self.dtype = max_num, score_scale, np.dtype(dtype)
+        self.num_nums = max_num + 1
+        self.num_doms = get_num_doms(max_num)
+        self.open_offset = 0
+        self.spinner_offset = self.open_offset + len(DIRECTIONS) * self.num_nums
+        self.occupied_offset = self.spinner_offset + self.num_nums
+        self.double_offset = self.occupied_offset + len(DIRECTIONS)
+        self.hand_offset = self.double_offset + len(DIRECTIONS)
+        self.played_offset = self.hand_offset + self.num_doms
+        self.pile_offset = self.played_offset + self.num_doms
+        self.score_offset = self.pile_offset + 1
+        self.size = self.score_offset + 1
+        self.scratch = np.zeros(self.size, dtype=self.dtype)
+
+    def allocate(self, batch_size: int = None) -> np.ndarray:
+        return np.zeros(self.size if batch_size is None else (batch_size, self.size), dtype=self.dtype)
+
+    def __scalars(self, pile_size: int, score_diff: int) -> (float, float):
+        if self.dtype.kind == "f":
+            return pile_size / self.num_doms, score_diff / self.score_scale
+        return pile_size, min(max(score_diff // 5 + 128, 0), 255)
+
+    def encode(self, board: Board, hand: list, pile_size: int, score_diff: int, out: np.ndarray) -> np.ndarray:
+        # Works with Board and CompactBoard. out must hold self.size entries
+        out[:] = 0
+        for direction in DIRECTIONS:
+            open_number = board.get_open_number(direction)
+            if open_number != -1:
+                out[self.open_offset + direction.value * self.num_nums + open_number] = 1
+        for dom in hand:
+            out[self.hand_offset + dom.get_id()] = 1
+        if isinstance(board, CompactBoard):
+            if board.spinner != -1:
+                out[self.spinner_offset + board.spinner] = 1
+            for d in range(len(DIRECTIONS)):
+                if board.ends[d] != -1:
+                    out[self.occupied_offset + d] = 1
+                    out[self.double_offset + d] = board.end_doubles[d]
+            for play in board.history:
+                out[self.played_offset + play[0].get_id()] = 1
+        else:
+            if board.spinner is not None:
+                out[self.spinner_offset + board.spinner.num_a] = 1
+                out[self.played_offset + board.spinner.get_id()] = 1
+            stacks = (board.north, board.east, board.south, board.west)
+            for d in range(len(stacks)):
+                stack = stacks[d]
+                if len(stack) != 0:
+                    out[self.occupied_offset + d] = 1
+                    out[self.double_offset + d] = stack[-1].is_double()
+                for dom in stack:
+                    out[self.played_offset + dom.get_id()] = 1
+            if board.spinner is None and len(board.north) != 0:  # The line's south end is north[0]
+                out[self.occupied_offset + Direction.SOUTH.value] = 1
+        out[self.pile_offset], out[self.score_offset] = self.__scalars(pile_size, score_diff)
+        return out
+
+    def encode_game(self, game: Game, player_num: int, out: np.ndarray = None) -> np.ndarray:
+        # Encodes game for player_num. Without out the result goes to a scratch buffer reused by the next call
+        player = game.players[player_num]
+        best_other = max(game.scores[other] for other in game.players if other is not player)
+        return self.encode(game.board, game.hands[player], len(game.pile), game.scores[player] - best_other,
+                           self.scratch if out is None else out)
+
+    def encode_batch(self, boards: list, hands: list, pile_sizes: list, score_diffs: list, out: np.ndarray) -> np.ndarray:
+        for i in range(len(boards)):
+            self.encode(boards[i], hands[i], pile_sizes[i], score_diffs[i], out[i])
+        return out
+
+    def encode_batch_game(self, batch: BatchGame, out: np.ndarray) -> np.ndarray:
+        # Vectorized encoding of every game of a BatchGame for its current player
+        assert batch.max_num == self.max_num
+        games = np.arange(batch.num_games)
+        out[:] = 0
+        opens = batch.get_open_numbers()
+        open_games, open_directions = np.nonzero(opens != -1)
+        out[open_games, self.open_offset + open_directions * self.num_nums + opens[open_games, open_directions]] = 1
+        spinner_games = np.flatnonzero(batch.spinner != -1)
+        out[spinner_games, self.spinner_offset + batch.spinner[spinner_games]] = 1
+        out[:, self.occupied_offset:self.double_offset] = batch.ends != -1
+        out[:, self.double_offset:self.hand_offset] = batch.end_double
+        out[:, self.hand_offset:self.played_offset] = batch.hands[games, batch.current_turn]
+        out[:, self.played_offset:self.pile_offset] = batch.played
+        others = batch.scores.copy()
+        others[games, batch.current_turn] = np.iinfo(others.dtype).min
+        score_diffs = batch.scores[games, batch.current_turn] - others.max(axis=1)
+        if self.dtype.kind == "f":
+            out[:, self.pile_offset] = batch.pile_size / self.num_doms
+            out[:, self.score_offset] = score_diffs / self.score_scale
+        else:
+            out[:, self.pile_offset] = batch.pile_size
+            out[:, self.score_offset] = np.clip(score_diffs // 5 + 128, 0, 255)
+        return out
@@ -0,0 +1,230 @@
+import random
+import time
+
+from belief import BeliefTracker
+from domino import Board, CompactBoard, Direction, Domino, Game, RandomPlayer
+from domino_tables import nums_table
+
+EXACT, LOWER, UPPER = 0, 1, 2  # Memo entry bounds
+
+
+def _domino_points(hands: list) -> int:
+    # Points for going out: every hand's pips, each rounded to the nearest 5
+    return sum((sum(dom.num_a + dom.num_b for dom in hand) + 2) // 5 * 5 for hand in hands)
+
+
+class EndgameSolver:
+    # Alpha-beta search of the rest of a round once the pile is empty, with every hand known. The value of a position
+    # is the root player's points minus all opponents' points until the round ends (opponents play as one side, so
+    # with two players this is exact minimax). Scores reaching score_to_win mid round are not considered.
+    # Positions are memoized by the open ends, the remaining hands, the player to move and the passes since the last
+    # play, with the alpha-beta bound they were searched to
+    def __init__(self):
+        self.memo = {}  # key -> (value, bound, best (dom id, Direction))
+        self.nodes, self.lookups, self.hits, self.seconds = 0, 0, 0, 0.0
+
+    def clear(self):
+        self.memo.clear()
+
+    def get_nodes_per_second(self) -> float:
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+    def get_hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups != 0 else 0.0
+
+    def solve(self, board: Board, hands: list, turn: int, root: int = None, passes: int = 0) -> (int, tuple):
+        # (value for root, best (hand index, Direction) for the player to move or None if they have to pass).
+        # root defaults to the player to move. Works with Board and CompactBoard; neither board nor hands are changed
+        self.__start(board, hands, turn, root, passes)
+        value = self.__search(-10 ** 9, 10 ** 9)
+        move = self.memo[self.__key()][2]
+        self.seconds += time.perf_counter() - self.start
+        return value if self.__side(turn) == 0 else -value, self.__to_move(move)
+
+    def evaluate_moves(self, board: Board, hands: list, turn: int, root: int = None) -> list:
+        # Exact value for root of every legal (hand index, Direction) of the player to move
+        self.__start(board, hands, turn, root, 0)
+        output = []
+        for dom_index, direction in Game.legal_moves(self.hands[turn], self.board):
+            value = self.__child_value(dom_index, direction, -10 ** 9, 10 ** 9)
+            output.append(((dom_index, direction), value if self.__side(turn) == 0 else -value))
+        self.seconds += time.perf_counter() - self.start
+        return output
+
+    def solve_game(self, game: Game, player_num: int) -> int:
+        # Value target for a running Game with an empty pile: player_num's points minus everyone else's for the rest of
+        # the round under best play, from the game's actual hands
+        assert len(game.pile) == 0
+        hands = [game.hands[player] for player in game.players]
+        passes = 0
+        while passes < len(game.history[-1]) and game.history[-1][-1 - passes][1] is None:
+            passes += 1
+        return self.solve(game.board, hands, game.current_turn, player_num, passes)[0]
+
+    def __start(self, board: Board, hands: list, turn: int, root: int, passes: int):
+        self.start = time.perf_counter()
+        self.board = board.to_compact() if isinstance(board, Board) else board
+        self.hands = [list(hand) for hand in hands]
+        self.masks = [sum(1 << dom.get_id() for dom in hand) for hand in hands]
+        self.turn, self.root, self.passes = turn, turn if root is None else root, passes
+        self.order = {}  # Hand index of each dom id in the caller's hands, so memoized moves outlive their Dominoes
+        for hand in hands:
+            for i in range(len(hand)):
+                self.order[hand[i].get_id()] = i
+
+    def __side(self, seat: int) -> int:
+        return 0 if seat == self.root else 1
+
+    def __key(self) -> tuple:
+        board = self.board
+        return (board.spinner, *board.ends, *board.end_doubles, *self.masks, self.turn, self.passes, self.root)
+
+    def __to_move(self, move: tuple) -> tuple:
+        if move is None:
+            return None
+        dom_id, direction = move
+        return self.order[dom_id], direction
+
+    def __search(self, alpha: int, beta: int) -> int:
+        # Value for the side to move: its points minus the other side's over the rest of the round
+        self.nodes += 1
+        key = self.__key()
+        self.lookups += 1
+        entry = self.memo.get(key)
+        if entry is not None:
+            value, bound, _ = entry
+            if bound == EXACT or bound == LOWER and value >= beta or bound == UPPER and value <= alpha:
+                self.hits += 1
+                return value
+        hand = self.hands[self.turn]
+        moves = Game.legal_moves(hand, self.board)
+        if len(moves) == 0:
+            value = 0 if self.passes + 1 == len(self.hands) else self.__pass_value(alpha, beta)  # A lock ends the round
+            self.memo[key] = (value, EXACT if self.passes + 1 == len(self.hands) else
+                              LOWER if value >= beta else UPPER if value <= alpha else EXACT, None)
+            return value
+        moves.sort(key=lambda move: -self.__immediate_points(hand[move[0]], move[1]))
+        original_alpha = alpha
+        best, best_move = -10 ** 9, None
+        for dom_index, direction in moves:
+            dom_id = hand[dom_index].get_id()
+            value = self.__child_value(dom_index, direction, alpha, beta)
+            if value > best:
+                best, best_move = value, (dom_id, direction)
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+        bound = LOWER if best >= beta else UPPER if best <= original_alpha else EXACT
+        self.memo[key] = (best, bound, best_move)
+        return best
+
+    def __pass_value(self, alpha: int, beta: int) -> int:
+        turn, passes = self.turn, self.passes
+        self.turn, self.passes = (turn + 1) % len(self.hands), passes + 1
+        if self.__side(self.turn) == self.__side(turn):
+            value = self.__search(alpha, beta)
+        else:
+            value = -self.__search(-beta, -alpha)
+        self.turn, self.passes = turn, passes
+        return value
+
+    def __immediate_points(self, dom: Domino, direction: Direction) -> int:
+        board = self.board
+        board.play_domino(dom, direction)
+        board_sum = board.board_sum
+        board.undo()
+        return board_sum if board_sum % 5 == 0 else 0
+
+    def __child_value(self, dom_index: int, direction: Direction, alpha: int, beta: int) -> int:
+        # Value for the side to move of playing hand[dom_index] in direction, searched within (alpha, beta)
+        turn, passes = self.turn, self.passes
+        hand = self.hands[turn]
+        dom = hand.pop(dom_index)
+        self.masks[turn] ^= 1 << dom.get_id()
+        self.board.play_domino(dom, direction)
+        board_sum = self.board.board_sum
+        points = board_sum if board_sum % 5 == 0 else 0
+        if len(hand) == 0:
+            value = points + _domino_points(self.hands)
+        else:
+            self.turn, self.passes = (turn + 1) % len(self.hands), 0
+            if self.__side(self.turn) == self.__side(turn):
+                value = points + self.__search(alpha - points, beta - points)
+            else:
+                value = points - self.__search(points - beta, points - alpha)
+            self.turn, self.passes = turn, passes
+        self.board.undo()
+        self.masks[turn] ^= 1 << dom.get_id()
+        hand.insert(dom_index, dom)
+        return value
+
+
+class EndgamePlayer(Game.Player, Game.Observer):
+    # Plays fallback's moves until the pile is empty and at most max_dominoes are left in all hands, then searches
+    # the rest of the round with an EndgameSolver. With two players the opponent's hand is exactly the unseen dominoes
+    # and the move is optimal; with more, the move with the best total over samples random splits of the unseen
+    # dominoes is played. Subscribe the player to the game (game.subscribe(player)) so splits follow the opponents'
+    # hand sizes; otherwise they are split evenly. A subscribed BeliefTracker for the player's seat makes the splits
+    # respect what passes reveal
+    def __init__(self, max_dominoes: int = 12, samples: int = 8, fallback: Game.Player = None, seed: int = None,
+                 belief: BeliefTracker = None):
+        self.max_dominoes, self.samples, self.belief = max_dominoes, samples, belief
+        self.rng = random.Random(seed)
+        self.fallback = fallback if fallback is not None else RandomPlayer(rng=self.rng)
+        self.solver = EndgameSolver()
+        self.hand_sizes = None
+
+    def on_game_start(self, game: Game):
+        self.solver.clear()
+        self.hand_sizes = None
+
+    def on_turn(self, game: Game, player_num: int):
+        self.hand_sizes = [len(game.hands[player]) for player in game.players]
+
+    def take_turn(self, current_board: Board, current_hand: list, curr_player_num: int, players: list, scores: dict, pile_size: int):
+        moves = Game.legal_moves(current_hand, current_board)
+        if len(moves) == 0 and pile_size == 0:
+            return -1, None
+        if pile_size != 0 or len(moves) == 1:
+            return self.fallback.take_turn(current_board, current_hand, curr_player_num, players, scores, pile_size)
+        board = current_board.to_compact() if isinstance(current_board, Board) else current_board
+        unseen = self.__get_unseen(board, current_hand)
+        if len(current_hand) + len(unseen) > self.max_dominoes:
+            return self.fallback.take_turn(current_board, current_hand, curr_player_num, players, scores, pile_size)
+        if len(players) == 2:
+            hands = [current_hand, unseen] if curr_player_num == 0 else [unseen, current_hand]
+            return self.solver.solve(board, hands, curr_player_num)[1]
+        sizes = self.__get_hand_sizes(curr_player_num, len(players), len(current_hand), len(unseen))
+        totals = {}
+        for _ in range(self.samples):
+            if self.belief is not None:
+                hands = self.belief.sample_hands(self.rng)[0]
+                hands[curr_player_num] = current_hand
+            else:
+                self.rng.shuffle(unseen)
+                hands, position = [], 0
+                for seat in range(len(players)):
+                    if seat == curr_player_num:
+                        hands.append(current_hand)
+                    else:
+                        hands.append(unseen[position:position + sizes[seat]])
+                        position += sizes[seat]
+            for move, value in self.solver.evaluate_moves(board, hands, curr_player_num):
+                totals[move] = totals.get(move, 0) + value
+        return max(moves, key=lambda move: totals[move])
+
+    def __get_unseen(self, board: CompactBoard, hand: list) -> list:
+        max_num = hand[0].num_max
+        seen = {dom.get_id() for dom in hand} | {play[0].get_id() for play in board.history}
+        table = nums_table(max_num)
+        return [Domino(*table[i], max_num) for i in range(len(table)) if i not in seen]
+
+    def __get_hand_sizes(self, me: int, num_players: int, hand_size: int, num_unseen: int) -> list:
+        sizes = self.hand_sizes  # Seen in on_turn; with an empty pile every unseen domino is in a hand
+        if (sizes is not None and len(sizes) == num_players and sizes[me] == hand_size
+                and sum(sizes) == hand_size + num_unseen):
+            return sizes
+        sizes = [num_unseen // (num_players - 1) + (1 if i < num_unseen % (num_players - 1) else 0)
+                 for i in range(num_players - 1)]
+        sizes.insert(me, hand_size)
+        return sizes
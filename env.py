@@ -0,0 +1,166 @@
+import multiprocessing
+
+import numpy as np
+
+from batch_engine import BatchGame
+from encoder import ObservationEncoder
+from self_play import derive_seed
+
+ROUND, MATCH = "round", "match"  # Episode lengths
+
+
+class VectorEnv:
+    # Step/reset interface over num_envs games of a BatchGame, from the point of view of the agent in seat agent_seat.
+    # Every game waits for an agent decision between steps: the other seats are played by opponent, called as
+    # opponent(observations, masks) -> actions with the observations of the seats to move (uniformly random legal
+    # actions if None), and the agent's forced passes are made for it. Rewards are the points the agent scored since the
+    # last step. An episode is a round or a whole match; finished episodes are reset on the spot, the observation they
+    # ended on going to info["final_observation"] and the scores to info["final_scores"]. An episode can end before the
+    # agent's first decision (an opponent reaching score_to_win); its mask is then empty and the next step reports it
+    def __init__(self, num_envs: int, max_num: int = 6, num_players: int = 4, score_to_win: int = 150,
+                 agent_seat: int = 0, opponent=None, episode: str = ROUND, seed: int = None, dtype=np.float32):
+        assert 0 <= agent_seat < num_players and episode in (ROUND, MATCH)
+        self.num_envs, self.agent_seat, self.opponent, self.episode = num_envs, agent_seat, opponent, episode
+        self.batch = BatchGame(num_envs, max_num, score_to_win, num_players, seed)
+        self.encoder = ObservationEncoder(max_num, dtype=dtype)
+        self.observation_size, self.num_actions = self.encoder.size, self.batch.num_actions
+        self.observations = self.encoder.allocate(num_envs)
+        self.base_scores = np.zeros(num_envs, dtype=np.int64)  # Agent's score at the last step
+
+    def reset(self) -> (np.ndarray, np.ndarray):
+        # Starts a new match in every game. Returns observations and legal action masks
+        self.batch.new_match()
+        self.base_scores[:] = 0
+        self.__advance()
+        return self.__observe()
+
+    def step(self, actions: np.ndarray) -> (np.ndarray, np.ndarray, np.ndarray, np.ndarray, dict):
+        # Plays the agent's actions (ignored in games with an empty mask) and everything up to its next decision.
+        # Returns observations, masks, rewards, dones and info
+        batch = self.batch
+        batch.step(actions, self.__waiting(batch.legal_actions()))
+        self.__advance()
+        scores = batch.scores[:, self.agent_seat]
+        rewards = (scores - self.base_scores).astype(np.float32)
+        dones = batch.match_over.copy() if self.episode == MATCH else batch.round_over.copy()
+        info = {"final_observation": self.encoder.encode_batch_game(batch, self.encoder.allocate(self.num_envs)),
+                "final_scores": batch.scores.copy()}
+        batch.new_match(dones & batch.match_over)
+        batch.new_round(dones & ~batch.match_over)
+        self.base_scores[:] = batch.scores[:, self.agent_seat]
+        self.__advance()
+        observations, masks = self.__observe()
+        return observations, masks, rewards, dones, info
+
+    def close(self):
+        pass
+
+    def __waiting(self, legal: np.ndarray) -> np.ndarray:
+        batch = self.batch
+        return ~batch.round_over & (batch.current_turn == self.agent_seat) & legal.any(axis=1)
+
+    def __advance(self):
+        # Plays the other seats and the agent's forced passes until every game waits for the agent or has ended its
+        # episode. Within a match episode, rounds that end are followed by new ones
+        batch = self.batch
+        while True:
+            legal = batch.legal_actions()
+            moving = ~batch.round_over & ~self.__waiting(legal)
+            if moving.any():
+                batch.step(self.__opponent_actions(legal, moving), moving)
+                continue
+            ended = batch.round_over & ~batch.match_over if self.episode == MATCH else None
+            if ended is None or not ended.any():
+                return
+            batch.new_round(ended)
+
+    def __opponent_actions(self, legal: np.ndarray, moving: np.ndarray) -> np.ndarray:
+        batch = self.batch
+        actions = np.zeros(self.num_envs, dtype=np.int64)
+        deciding = np.flatnonzero(moving & legal.any(axis=1))
+        if self.opponent is None:
+            actions[deciding] = np.argmax(batch.rng.random((len(deciding), self.num_actions)) * legal[deciding], axis=1)
+        elif len(deciding) != 0:
+            observations = self.encoder.encode_batch_game(batch, self.observations)
+            actions[deciding] = self.opponent(observations[deciding], legal[deciding])
+        return actions
+
+    def __observe(self) -> (np.ndarray, np.ndarray):
+        legal = self.batch.legal_actions()
+        legal &= self.__waiting(legal)[:, None]
+        return self.encoder.encode_batch_game(self.batch, self.encoder.allocate(self.num_envs)), legal
+
+
+def _worker(connection, settings: dict):
+    # Errors (such as an illegal action) are sent back in place of the result, for the parent to raise
+    env = VectorEnv(**settings)
+    while True:
+        command, data = connection.recv()
+        if command == "close":
+            break
+        try:
+            connection.send(env.reset() if command == "reset" else env.step(data))
+        except Exception as error:
+            connection.send(error)
+    connection.close()
+
+
+class AsyncVectorEnv:
+    # The same interface as VectorEnv, split over num_workers processes of envs_per_worker games each (opponent must be
+    # picklable). step_async sends actions and returns at once so the caller can work while the workers play;
+    # step_wait collects the results. Worker i is seeded with derive_seed(seed, i)
+    def __init__(self, num_workers: int, envs_per_worker: int, seed: int = None, **settings):
+        self.num_envs = num_workers * envs_per_worker
+        self.connections, self.processes = [], []
+        for i in range(num_workers):
+            connection, worker_connection = multiprocessing.Pipe()
+            worker_settings = dict(settings, num_envs=envs_per_worker,
+                                   seed=derive_seed(seed, i) if seed is not None else None)
+            process = multiprocessing.Process(target=_worker, args=(worker_connection, worker_settings), daemon=True)
+            process.start()
+            worker_connection.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+        self.envs_per_worker = envs_per_worker
+
+    def reset(self) -> (np.ndarray, np.ndarray):
+        for connection in self.connections:
+            connection.send(("reset", None))
+        results = self.__receive()
+        return tuple(np.concatenate(parts) for parts in zip(*results))
+
+    def step_async(self, actions: np.ndarray):
+        actions = np.asarray(actions)
+        for i in range(len(self.connections)):
+            self.connections[i].send(("step", actions[i * self.envs_per_worker:(i + 1) * self.envs_per_worker]))
+
+    def step_wait(self) -> (np.ndarray, np.ndarray, np.ndarray, np.ndarray, dict):
+        results = self.__receive()
+        observations, masks, rewards, dones = (np.concatenate(parts) for parts in zip(*(result[:4] for result in results)))
+        info = {key: np.concatenate([result[4][key] for result in results]) for key in results[0][4]}
+        return observations, masks, rewards, dones, info
+
+    def step(self, actions: np.ndarray) -> (np.ndarray, np.ndarray, np.ndarray, np.ndarray, dict):
+        self.step_async(actions)
+        return self.step_wait()
+
+    def close(self):
+        for connection in self.connections:
+            connection.send(("close", None))
+            connection.close()
+        for process in self.processes:
+            process.join()
+
+    def __receive(self) -> list:
+        # Every worker's result, raising the first worker error once all of them have answered
+        results = [connection.recv() for connection in self.connections]
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return results
+
+    def __enter__(self) -> "AsyncVectorEnv":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,195 @@
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from domino import Board, Direction, Domino, Game
+from domino_tables import nums_table
+
+MAGIC = b"DLOG\x03"
+INDEX_SUFFIX = ".idx"
+# Record header: seed's magnitude, match number, round number in the match, max_num, number of players, first turn,
+# hand size, number of actions, 1 if the seed is negative. Any seed below 2 ** 64 in magnitude round trips, such as
+# self_play.derive_seed's unsigned 64 bit ones. Then a little endian u32 score per player, the deal as one u8 dom id
+# per domino, then the actions
+HEADER = struct.Struct("<QIHBBBBHB")
+PLAY, DRAW, PASS = 0, 1, 2  # Action kinds
+
+
+def pack_action(kind: int, seat: int, value: int = 0) -> int:
+    # One u16 per action: kind (2 bits), seat (2 bits), then dom_id * 4 + Direction.value for a play or the drawn dom id
+    return kind << 14 | seat << 12 | value
+
+
+def unpack_action(code: int) -> (int, int, int):
+    return code >> 14, code >> 12 & 3, code & 0xFFF
+
+
+class GameLogWriter(Game.Observer):
+    # Appends one record per round to a binary log as the round ends, plus its offset to the index file next to it.
+    # Subscribe it to a Game. Records store the game's seed, or seed for games without one, so Game.replay can
+    # re-execute a match from its records. Players are limited to 4 and max_num to 15
+    def __init__(self, path: str, seed: int = 0):
+        self.path, self.seed = path, seed
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not new:  # Bring the index up to date with the log before appending to both
+            with GameLogReader(path) as reader:
+                reader.offsets.tofile(path + INDEX_SUFFIX)
+        self.file = open(path, "ab")
+        self.index_file = open(path + INDEX_SUFFIX, "ab")
+        if new:
+            self.file.write(MAGIC)
+            self.file.flush()
+        self.match, self.round = -1, 0
+        self.info, self.header, self.actions, self.negative = None, None, None, False
+
+    def close(self):
+        self.file.close()
+        self.index_file.close()
+
+    def __enter__(self) -> "GameLogWriter":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def on_match_start(self, game: Game):
+        self.match += 1
+        self.round = 0
+
+    def on_game_start(self, game: Game):
+        assert len(game.players) <= 4 and game.max_num <= 15
+        hands = [game.hands[player] for player in game.players]
+        self.header = bytearray()
+        self.header += struct.pack(f"<{len(hands)}I", *(game.scores[player] for player in game.players))
+        self.header += bytes(dom.get_id() for hand in hands for dom in hand)
+        self.actions = bytearray()
+        seed = game.seed if game.seed is not None else self.seed
+        assert abs(seed) < 1 << 64
+        self.negative = seed < 0
+        self.info = (abs(seed), max(self.match, 0), self.round, game.max_num, len(game.players), game.current_turn,
+                     len(hands[0]))
+
+    def on_play(self, game: Game, player_num: int, dom: Domino, direction: Direction):
+        self.actions += struct.pack("<H", pack_action(PLAY, player_num, dom.get_id() * 4 + direction.value))
+
+    def on_draw(self, game: Game, player_num: int):
+        drawn = game.hands[game.players[player_num]][-1]
+        self.actions += struct.pack("<H", pack_action(DRAW, player_num, drawn.get_id()))
+
+    def on_pass(self, game: Game, player_num: int):
+        self.actions += struct.pack("<H", pack_action(PASS, player_num))
+
+    def on_game_end(self, game: Game):
+        self.index_file.write(struct.pack("<Q", self.file.tell()))
+        self.file.write(HEADER.pack(*self.info, len(self.actions) // 2, self.negative))
+        self.file.write(self.header)
+        self.file.write(self.actions)
+        self.file.flush()
+        self.index_file.flush()
+        self.round += 1
+
+
+class GameRecord:
+    # One logged round. Only the header is decoded up front; actions and boards are unpacked when asked for
+    def __init__(self, buffer, offset: int):
+        (self.seed, self.match, self.round, self.max_num, self.num_players, self.first_turn, self.hand_size,
+         self.num_actions, negative) = HEADER.unpack_from(buffer, offset)
+        if negative:
+            self.seed = -self.seed
+        offset += HEADER.size
+        self.scores = list(struct.unpack_from(f"<{self.num_players}I", buffer, offset))
+        offset += 4 * self.num_players
+        size = self.num_players * self.hand_size
+        self.deal = np.frombuffer(buffer[offset:offset + size], np.uint8).reshape(self.num_players, -1)
+        offset += size
+        self.codes = np.frombuffer(buffer[offset:offset + 2 * self.num_actions], "<u2")  # Packed actions, see pack_action
+
+    def get_actions(self) -> list:
+        # Actions in Game.history form: (player number, dom id, Direction), dom id -1 for a draw and None for a pass
+        output = []
+        for code in self.codes.tolist():
+            kind, seat, value = unpack_action(code)
+            if kind == PLAY:
+                output.append((seat, value >> 2, Direction(value & 3)))
+            else:
+                output.append((seat, -1 if kind == DRAW else None, None))
+        return output
+
+    def get_hands(self) -> list:
+        # Dominoes dealt to each seat
+        table = nums_table(self.max_num)
+        return [[Domino(*table[i], self.max_num) for i in hand] for hand in self.deal.tolist()]
+
+    def iter_boards(self):
+        # Yields (action index, Board) after every play, building one Board as it goes
+        board = Board()
+        table = nums_table(self.max_num)
+        codes = self.codes.tolist()
+        for i in range(len(codes)):
+            kind, _, value = unpack_action(codes[i])
+            if kind == PLAY:
+                board.play_domino(Domino(*table[value >> 2], self.max_num), Direction(value & 3))
+                yield i, board
+
+    def get_board(self, num_actions: int) -> Board:
+        # Board after the first num_actions actions
+        board = Board()
+        table = nums_table(self.max_num)
+        for code in self.codes[:num_actions].tolist():
+            kind, _, value = unpack_action(code)
+            if kind == PLAY:
+                board.play_domino(Domino(*table[value >> 2], self.max_num), Direction(value & 3))
+        return board
+
+
+class GameLogReader:
+    # Random access to the rounds of a log written by GameLogWriter. The log is memory-mapped and records are only
+    # decoded when asked for. The index is rebuilt by scanning the log if it is missing or stale
+    def __init__(self, path: str):
+        self.file = open(path, "rb")
+        self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        assert self.buffer[:len(MAGIC)] == MAGIC
+        self.offsets = self.__read_index(path + INDEX_SUFFIX)
+
+    def close(self):
+        self.buffer.close()
+        self.file.close()
+
+    def __enter__(self) -> "GameLogReader":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __read_index(self, index_path: str) -> np.ndarray:
+        if os.path.exists(index_path):
+            offsets = np.fromfile(index_path, dtype="<u8")
+            if len(offsets) == 0:
+                end = len(MAGIC)
+            else:  # The last indexed record has to end where the log does
+                end = self.__record_end(int(offsets[-1])) if offsets[-1] < len(self.buffer) else -1
+            if end == len(self.buffer):
+                return offsets
+        offsets = []
+        offset = len(MAGIC)
+        while offset < len(self.buffer):
+            offsets.append(offset)
+            offset = self.__record_end(offset)
+        return np.array(offsets, dtype="<u8")
+
+    def __record_end(self, offset: int) -> int:
+        header = HEADER.unpack_from(self.buffer, offset)
+        num_players, hand_size, num_actions = header[4], header[6], header[7]
+        return offset + HEADER.size + 4 * num_players + num_players * hand_size + 2 * num_actions
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, n: int) -> GameRecord:
+        return GameRecord(self.buffer, int(self.offsets[n]))
+
+    def __iter__(self):
+        for offset in self.offsets.tolist():
+            yield GameRecord(self.buffer, offset)
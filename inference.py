@@ -0,0 +1,254 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from domino import Board, Direction, Game
+from encoder import ObservationEncoder
+from model import Model, masked_softmax
+from symmetry import INVERSES, canonical_position_key, transform_actions, transform_observations
+from zobrist import get_zobrist_keys
+
+
+class Histogram:
+    # Counts of recorded values per bucket. edges[i] is the inclusive upper bound of bucket i; a final bucket takes
+    # everything above the last edge
+    def __init__(self, edges: list):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.count, self.total = 0, 0.0
+
+    def record(self, value: float):
+        self.counts[np.searchsorted(self.edges, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count != 0 else 0.0
+
+    def percentile(self, q: float) -> float:
+        # Upper edge of the bucket holding the q-th percentile, inf if it is the overflow bucket
+        if self.count == 0:
+            return 0.0
+        bucket = int(np.searchsorted(np.cumsum(self.counts), q / 100 * self.count))
+        return float(self.edges[bucket]) if bucket < len(self.edges) else float("inf")
+
+    def to_string(self, scale: float = 1.0, unit: str = "") -> str:
+        # One row per non-empty bucket with its upper edge (times scale) and count
+        rows = []
+        for i in np.flatnonzero(self.counts):
+            edge = f"<= {self.edges[i] * scale:g}{unit}" if i < len(self.edges) else f"> {self.edges[-1] * scale:g}{unit}"
+            rows.append(f"{edge:>14} {self.counts[i]:>9}")
+        return "\n".join(rows)
+
+
+class _Request:
+    __slots__ = ("observation", "key", "result", "error", "done")
+
+    def __init__(self, observation: np.ndarray, key):
+        self.observation, self.key, self.result, self.error = observation, key, None, None
+        self.done = threading.Event()
+
+
+class InferenceServer:
+    # Evaluates observations for many games at once. Callers block in evaluate while a server thread gathers pending
+    # requests into batches of up to max_batch_size, waiting at most max_wait seconds after the first one, and runs the
+    # model once per batch. Results are memoized in an LRU cache of cache_size entries keyed by the caller's position
+    # key. Without start() (or a with block) every request is evaluated on its own in the calling thread.
+    # If the model raises, the server thread stops: the error is raised in every waiting evaluate and in every later one
+    def __init__(self, model: Model, max_batch_size: int = 64, max_wait: float = 0.001, cache_size: int = 1 << 16):
+        self.model, self.max_batch_size, self.max_wait, self.cache_size = model, max_batch_size, max_wait, cache_size
+        self.cache = OrderedDict()  # key -> (policy logits, value)
+        self.lock = threading.Lock()
+        self.requests = queue.Queue()
+        self.thread, self.error = None, None
+        self.hits, self.misses = 0, 0
+        self.latency = Histogram([1e-5 * 2 ** i for i in range(18)])  # Seconds, 10 us to 1.3 s
+        self.batch_sizes = Histogram(range(1, max_batch_size + 1))
+
+    def start(self):
+        assert self.thread is None
+        self.error = None
+        self.thread = threading.Thread(target=self.__serve, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        if self.thread is not None:
+            self.requests.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def __enter__(self) -> "InferenceServer":
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def evaluate(self, observation: np.ndarray, key=None) -> (np.ndarray, float):
+        # (policy logits, value) for one encoded observation. Positions with the same key share one cache entry;
+        # key None skips the cache. observation must not be reused by the caller until this returns
+        start = time.perf_counter()
+        result = None
+        if key is not None and self.cache_size != 0:
+            with self.lock:
+                result = self.cache.get(key)
+                if result is not None:
+                    self.cache.move_to_end(key)
+                    self.hits += 1
+        if result is None:
+            request = _Request(observation, key)
+            if self.thread is None:
+                self.__run_batch([request])
+            else:
+                self.requests.put(request)
+                if self.error is None:  # A server that failed before the put has drained the queue already
+                    request.done.wait()
+                if not request.done.is_set():
+                    raise self.error
+                if request.error is not None:
+                    raise request.error
+            result = request.result
+        with self.lock:
+            self.latency.record(time.perf_counter() - start)
+        return result
+
+    def evaluate_batch(self, observations: np.ndarray, keys: list = None) -> (np.ndarray, np.ndarray):
+        # Same as evaluate for callers that already hold a batch (e.g. a BatchGame), in the calling thread: cached keys
+        # are looked up, the rest go through the model in one call
+        start = time.perf_counter()
+        logits = np.empty((len(observations), self.model.num_actions), dtype=np.float32)
+        values = np.empty(len(observations), dtype=np.float32)
+        missing = list(range(len(observations)))
+        if keys is not None and self.cache_size != 0:
+            missing = []
+            with self.lock:
+                for i in range(len(observations)):
+                    result = self.cache.get(keys[i])
+                    if result is None:
+                        missing.append(i)
+                    else:
+                        self.cache.move_to_end(keys[i])
+                        logits[i], values[i] = result
+                self.hits += len(observations) - len(missing)
+        if len(missing) != 0:
+            requests = [_Request(observations[i], None if keys is None else keys[i]) for i in missing]
+            self.__run_batch(requests)
+            for i in range(len(missing)):
+                logits[missing[i]], values[missing[i]] = requests[i].result
+        with self.lock:
+            self.latency.record(time.perf_counter() - start)
+        return logits, values
+
+    def get_hit_rate(self) -> float:
+        return self.hits / (self.hits + self.misses) if self.hits + self.misses != 0 else 0.0
+
+    def summary(self) -> str:
+        return (f"Requests: {self.latency.count}, cache hit rate: {self.get_hit_rate():.1%}, "
+                f"mean batch size: {self.batch_sizes.mean():.1f}\n"
+                f"Latency: mean {self.latency.mean() * 1e6:.0f} us, p50 <= {self.latency.percentile(50) * 1e6:.0f} us, "
+                f"p99 <= {self.latency.percentile(99) * 1e6:.0f} us\n"
+                f"{self.latency.to_string(1e6, ' us')}\nBatch sizes:\n{self.batch_sizes.to_string()}")
+
+    def __serve(self):
+        running = True
+        while running:
+            request = self.requests.get()
+            if request is None:
+                break
+            batch = [request]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:  # Take whatever is already queued before waiting for more
+                    request = self.requests.get_nowait()
+                except queue.Empty:
+                    timeout = deadline - time.perf_counter()
+                    if timeout <= 0:
+                        break
+                    try:
+                        request = self.requests.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                if request is None:
+                    running = False
+                    break
+                batch.append(request)
+            try:
+                self.__run_batch(batch)
+            except Exception as error:
+                self.__fail(batch, error)
+                return
+
+    def __fail(self, batch: list, error: Exception):
+        # Hands error to the batch and everything queued, then to every later evaluate through self.error
+        self.error = error
+        while True:
+            try:
+                request = self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                batch.append(request)
+        for request in batch:
+            request.error = error
+            request.done.set()
+
+    def __run_batch(self, batch: list):
+        logits, values = self.model.predict(np.stack([request.observation for request in batch]))
+        with self.lock:
+            self.batch_sizes.record(len(batch))
+            self.misses += len(batch)
+            for i in range(len(batch)):
+                request = batch[i]
+                request.result = (logits[i].copy(), float(values[i]))
+                if request.key is not None and self.cache_size != 0:
+                    self.cache[request.key] = request.result
+                    if len(self.cache) > self.cache_size:
+                        self.cache.popitem(last=False)
+        for request in batch:
+            request.done.set()
+
+
+def position_key(board: Board, hand: list, pile_size: int, score_diff: int) -> tuple:
+    # Cache key of everything an ObservationEncoder sees: the board's Zobrist hash with the mover's hand, pile size
+    # and score differential. Works with Board and CompactBoard
+    output = board.get_hash()
+    if len(hand) != 0:
+        keys = get_zobrist_keys(hand[0].num_max, 1)
+        for dom in hand:
+            output ^= keys.hands[0][dom.get_id()]
+    return output, pile_size, score_diff
+
+
+class NetworkPlayer(Game.Player):
+    # Plays from the policy of an InferenceServer's model, sampling from the legal actions or, when greedy, taking the
+    # most likely one. With canonical, positions are evaluated in their symmetry.canonicalize orientation, so
+    # symmetric positions share cache entries. Thread safe as long as each thread has its own player
+    def __init__(self, server: InferenceServer, encoder: ObservationEncoder, greedy: bool = False, seed: int = None,
+                 canonical: bool = False):
+        self.server, self.encoder, self.greedy, self.canonical = server, encoder, greedy, canonical
+        self.rng = np.random.default_rng(seed)
+
+    def take_turn(self, current_board: Board, current_hand: list, curr_player_num: int, players: list, scores: dict, pile_size: int):
+        moves = Game.legal_moves(current_hand, current_board)
+        if len(moves) == 0:
+            return -1, None
+        player = players[curr_player_num]
+        score_diff = scores[player] - max(scores[other] for other in players if other is not player)
+        observation = self.encoder.encode(current_board, current_hand, pile_size, score_diff, self.encoder.allocate())
+        if self.canonical:
+            key, t = canonical_position_key(current_board, current_hand, pile_size, score_diff)
+            logits, _ = self.server.evaluate(transform_observations(observation, self.encoder, t), key)
+            logits = transform_actions(logits, INVERSES[t])
+        else:
+            logits, _ = self.server.evaluate(observation, position_key(current_board, current_hand, pile_size, score_diff))
+        mask = np.array(Game.action_mask(current_hand, current_board, pile_size, self.encoder.max_num))
+        probs = masked_softmax(logits, mask)
+        action = int(np.argmax(probs)) if self.greedy else int(self.rng.choice(len(probs), p=probs))
+        if action == len(mask) - 1:
+            return -1, None
+        dom_id, direction = divmod(action, len(Direction))
+        dom_index = next(i for i in range(len(current_hand)) if current_hand[i].get_id() == dom_id)
+        return dom_index, Direction(direction)
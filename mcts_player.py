@@ -0,0 +1,197 @@
+import math
+import random
+import time
+
+from belief import BeliefTracker
+from domino import Board, CompactBoard, Domino, Game
+from domino_tables import nums_table
+from zobrist import ZobristKeys, get_zobrist_keys
+
+DRAW, PASS = -1, -2  # Action keys besides dom_id * 4 + Direction.value
+
+
+def _hash_hand(hand: list, player_num: int, keys: ZobristKeys) -> int:
+    # Hash of player_num's hand. A position's key adds the board's own hash, turn and pile size
+    output = 0
+    for dom in hand:
+        output ^= keys.hands[player_num][dom.get_id()]
+    return output
+
+
+class _Simulation:
+    # One determinized round played forward from the real position on a CompactBoard, undone afterwards.
+    # The round is locked once every player has passed in a row
+    def __init__(self, board: CompactBoard, hands: list, pile: list, turn: int, root_player: int, keys: ZobristKeys):
+        self.board, self.hands, self.pile, self.turn, self.root_player, self.keys = board, hands, pile, turn, root_player, keys
+        self.gained = [0] * len(hands)
+        self.over = False
+        self.num_plays, self.num_passes = 0, 0
+        self.hash = _hash_hand(hands[root_player], root_player, keys)
+
+    def get_hash(self) -> int:
+        # Keyed on what the root player knows: board, own hand, pile size and whose turn it is
+        return self.hash ^ self.board.get_hash() ^ self.keys.turn[self.turn] ^ self.keys.pile_size[len(self.pile)]
+
+    def get_actions(self) -> list:
+        # (key, hand index, Direction). Drawing is only considered when no domino can be played
+        hand = self.hands[self.turn]
+        moves = Game.legal_moves(hand, self.board)
+        if len(moves) != 0:
+            return [(hand[i].get_id() * 4 + direction.value, i, direction) for i, direction in moves]
+        return [(DRAW, -1, None)] if len(self.pile) != 0 else [(PASS, -1, None)]
+
+    def apply(self, action: tuple):
+        key, dom_index, direction = action
+        hand = self.hands[self.turn]
+        if key == PASS:
+            self.num_passes += 1
+            self.over = self.num_passes == len(self.hands)
+            self.turn = (self.turn + 1) % len(self.hands)
+            return
+        self.num_passes = 0
+        if key == DRAW:
+            dom = self.pile.pop()
+            hand.append(dom)
+            if self.turn == self.root_player:
+                self.hash ^= self.keys.hands[self.turn][dom.get_id()]
+            return
+        dom = hand.pop(dom_index)
+        self.board.play_domino(dom, direction)
+        self.num_plays += 1
+        if self.turn == self.root_player:
+            self.hash ^= self.keys.hands[self.turn][dom.get_id()]
+        board_sum = self.board.get_board_sum()
+        if board_sum % 5 == 0:
+            self.gained[self.turn] += board_sum
+        if len(hand) == 0:
+            for other in self.hands:
+                self.gained[self.turn] += (sum(dom.num_a + dom.num_b for dom in other) + 2) // 5 * 5
+            self.over = True
+            return
+        self.turn = (self.turn + 1) % len(self.hands)
+
+    def get_rewards(self) -> list:
+        # Points gained by each player minus the best opponent, scaled to roughly -1..1
+        rewards = []
+        for seat in range(len(self.gained)):
+            best_other = max(self.gained[other] for other in range(len(self.gained)) if other != seat)
+            rewards.append((self.gained[seat] - best_other) / 50)
+        return rewards
+
+    def undo(self):
+        for _ in range(self.num_plays):
+            self.board.undo()
+
+
+class MCTSPlayer(Game.Player, Game.Observer):
+    # Determinized Monte Carlo tree search. Every rollout deals the unseen dominoes randomly to the opponents and the
+    # pile, walks the tree with UCT, then plays the rest of the round randomly. Statistics live in a transposition table
+    # keyed by a Zobrist hash of what this player knows, so they are shared between determinizations and moves.
+    # Subscribe the player to the game (game.subscribe(player)) so it knows the opponents' hand sizes; otherwise the
+    # unseen dominoes are split evenly between them. With a BeliefTracker for the player's seat (also subscribed), deals
+    # are sampled from it instead, so they respect what passes reveal.
+    def __init__(self, rollouts: int = 200, time_limit: float = None, exploration: float = 0.7, seed: int = None,
+                 belief: BeliefTracker = None):
+        self.rollouts, self.time_limit, self.exploration, self.belief = rollouts, time_limit, exploration, belief
+        self.rng = random.Random(seed)
+        self.table = {}  # hash -> [visits, {action key: [visits, total reward]}]
+        self.hand_sizes = None
+        self.total_rollouts, self.total_seconds = 0, 0.0
+
+    def on_game_start(self, game: Game):
+        self.table.clear()
+        self.hand_sizes = None
+
+    def on_turn(self, game: Game, player_num: int):
+        self.hand_sizes = [len(game.hands[player]) for player in game.players]
+
+    def get_rollouts_per_second(self) -> float:
+        return self.total_rollouts / self.total_seconds if self.total_seconds > 0 else 0.0
+
+    def take_turn(self, current_board: Board, current_hand: list, curr_player_num: int, players: list, scores: dict, pile_size: int):
+        moves = Game.legal_moves(current_hand, current_board)
+        if len(moves) == 0:
+            return -1, None
+        if len(moves) == 1:
+            return moves[0]
+        start = time.perf_counter()
+        board = current_board.to_compact() if isinstance(current_board, Board) else current_board
+        unseen = self.__get_unseen(board, current_hand)
+        hand_sizes = self.__get_hand_sizes(curr_player_num, len(players), len(current_hand), len(unseen), pile_size)
+        keys = get_zobrist_keys(current_hand[0].num_max, len(players))
+        rollouts = 0
+        while (self.rollouts is None or rollouts < self.rollouts) and (
+                self.time_limit is None or time.perf_counter() - start < self.time_limit):
+            self.__rollout(board, current_hand, unseen, hand_sizes, curr_player_num, keys)
+            rollouts += 1
+        self.total_rollouts += rollouts
+        self.total_seconds += time.perf_counter() - start
+
+        root_hash = (_hash_hand(current_hand, curr_player_num, keys) ^ board.get_hash() ^ keys.turn[curr_player_num]
+                     ^ keys.pile_size[pile_size])
+        stats = self.table.get(root_hash, [0, {}])[1]
+        return max(moves, key=lambda move: stats.get(current_hand[move[0]].get_id() * 4 + move[1].value, [0])[0])
+
+    def __get_unseen(self, board: CompactBoard, hand: list) -> list:
+        max_num = hand[0].num_max
+        seen = {dom.get_id() for dom in hand} | {play[0].get_id() for play in board.history}
+        return [Domino(*nums_table(max_num)[i], max_num) for i in range(len(nums_table(max_num))) if i not in seen]
+
+    def __get_hand_sizes(self, me: int, num_players: int, hand_size: int, num_unseen: int, pile_size: int) -> list:
+        # The sizes seen in on_turn if they still fit this position, else the unseen dominoes not in the pile split
+        # evenly between the opponents
+        in_hands = num_unseen - pile_size
+        sizes = self.hand_sizes
+        if (sizes is not None and len(sizes) == num_players and sizes[me] == hand_size
+                and sum(sizes) == hand_size + in_hands):
+            return sizes
+        sizes = [in_hands // (num_players - 1) + (1 if i < in_hands % (num_players - 1) else 0) for i in range(num_players - 1)]
+        sizes.insert(me, hand_size)
+        return sizes
+
+    def __deal(self, hand: list, unseen: list, hand_sizes: list, me: int) -> list:
+        hands, position = [], 0
+        for seat in range(len(hand_sizes)):
+            if seat == me:
+                hands.append(list(hand))
+            else:
+                hands.append(unseen[position:position + hand_sizes[seat]])
+                position += hand_sizes[seat]
+        return hands
+
+    def __rollout(self, board: CompactBoard, hand: list, unseen: list, hand_sizes: list, me: int, keys: ZobristKeys):
+        if self.belief is not None:
+            hands, pile = self.belief.sample_hands(self.rng)
+            hands[me] = list(hand)
+            self.rng.shuffle(pile)
+        else:
+            unseen = list(unseen)
+            self.rng.shuffle(unseen)
+            hands = self.__deal(hand, unseen, hand_sizes, me)
+            pile = unseen[sum(hand_sizes) - len(hand):]
+        simulation = _Simulation(board, hands, pile, me, me, keys)
+        path = []
+        while not simulation.over:  # Selection and expansion
+            actions = simulation.get_actions()
+            node = self.table.setdefault(simulation.get_hash(), [0, {}])
+            untried = [action for action in actions if action[0] not in node[1]]
+            if len(untried) != 0:
+                action = self.rng.choice(untried)
+                node[1][action[0]] = [0, 0.0]
+                path.append((node, action[0], simulation.turn))
+                simulation.apply(action)
+                break
+            log_visits = math.log(node[0] + 1)
+            action = max(actions, key=lambda a: node[1][a[0]][1] / node[1][a[0]][0] +
+                         self.exploration * math.sqrt(log_visits / node[1][a[0]][0]))
+            path.append((node, action[0], simulation.turn))
+            simulation.apply(action)
+        while not simulation.over:  # Random playout
+            simulation.apply(self.rng.choice(simulation.get_actions()))
+        rewards = simulation.get_rewards()
+        for node, key, seat in path:
+            node[0] += 1
+            stats = node[1][key]
+            stats[0] += 1
+            stats[1] += rewards[seat]
+        simulation.undo()
@@ -0,0 +1,70 @@
+import numpy as np
+
+
+def masked_softmax(logits: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    # Softmax over the last axis with illegal actions at exactly 0
+    logits = np.where(mask, logits, -np.inf)
+    exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class Model:
+    # Policy/value network in plain NumPy: one ReLU hidden layer feeding a policy head over BatchGame's actions
+    # (dom_id * 4 + Direction.value, then draw) and a tanh value head. Runs on the CPU only
+    def __init__(self, input_size: int, num_actions: int, hidden_size: int = 256, seed: int = None, dtype=np.float32):
+        self.input_size, self.num_actions, self.hidden_size = input_size, num_actions, hidden_size
+        rng = np.random.default_rng(seed)
+        self.params = {
+            "w1": rng.normal(0, np.sqrt(2 / input_size), (input_size, hidden_size)).astype(dtype),
+            "b1": np.zeros(hidden_size, dtype=dtype),
+            "wp": rng.normal(0, np.sqrt(1 / hidden_size), (hidden_size, num_actions)).astype(dtype),
+            "bp": np.zeros(num_actions, dtype=dtype),
+            "wv": rng.normal(0, np.sqrt(1 / hidden_size), (hidden_size, 1)).astype(dtype),
+            "bv": np.zeros(1, dtype=dtype),
+        }
+
+    def predict(self, observations: np.ndarray) -> (np.ndarray, np.ndarray):
+        # Policy logits [batch, num_actions] and values in -1..1 [batch] for a batch of encoded observations
+        hidden = np.maximum(observations @ self.params["w1"] + self.params["b1"], 0)
+        logits = hidden @ self.params["wp"] + self.params["bp"]
+        values = np.tanh(hidden @ self.params["wv"] + self.params["bv"])[:, 0]
+        return logits, values
+
+    def train_step(self, observations: np.ndarray, masks: np.ndarray, actions: np.ndarray, targets: np.ndarray,
+                   learning_rate: float = 0.01, weights: np.ndarray = None) -> (float, float):
+        # One SGD step on the cross entropy of the taken actions under the masked policy plus the squared value error.
+        # weights scales each sample's cross entropy, e.g. by its advantage for a policy gradient step (all 1 if None).
+        # Returns (policy loss, value loss) before the step
+        batch_size = len(observations)
+        rows = np.arange(batch_size)
+        params = self.params
+        pre_hidden = observations @ params["w1"] + params["b1"]
+        hidden = np.maximum(pre_hidden, 0)
+        probs = masked_softmax(hidden @ params["wp"] + params["bp"], masks)
+        values = np.tanh(hidden @ params["wv"] + params["bv"])[:, 0]
+        if weights is None:
+            weights = np.ones(batch_size, dtype=probs.dtype)
+        policy_loss = float(-(weights * np.log(probs[rows, actions] + 1e-12)).mean())
+        value_loss = float(((values - targets) ** 2).mean())
+
+        d_logits = probs
+        d_logits[rows, actions] -= 1
+        d_logits *= (weights / batch_size)[:, None]
+        d_values = (2 * (values - targets) * (1 - values ** 2) / batch_size)[:, None]
+        d_hidden = (d_logits @ params["wp"].T + d_values @ params["wv"].T) * (pre_hidden > 0)
+        grads = {"w1": observations.T @ d_hidden, "b1": d_hidden.sum(axis=0),
+                 "wp": hidden.T @ d_logits, "bp": d_logits.sum(axis=0),
+                 "wv": hidden.T @ d_values, "bv": d_values.sum(axis=0)}
+        for name, grad in grads.items():
+            params[name] -= (learning_rate * grad).astype(params[name].dtype)
+        return policy_loss, value_loss
+
+    def save(self, path: str):
+        np.savez(path, **self.params)
+
+    @staticmethod
+    def load(path: str) -> "Model":
+        with np.load(path) as params:
+            model = Model(params["w1"].shape[0], params["wp"].shape[1], params["w1"].shape[1], dtype=params["w1"].dtype)
+            model.params = {name: params[name] for name in params.files}
+        return model
@@ -0,0 +1,83 @@
+import time
+
+
+class Profiler:
+    # Nested phase timers and event counters. Assign one to game.profiler to time a Game: phases nest as
+    # match;round;{legal_moves, player, play_domino, get_board_sum}, and plays, draws, passes, illegal attempts, locked
+    # rounds, rounds and matches are counted. With game.profiler left as None the game only pays a None check per phase.
+    # Players and other code can add their own phases with start/stop (or phase) and count
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.total = {}  # Phase path (names joined by ";") -> seconds including nested phases
+        self.self_time = {}  # Phase path -> seconds outside nested phases
+        self.calls = {}
+        self.counters = {}
+        self.stack = []  # [path, start time, seconds spent in nested phases]
+
+    def start(self, name: str):
+        path = self.stack[-1][0] + ";" + name if len(self.stack) != 0 else name
+        self.stack.append([path, self.clock(), 0.0])
+
+    def stop(self):
+        path, start, nested = self.stack.pop()
+        elapsed = self.clock() - start
+        self.total[path] = self.total.get(path, 0.0) + elapsed
+        self.self_time[path] = self.self_time.get(path, 0.0) + elapsed - nested
+        self.calls[path] = self.calls.get(path, 0) + 1
+        if len(self.stack) != 0:
+            self.stack[-1][2] += elapsed
+
+    def phase(self, name: str) -> "_Phase":
+        # with profiler.phase(name): ... for code outside hot loops
+        return _Phase(self, name)
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reset(self):
+        assert len(self.stack) == 0
+        self.total.clear()
+        self.self_time.clear()
+        self.calls.clear()
+        self.counters.clear()
+
+    def summary(self) -> str:
+        # Phases in call tree order with calls, total and self time and share of all root phase time, then counters
+        root_seconds = sum(seconds for path, seconds in self.total.items() if ";" not in path)
+        rows = [f"{'phase':<40} {'calls':>9} {'total ms':>10} {'self ms':>10} {'us/call':>9} {'%':>6}"]
+        for path in sorted(self.total):
+            depth = path.count(";")
+            name = "  " * depth + path.rsplit(";", 1)[-1]
+            total, calls = self.total[path], self.calls[path]
+            share = 100 * total / root_seconds if root_seconds > 0 else 0.0
+            rows.append(f"{name:<40} {calls:>9} {total * 1e3:>10.1f} {self.self_time[path] * 1e3:>10.1f} "
+                        f"{total / calls * 1e6:>9.2f} {share:>5.1f}%")
+        if len(self.counters) != 0:
+            rows.append("")
+            rows.append(f"{'counter':<40} {'count':>9}")
+            for name in sorted(self.counters):
+                rows.append(f"{name:<40} {self.counters[name]:>9}")
+        return "\n".join(rows)
+
+    def to_folded(self) -> str:
+        # Folded stacks ("match;round;player 1234", self time in microseconds), as read by flamegraph.pl, inferno and
+        # speedscope
+        return "\n".join(f"{path} {round(self.self_time[path] * 1e6)}" for path in sorted(self.self_time)
+                         if round(self.self_time[path] * 1e6) > 0) + "\n"
+
+    def write_folded(self, path: str):
+        with open(path, "w") as folded_file:
+            folded_file.write(self.to_folded())
+
+
+class _Phase:
+    __slots__ = ("profiler", "name")
+
+    def __init__(self, profiler: Profiler, name: str):
+        self.profiler, self.name = profiler, name
+
+    def __enter__(self):
+        self.profiler.start(self.name)
+
+    def __exit__(self, *args):
+        self.profiler.stop()
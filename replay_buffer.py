@@ -0,0 +1,192 @@
+import json
+import math
+import os
+
+import numpy as np
+
+from domino import Game
+from domino_tables import get_num_doms
+
+META_FILE = "meta.json"
+
+
+class ReplayBuffer:
+    # Fixed capacity ring of transitions. fields maps a name to (shape, dtype) of one entry; every field lives in its
+    # own array, in memory or, when path is given, as a memory-mapped .npy file in that directory.
+    # Priorities (raised to alpha) are kept in a sum tree so prioritized sampling and updates are O(log capacity)
+    def __init__(self, capacity: int, fields: dict, path: str = None, alpha: float = 0.6, seed: int = None,
+                 _mode: str = "w+"):
+        self.capacity, self.path, self.alpha = capacity, path, alpha
+        self.fields = {name: (tuple(shape), np.dtype(dtype).str) for name, (shape, dtype) in fields.items()}
+        self.rng = np.random.default_rng(seed)
+        self.size, self.position, self.max_priority = 0, 0, 1.0
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            if _mode == "r+":
+                self.__read_meta()
+        self.arrays = {name: self.__allocate(name, shape, dtype, _mode) for name, (shape, dtype) in self.fields.items()}
+        self.priorities = self.__allocate("priority", (), np.float64, _mode)
+        self.tree_size = 1 << max(0, math.ceil(math.log2(capacity)))
+        self.tree = np.zeros(2 * self.tree_size)
+        if self.size != 0:
+            self.__set_tree(np.arange(self.size), self.priorities[:self.size] ** self.alpha)
+        if path is not None:
+            self.flush()
+
+    @staticmethod
+    def open(path: str, seed: int = None) -> "ReplayBuffer":
+        # Maps an existing buffer directory back in place, without reading or copying its arrays
+        with open(os.path.join(path, META_FILE)) as meta_file:
+            meta = json.load(meta_file)
+        return ReplayBuffer(meta["capacity"], meta["fields"], path, meta["alpha"], seed, _mode="r+")
+
+    def __allocate(self, name: str, shape: tuple, dtype, mode: str) -> np.ndarray:
+        if self.path is None:
+            return np.zeros((self.capacity,) + tuple(shape), dtype=dtype)
+        return np.lib.format.open_memmap(os.path.join(self.path, f"{name}.npy"), mode=mode, dtype=dtype,
+                                         shape=(self.capacity,) + tuple(shape))
+
+    def __read_meta(self):
+        with open(os.path.join(self.path, META_FILE)) as meta_file:
+            meta = json.load(meta_file)
+        self.size, self.position, self.max_priority = meta["size"], meta["position"], meta["max_priority"]
+
+    def flush(self):
+        # Writes the arrays and the ring position to disk. No-op for in-memory buffers
+        if self.path is None:
+            return
+        for array in list(self.arrays.values()) + [self.priorities]:
+            array.flush()
+        meta = {"capacity": self.capacity, "fields": self.fields, "alpha": self.alpha, "size": self.size,
+                "position": self.position, "max_priority": self.max_priority}
+        with open(os.path.join(self.path, META_FILE), "w") as meta_file:
+            json.dump(meta, meta_file)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, **values):
+        # Overwrites the oldest entry once full. New entries get the highest priority seen so far
+        i = self.position
+        for name, value in values.items():
+            self.arrays[name][i] = value
+        self.priorities[i] = self.max_priority
+        self.__set_tree(np.array([i]), np.array([self.max_priority ** self.alpha]))
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def extend(self, **values):
+        # Appends a batch, each value having the batch as its first axis
+        count = len(next(iter(values.values())))
+        indices = (self.position + np.arange(count)) % self.capacity
+        for name, value in values.items():
+            self.arrays[name][indices] = value
+        self.priorities[indices] = self.max_priority
+        self.__set_tree(indices, np.full(count, self.max_priority ** self.alpha))
+        self.position = int((self.position + count) % self.capacity)
+        self.size = min(self.size + count, self.capacity)
+
+    def get(self, indices: np.ndarray) -> dict:
+        return {name: array[indices] for name, array in self.arrays.items()}
+
+    def sample(self, batch_size: int) -> (np.ndarray, dict):
+        assert self.size > 0
+        indices = self.rng.integers(0, self.size, size=batch_size)
+        return indices, self.get(indices)
+
+    def sample_prioritized(self, batch_size: int, beta: float = 0.4) -> (np.ndarray, dict, np.ndarray):
+        # Stratified sampling proportional to priority ** alpha, with importance weights scaled to a maximum of 1
+        assert self.size > 0
+        total = self.tree[1]
+        targets = (np.arange(batch_size) + self.rng.random(batch_size)) * (total / batch_size)
+        nodes = np.ones(batch_size, dtype=np.int64)
+        while nodes[0] < self.tree_size:
+            left = self.tree[2 * nodes]
+            go_right = targets >= left
+            targets -= left * go_right
+            nodes = 2 * nodes + go_right
+        indices = np.minimum(nodes - self.tree_size, self.size - 1)
+        weights = (self.size * self.tree[indices + self.tree_size] / total) ** -beta
+        return indices, self.get(indices), weights / weights.max()
+
+    def update_priorities(self, indices: np.ndarray, priorities: np.ndarray):
+        priorities = np.abs(priorities) + 1e-6
+        self.priorities[indices] = priorities
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.__set_tree(indices, priorities ** self.alpha)
+
+    def __set_tree(self, indices: np.ndarray, values: np.ndarray):
+        nodes = indices + self.tree_size
+        self.tree[nodes] = values
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            if nodes[0] == 1:
+                break
+            nodes = np.unique(nodes // 2)
+
+
+def board_state_array(game: Game, player_num: int) -> np.ndarray:
+    # Board.get_board_state as ids with -1 for empty
+    return np.array([-1 if x is None else x for x in game.board.get_board_state()], dtype=np.int16)
+
+
+class ReplayRecorder(Game.Observer):
+    # Feeds a ReplayBuffer from a running Game: one (state, mask, action, reward, return) transition per play or draw,
+    # with the points the mover scored on that turn as reward and, as return, the mover's points minus the mean of
+    # everyone else's from that turn until the round ends. A round's transitions reach the buffer when it ends.
+    # encode(game, player_num) gives the state before the move; it is copied, so encoders may reuse one output buffer
+    # (ObservationEncoder.encode_game without out)
+    def __init__(self, buffer: ReplayBuffer, max_num: int, encode=board_state_array):
+        self.buffer, self.max_num, self.encode = buffer, max_num, encode
+        self.pending, self.round, self.scores = None, [], []  # scores: (transition index, seat, points)
+
+    @staticmethod
+    def fields(state_shape: tuple, max_num: int, state_dtype=np.int16) -> dict:
+        return {"state": (state_shape, state_dtype),
+                "mask": ((get_num_doms(max_num) * 4 + 1,), np.bool_),
+                "action": ((), np.int32),
+                "reward": ((), np.float32),
+                "return": ((), np.float32)}
+
+    def on_game_start(self, game: Game):
+        self.pending, self.round, self.scores = None, [], []
+
+    def on_turn(self, game: Game, player_num: int):
+        self.__flush_pending()
+        hand = game.hands[game.players[player_num]]
+        mask = Game.action_mask(hand, game.board, len(game.pile), self.max_num)
+        self.pending = {"state": np.array(self.encode(game, player_num)), "mask": mask, "action": -1, "reward": 0.0,
+                        "seat": player_num}
+
+    def on_play(self, game: Game, player_num: int, dom, direction):
+        self.pending["action"] = dom.get_id() * 4 + direction.value
+
+    def on_draw(self, game: Game, player_num: int):
+        self.pending["action"] = len(self.pending["mask"]) - 1
+
+    def on_score(self, game: Game, player_num: int, points: int):
+        if self.pending is not None:
+            self.pending["reward"] += points
+        self.scores.append((len(self.round), player_num, points))
+
+    def on_game_end(self, game: Game):
+        self.__flush_pending()
+        others = len(game.players) - 1
+        totals, position = [0.0] * len(game.players), len(self.scores)
+        for i in range(len(self.round) - 1, -1, -1):  # Points from transition i on, walking back from the round's end
+            while position > 0 and self.scores[position - 1][0] >= i:
+                position -= 1
+                _, seat, points = self.scores[position]
+                totals[seat] += points
+            transition = self.round[i]
+            seat = transition.pop("seat")
+            transition["return"] = totals[seat] - (sum(totals) - totals[seat]) / others
+        for transition in self.round:
+            self.buffer.append(**transition)
+        self.round, self.scores = [], []
+
+    def __flush_pending(self):
+        if self.pending is not None and self.pending["action"] != -1:  # Forced passes are not decisions
+            self.round.append(self.pending)
+        self.pending = None
@@ -0,0 +1,77 @@
+import hashlib
+import inspect
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+
+from domino import Game
+
+# moves holds Game.history: one list of (player number, dom id, Direction) per round.
+# worker is the pid of the process that played the match and seconds the time it took there
+MatchRecord = namedtuple("MatchRecord", "index seed moves scores winner worker seconds")
+
+
+def derive_seed(seed: int, index: int) -> int:
+    # Independent 64 bit seed for match index, so results don't depend on which worker plays which match
+    return int.from_bytes(hashlib.sha256(f"{seed}:{index}".encode()).digest()[:8], "little")
+
+
+def make_player(player_type, seed: int) -> Game.Player:
+    # player_type(seed=seed) if it takes a seed keyword (or **kwargs), else player_type(). Players that draw on
+    # unseeded randomness make their matches unreproducible
+    try:
+        parameters = inspect.signature(player_type).parameters.values()
+    except (TypeError, ValueError):  # No signature to inspect
+        return player_type(seed=seed)
+    if any(parameter.name == "seed" or parameter.kind is parameter.VAR_KEYWORD for parameter in parameters):
+        return player_type(seed=seed)
+    return player_type()
+
+
+def _play_match(task: tuple) -> MatchRecord:
+    index, seed, player_types, max_num, score_to_win = task
+    players = [make_player(player_types[seat], derive_seed(seed, seat)) for seat in range(len(player_types))]
+    game = Game(max_num, score_to_win, players, seed)
+    start = time.perf_counter()
+    game.play_match()
+    seconds = time.perf_counter() - start
+    scores = [game.scores[player] for player in players]
+    winner = next(i for i in range(len(scores)) if scores[i] >= score_to_win)
+    return MatchRecord(index, seed, game.history, scores, winner, os.getpid(), seconds)
+
+
+class SelfPlay:
+    # Plays matches between fresh instances of player_types on a process pool and yields each MatchRecord as soon as
+    # its match finishes. player_types are Game.Player classes or other picklable factories (functools.partial).
+    # Match i is always seeded with derive_seed(seed, i), and player_types that take a seed keyword are called with
+    # one derived from it for each seat, the rest with no arguments (see make_player). Game.replay can re-execute
+    # any record
+    def __init__(self, player_types: list, max_num: int = 6, score_to_win: int = 200, seed: int = 0,
+                 processes: int = None):
+        self.player_types = player_types
+        self.max_num, self.score_to_win, self.seed = max_num, score_to_win, seed
+        self.processes = processes if processes is not None else os.cpu_count()
+        self.worker_stats = {}  # worker -> [matches played, seconds spent playing]
+        self.wall_seconds = 0.0
+
+    def play(self, num_matches: int, chunksize: int = 1):
+        tasks = ((i, derive_seed(self.seed, i), self.player_types, self.max_num, self.score_to_win)
+                 for i in range(num_matches))
+        start = time.perf_counter()
+        with multiprocessing.Pool(self.processes) as pool:
+            for record in pool.imap_unordered(_play_match, tasks, chunksize):
+                stats = self.worker_stats.setdefault(record.worker, [0, 0.0])
+                stats[0] += 1
+                stats[1] += record.seconds
+                self.wall_seconds += time.perf_counter() - start
+                yield record
+                start = time.perf_counter()  # The caller's time with the record is not the pool's
+
+    def get_worker_rates(self) -> dict:
+        # Matches per second of each worker while it was playing
+        return {worker: matches / seconds for worker, (matches, seconds) in self.worker_stats.items() if seconds > 0}
+
+    def get_total_rate(self) -> float:
+        matches = sum(matches for matches, _ in self.worker_stats.values())
+        return matches / self.wall_seconds if self.wall_seconds > 0 else 0.0
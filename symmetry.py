@@ -0,0 +1,164 @@
+from functools import lru_cache
+
+import numpy as np
+
+from domino import Board, Direction, DIRECTIONS
+from encoder import ObservationEncoder
+from zobrist import get_zobrist_keys, hash_ends
+
+# Relabelings of the board's arms that keep All Fives play and scoring intact, PERMUTATIONS[t][d] being the arm that
+# arm d becomes. Swapping north with south or east with west is always allowed (east and west only need both of
+# north and south out). Swapping the two pairs, as in a quarter turn, is only allowed once all four arms are out.
+# Permuting pip values never is: board sums, and so scores, depend on them
+N, E, S, W = (direction.value for direction in DIRECTIONS)
+PERMUTATIONS = ((N, E, S, W), (S, E, N, W), (N, W, S, E), (S, W, N, E),  # Always allowed
+                (E, S, W, N), (W, N, E, S), (E, N, W, S), (W, S, E, N))  # All four arms out
+IDENTITY, NUM_ALWAYS = 0, 4
+
+
+def _inverse(t: int) -> int:
+    return next(u for u in range(len(PERMUTATIONS))
+                if all(PERMUTATIONS[u][PERMUTATIONS[t][d]] == d for d in range(len(DIRECTIONS))))
+
+
+INVERSES = tuple(_inverse(t) for t in range(len(PERMUTATIONS)))
+
+
+def get_ends(board: Board) -> (int, list, list):
+    # (spinner, out facing number of each arm, whether each arm ends in a double) as CompactBoard stores them, -1 for
+    # nothing. Works with Board and CompactBoard
+    if not isinstance(board, Board):
+        return board.spinner, board.ends, board.end_doubles
+    if board.spinner is None:
+        if len(board.north) == 0:
+            return -1, [-1, -1, -1, -1], [False, False, False, False]
+        ends = [-1, -1, -1, -1]
+        ends[N], ends[S] = board.north[-1].get_out_facing_number(), board.north[0].get_in_facing_number()
+        return -1, ends, [False, False, False, False]
+    stacks = (board.north, board.east, board.south, board.west)
+    return (board.spinner.num_a, [stack[-1].get_out_facing_number() if len(stack) != 0 else -1 for stack in stacks],
+            [len(stack) != 0 and stack[-1].is_double() for stack in stacks])
+
+
+def get_transforms(board: Board) -> range:
+    # Transforms allowed on board. Only the identity on an empty board, where the first domino always goes north
+    spinner, ends, _ = get_ends(board)
+    if spinner == -1 and ends[N] == -1:
+        return range(1)
+    return range(len(PERMUTATIONS)) if -1 not in ends else range(NUM_ALWAYS)
+
+
+def transform_ends(ends: list, t: int) -> list:
+    # Per arm values (ends, end doubles, ...) after transform t
+    output = [None] * len(ends)
+    for d in range(len(ends)):
+        output[PERMUTATIONS[t][d]] = ends[d]
+    return output
+
+
+def canonicalize(board: Board) -> (int, tuple):
+    # (transform, canonical spinner and ends) for board: the allowed transform giving the smallest ends and end
+    # doubles, the first one on ties. Positions that differ by an allowed transform share the canonical form
+    spinner, ends, end_doubles = get_ends(board)
+    best, best_form = IDENTITY, None
+    for t in get_transforms(board):
+        form = (spinner, *transform_ends(ends, t), *transform_ends(end_doubles, t))
+        if best_form is None or form < best_form:
+            best, best_form = t, form
+    return best, best_form
+
+
+def canonical_hash(board: Board, t: int) -> int:
+    # board.get_hash() of board seen through transform t
+    if board.keys is None:
+        return 0
+    spinner, ends, end_doubles = get_ends(board)
+    return board.played_hash ^ hash_ends(spinner, transform_ends(ends, t), transform_ends(end_doubles, t), board.keys)
+
+
+def canonical_position_key(board: Board, hand: list, pile_size: int, score_diff: int) -> (tuple, int):
+    # inference.position_key of the canonical form of the position, and the transform that leads there
+    t, _ = canonicalize(board)
+    output = canonical_hash(board, t)
+    if len(hand) != 0:
+        keys = get_zobrist_keys(hand[0].num_max, 1)
+        for dom in hand:
+            output ^= keys.hands[0][dom.get_id()]
+    return (output, pile_size, score_diff), t
+
+
+def transform_direction(direction: Direction, t: int) -> Direction:
+    return Direction(PERMUTATIONS[t][direction.value])
+
+
+def transform_action(action: int, t: int, num_actions: int) -> int:
+    # Action dom_id * 4 + Direction.value after transform t; the draw action (the last) stays put
+    if action == num_actions - 1:
+        return action
+    dom_id, d = divmod(action, len(DIRECTIONS))
+    return dom_id * len(DIRECTIONS) + PERMUTATIONS[t][d]
+
+
+@lru_cache(maxsize=None)
+def _action_sources(num_actions: int, t: int) -> np.ndarray:
+    # sources[a]: the action that transform t turns into a
+    sources = np.arange(num_actions)
+    for action in range(num_actions - 1):
+        sources[transform_action(action, t, num_actions)] = action
+    return sources
+
+
+def transform_actions(values: np.ndarray, t: int) -> np.ndarray:
+    # Per action values (masks, logits, policies) over the last axis after transform t
+    return values[..., _action_sources(values.shape[-1], t)]
+
+
+@lru_cache(maxsize=None)
+def _observation_sources(max_num: int, t: int) -> np.ndarray:
+    encoder = ObservationEncoder(max_num)
+    sources = np.arange(encoder.size)
+    for d in range(len(DIRECTIONS)):
+        to = PERMUTATIONS[t][d]
+        for n in range(encoder.num_nums):
+            sources[encoder.open_offset + to * encoder.num_nums + n] = encoder.open_offset + d * encoder.num_nums + n
+        sources[encoder.occupied_offset + to] = encoder.occupied_offset + d
+        sources[encoder.double_offset + to] = encoder.double_offset + d
+    return sources
+
+
+def transform_observations(observations: np.ndarray, encoder: ObservationEncoder, t: int) -> np.ndarray:
+    # ObservationEncoder vectors (over the last axis) after transform t
+    return observations[..., _observation_sources(encoder.max_num, t)]
+
+
+def allowed_transforms(observations: np.ndarray, encoder: ObservationEncoder) -> np.ndarray:
+    # (batch, transforms) whether each transform is allowed for each encoded position
+    occupied = observations[:, encoder.occupied_offset:encoder.double_offset] != 0
+    spinner = (observations[:, encoder.spinner_offset:encoder.occupied_offset] != 0).any(axis=1)
+    allowed = np.zeros((len(observations), len(PERMUTATIONS)), dtype=bool)
+    allowed[:, IDENTITY] = True
+    allowed[spinner | occupied.any(axis=1), :NUM_ALWAYS] = True
+    allowed[occupied.all(axis=1), NUM_ALWAYS:] = True
+    return allowed
+
+
+def augment(observations: np.ndarray, masks: np.ndarray, actions: np.ndarray, encoder: ObservationEncoder) -> tuple:
+    # Every distinct sample that an allowed transform makes of a batch of (observation, action mask, action) samples,
+    # the originals first. Transforms that give a sample back unchanged, such as swapping east and west while both are
+    # closed, add nothing. Also returns the sample each row came from, to pick per sample values such as rewards
+    allowed = allowed_transforms(observations, encoder)
+    variants, parts = [], ([], [], [], [])
+    for t in range(len(PERMUTATIONS)):
+        sources = _action_sources(masks.shape[-1], t)
+        inverse = np.argsort(sources)  # Where each action goes
+        variant = (transform_observations(observations, encoder, t), inverse[actions])
+        keep = allowed[:, t].copy()
+        for u, (other_observations, other_actions) in variants:
+            keep &= ~(allowed[:, u] & (variant[1] == other_actions) & (variant[0] == other_observations).all(axis=1))
+        variants.append((t, variant))
+        rows = np.flatnonzero(keep)
+        parts[0].append(variant[0][rows])
+        parts[1].append(masks[rows][:, sources])
+        parts[2].append(variant[1][rows])
+        parts[3].append(rows)
+    return tuple(np.concatenate(part) for part in parts)
@@ -0,0 +1,84 @@
+from unittest import TestCase
+
+import numpy as np
+
+from batch_engine import BatchGame
+from domino import Game, RandomPlayer
+
+
+class RecordingPlayer(RandomPlayer):
+    def take_turn(self, current_board, current_hand, curr_player_num, players, scores, pile_size):
+        dom_index, direction = super().take_turn(current_board, current_hand, curr_player_num, players, scores, pile_size)
+        self.last_choice = (current_hand[dom_index] if dom_index != -1 else None, direction)
+        return dom_index, direction
+
+
+def play_recorded_round(seed: int, num_players: int, score_to_win: int):
+    # Plays one round of the scalar Game and records the draw order plus every ply as a BatchGame action
+    players = [RecordingPlayer(seed=seed * num_players + seat) for seat in range(num_players)]
+    game = Game(6, score_to_win, players, seed=seed)
+    drawn = []
+    draw = game._Game__draw_random_dom_from_pile
+
+    def recording_draw():
+        dom = draw()
+        drawn.append(dom.get_id())
+        return dom
+
+    game._Game__draw_random_dom_from_pile = recording_draw
+    plies = []
+    game._Game__init_round()
+    first_turn = game.current_turn
+    game_over = False
+    while not game_over:
+        player = players[game.current_turn]
+        hand_size = len(game.hands[player])
+        mask = Game.action_mask(game.hands[player], game.board, len(game.pile), 6)
+        game_over = game.take_turn()
+        if len(game.hands[player]) < hand_size:
+            dom, direction = player.last_choice
+            action = dom.get_id() * 4 + direction.value
+        else:
+            action = 4 * 28  # Draw, or ignored if the player had to pass
+        plies.append((action, mask, [game.scores[p] for p in players], game.board.get_board_sum()))
+    deck = drawn + [dom.get_id() for dom in game.pile]
+    return first_turn, deck, plies
+
+
+class TestBatchGame(TestCase):
+    def test_matches_scalar_game(self):
+        for seed in range(60):
+            num_players = 2 + seed % 3
+            score_to_win = 10 ** 6 if seed % 2 == 0 else 30
+            first_turn, deck, plies = play_recorded_round(seed, num_players, score_to_win)
+            batch = BatchGame(1, 6, score_to_win, num_players, seed=seed)
+            batch.current_turn[:] = first_turn
+            batch.new_round(decks=np.array([deck]))
+            for i, (action, mask, scores, board_sum) in enumerate(plies):
+                self.assertFalse(batch.round_over[0])
+                self.assertEqual(list(batch.legal_actions()[0]), mask, f"seed {seed}, ply {i}")
+                round_over = batch.step(np.array([action]))
+                self.assertEqual(list(batch.scores[0]), scores, f"seed {seed}, ply {i}")
+                self.assertEqual(batch.get_board_sums()[0], board_sum, f"seed {seed}, ply {i}")
+                self.assertEqual(round_over[0], i == len(plies) - 1)
+
+    def test_random_rounds_conserve_dominoes(self):
+        batch = BatchGame(256, 9, 10 ** 6, 4, seed=0)
+        batch.play_random_rounds()
+        self.assertTrue(batch.round_over.all())
+        in_hands = batch.hands.sum(axis=(1, 2))
+        self.assertTrue(((in_hands + batch.num_played + batch.pile_size) == batch.num_doms).all())
+        self.assertTrue((batch.scores % 5 == 0).all())
+
+    def test_illegal_action(self):
+        batch = BatchGame(2, 6, 200, 2, seed=0)
+        legal = batch.legal_actions()
+        actions = np.argmin(legal, axis=1)
+        self.assertRaises(ValueError, batch.step, actions)
+
+    def test_random_matches(self):
+        batch = BatchGame(64, 6, 100, 3, seed=1)
+        batch.play_random_matches()
+        self.assertTrue(batch.match_over.all())
+        winners = batch.scores[np.arange(64), batch.winner]
+        self.assertTrue((winners >= 100).all())
@@ -0,0 +1,170 @@
+import itertools
+import random
+from unittest import TestCase
+
+import numpy as np
+
+from belief import BeliefTracker
+from domino import Game, RandomPlayer
+from domino_tables import num_mask_table
+
+
+class DrawOnlyWhenStuckPlayer(RandomPlayer):
+    def take_turn(self, current_board, current_hand, curr_player_num, players, scores, pile_size):
+        moves = Game.legal_moves(current_hand, current_board)
+        return moves[self.rng.randrange(len(moves))] if len(moves) != 0 else (-1, None)
+
+
+class Checker(Game.Observer):
+    # Checks the tracker against the real hands before every turn
+    def __init__(self, test: TestCase, tracker: BeliefTracker):
+        self.test, self.tracker, self.turns, self.passes = test, tracker, 0, 0
+
+    def on_pass(self, game: Game, player_num: int):
+        self.passes += 1
+
+    def on_turn(self, game: Game, player_num: int):
+        tracker = self.tracker
+        hands = [game.hands[player] for player in game.players]
+        for seat in range(len(hands)):
+            mask = sum(1 << dom.get_id() for dom in hands[seat])
+            self.test.assertEqual(mask & ~tracker.possible[seat], 0)
+            self.test.assertEqual(tracker.sizes[seat], len(hands[seat]))
+        self.test.assertEqual(sum(1 << dom.get_id() for dom in game.pile) & ~tracker.possible[-1], 0)
+        probabilities = tracker.get_probabilities()
+        self.test.assertTrue(np.allclose(probabilities.sum(axis=1), tracker.sizes, atol=1e-3))
+        for seat in range(len(hands)):
+            for dom in hands[seat]:
+                self.test.assertGreater(probabilities[seat, dom.get_id()], 0)
+        self.turns += 1
+
+
+class VoidChecker(Game.Observer):
+    # Checks that every number in an opponent's voids is missing from its real hand
+    def __init__(self, test: TestCase, tracker: BeliefTracker):
+        self.test, self.tracker, self.draws = test, tracker, 0
+
+    def on_draw(self, game: Game, player_num: int):
+        self.draws += player_num != self.tracker.player_num
+        self.on_turn(game, player_num)
+
+    def on_turn(self, game: Game, player_num: int):
+        for seat in range(len(game.players)):
+            voids = self.tracker.voids[seat]
+            for dom in game.hands[game.players[seat]]:
+                self.test.assertFalse(voids >> dom.num_a & 1 or voids >> dom.num_b & 1)
+
+
+class TestBeliefTracker(TestCase):
+    def play(self, player_type, draw_means_void: bool, num_players: int, seed: int) -> Checker:
+        players = [player_type(seed=seed * num_players + seat) for seat in range(num_players)]
+        game = Game(6, 10 ** 9, players, seed=seed)
+        tracker = BeliefTracker(seed % num_players, draw_means_void)
+        checker = Checker(self, tracker)
+        game.subscribe(tracker)
+        game.subscribe(checker)
+        game.play_game()
+        return checker
+
+    def test_sound(self):
+        passes = 0
+        for seed in range(20):
+            for num_players in (2, 3, 4):
+                checker = self.play(RandomPlayer, False, num_players, seed)
+                self.assertGreater(checker.turns, 0)
+                passes += checker.passes
+        self.assertGreater(passes, 0)
+
+    def test_draw_means_void(self):
+        for seed in range(20):
+            self.play(DrawOnlyWhenStuckPlayer, True, 2, seed)
+
+    def test_pass(self):
+        # After a pass the passer can't hold any domino showing an open number
+        tracker = BeliefTracker(0)
+        checked = []
+
+        class PassChecker(Game.Observer):
+            def on_pass(self, game: Game, player_num: int):
+                if player_num != 0:
+                    for number in game.board.get_out_facing_numbers():
+                        checked.append(number)
+                        self.test.assertTrue(tracker.voids[player_num] >> number & 1)
+                        self.test.assertEqual(tracker.possible[player_num] & tracker.num_masks[number], 0)
+
+        pass_checker = PassChecker()
+        pass_checker.test = self
+        for seed in range(20):
+            game = Game(6, 10 ** 9, [RandomPlayer(seed=seed), RandomPlayer(seed=seed + 1)], seed=seed)
+            game.subscribe(tracker)
+            game.subscribe(pass_checker)
+            game.play_game()
+        self.assertGreater(len(checked), 0)
+
+    def test_voids_after_draws(self):
+        draws = 0
+        for seed in range(20):
+            players = [DrawOnlyWhenStuckPlayer(seed=seed), DrawOnlyWhenStuckPlayer(seed=seed + 1)]
+            game = Game(6, 10 ** 9, players, seed=seed)
+            tracker = BeliefTracker(0, draw_means_void=True)
+            checker = VoidChecker(self, tracker)
+            game.subscribe(tracker)
+            game.subscribe(checker)
+            game.play_game()
+            draws += checker.draws
+        self.assertGreater(draws, 0)
+
+    def test_sample_hands(self):
+        rng = random.Random(0)
+        players = [RandomPlayer(seed=seat) for seat in range(3)]
+        game = Game(6, 10 ** 9, players, seed=1)
+        tracker = BeliefTracker(2)
+        game.subscribe(tracker)
+        game._Game__init_round()
+        tracker.on_game_start(game)
+        for _ in range(12):
+            if game.take_turn():
+                break
+        for _ in range(20):
+            hands, pile = tracker.sample_hands(rng)
+            self.assertEqual([len(hand) for hand in hands], [len(game.hands[player]) for player in players])
+            self.assertEqual(len(pile), len(game.pile))
+            self.assertEqual({dom.get_id() for dom in hands[2]}, {dom.get_id() for dom in game.hands[players[2]]})
+            dealt = {dom.get_id() for hand in hands for dom in hand} | {dom.get_id() for dom in pile}
+            real = {dom.get_id() for hand in game.hands.values() for dom in hand} | {dom.get_id() for dom in game.pile}
+            self.assertEqual(dealt, real)
+            for seat in range(3):
+                for dom in hands[seat]:
+                    self.assertTrue(tracker.possible[seat] >> dom.get_id() & 1)
+
+    def test_probabilities_count_deals(self):
+        # Against enumerating every deal of a small position with voids
+        tracker = BeliefTracker(0)
+        tracker.max_num, tracker.num_masks = 3, num_mask_table(3)
+        tracker.possible = [0b11, 0, 0, 0]
+        tracker.played = 0b1100
+        unseen = 0b1111110000
+        tracker.possible[1] = unseen & ~tracker.num_masks[3]
+        tracker.possible[2] = unseen & ~tracker.num_masks[1]
+        tracker.possible[3] = unseen
+        tracker.sizes = [2, 2, 2, 2]
+        counts, deals = np.zeros((4, 10)), 0
+        ids = [i for i in range(10) if unseen >> i & 1]
+        for places in itertools.product((1, 2, 3), repeat=len(ids)):
+            if [places.count(row) for row in (1, 2, 3)] != [2, 2, 2]:
+                continue
+            if all(tracker.possible[row] >> dom_id & 1 for row, dom_id in zip(places, ids)):
+                deals += 1
+                for row, dom_id in zip(places, ids):
+                    counts[row, dom_id] += 1
+        probabilities = tracker.get_probabilities()
+        self.assertTrue(np.allclose(probabilities[1:], counts[1:] / deals))
+        self.assertEqual(list(probabilities[0]), [1, 1] + [0] * 8)
+        rng = random.Random(0)
+        sampled = np.zeros((4, 10))
+        for _ in range(2000):
+            hands, pile = tracker.sample_hands(rng)
+            for row, hand in enumerate(hands + [pile]):
+                for dom in hand:
+                    sampled[row, dom.get_id()] += 1
+        self.assertTrue(np.allclose(sampled[1:] / 2000, counts[1:] / deals, atol=0.05))
@@ -0,0 +1,49 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from benchmark_suite import compare, main, run_suite
+
+
+class TestBenchmarkSuite(TestCase):
+    def test_run_suite(self):
+        suite = run_suite(max_nums=(6, 15), player_counts=(2, 4), rounds=3, repeats=1)
+        self.assertEqual(set(suite["results"]), {"import", "game/max_num=6/players=2", "game/max_num=6/players=4",
+                                                 "game/max_num=15/players=2", "game/max_num=15/players=4",
+                                                 "calls/max_num=6", "calls/max_num=15"})
+        game = suite["results"]["game/max_num=6/players=2"]
+        self.assertGreater(game["plies_per_second"], game["games_per_second"] > 0)
+        self.assertGreaterEqual(game["peak_memory_bytes"], game["memory_bytes"] > 0)
+        self.assertGreater(suite["results"]["calls/max_num=15"]["check_match_ns"], 0)
+        self.assertEqual(json.loads(json.dumps(suite)), suite)
+
+    def test_compare(self):
+        baseline = {"results": {"a": {"games_per_second": 100.0, "setup_us": 10.0, "memory_bytes": 1000},
+                                "gone": {"games_per_second": 1.0}}}
+        current = {"results": {"a": {"games_per_second": 85.0, "setup_us": 10.5, "memory_bytes": 1200},
+                               "new": {"games_per_second": 1.0}}}
+        regressions = compare(baseline, current, threshold=0.1)
+        self.assertEqual([(name, metric) for name, metric, *_ in regressions],
+                         [("a", "games_per_second"), ("a", "memory_bytes")])
+        self.assertAlmostEqual(regressions[0][4], -0.15)
+        self.assertEqual(compare(current, baseline, threshold=0.1), [])
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.json")
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(main(["--rounds", "2", "--repeats", "1", "--output", path]), 0)
+            with open(path) as results_file:
+                suite = json.load(results_file)
+            for name in suite["results"]["game/max_num=9/players=3"]:
+                if name.endswith("per_second"):
+                    suite["results"]["game/max_num=9/players=3"][name] *= 100
+            with open(path, "w") as results_file:
+                json.dump(suite, results_file)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                self.assertEqual(main(["--rounds", "2", "--repeats", "1", "--baseline", path]), 1)
+            self.assertIn("Regression: game/max_num=9/players=3 games_per_second", output.getvalue())
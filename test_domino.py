@@ -1,6 +1,10 @@
+import contextlib
+import copy
+import io
+import random
 from unittest import TestCase
 
-from domino import Domino
+from domino import Board, CompactBoard, Direction, Domino, Game, RandomPlayer
 
 
 class TestBoard(TestCase):
@@ -13,8 +17,11 @@ class TestDomino(TestCase):
     #     super().__init__()
 
     def test_get_id(self):
-        # domino =
-        self.fail()
+        self.assertEqual(Domino(0, 0, 6).get_id(), 6)
+        self.assertEqual(Domino(0, 6, 6).get_id(), 0)
+        self.assertEqual(Domino(2, 5, 6).get_id(), 14)
+        self.assertEqual(Domino(6, 6, 6).get_id(), 27)
+        self.assertEqual(Domino(10, 10, 10).get_id(), 65)
 
     def test_id_to_nums(self):
         self.assertEqual(Domino.id_to_nums(0, 100), (0, 0))
@@ -53,3 +60,164 @@ class TestReversibleDomino(TestCase):
 
     def test_get_out_facing_sum(self):
         self.fail()
+
+
+def random_board_plays(seed: int, max_num: int = 6):
+    # Yields a random sequence of legal (domino, direction) plays from a full set
+    rng = random.Random(seed)
+    pile = [Domino(a, b, max_num) for a in range(max_num + 1) for b in range(a, max_num + 1)]
+    rng.shuffle(pile)
+    compact = CompactBoard()
+    while True:
+        options = [(dom, direction) for dom in pile for direction in Direction
+                   if (compact.is_empty() and direction is Direction.NORTH) or
+                   compact.get_open_number(direction) in (dom.num_a, dom.num_b) and compact.get_open_number(direction) != -1]
+        if len(options) == 0:
+            return
+        dom, direction = rng.choice(options)
+        pile.remove(dom)
+        compact.play_domino(dom, direction)
+        yield dom, direction
+
+
+class TestCompactBoard(TestCase):
+    def test_matches_board(self):
+        for seed in range(50):
+            board, compact = Board(), CompactBoard()
+            for dom, direction in random_board_plays(seed):
+                board.play_domino(dom, direction)
+                compact.play_domino(dom, direction)
+                self.assertEqual(compact.get_board_sum(), board.get_board_sum())
+                self.assertEqual(compact.get_out_facing_numbers(), board.get_out_facing_numbers())
+                self.assertEqual(compact.get_board_state(), board.get_board_state())
+                self.assertEqual(str(compact.to_board()), str(board))
+                self.assertEqual(str(board.to_compact().to_board()), str(board))
+
+    def test_undo(self):
+        for seed in range(50):
+            compact = CompactBoard()
+            states = [(compact.get_board_sum(), compact.get_board_state(), compact.get_out_facing_numbers())]
+            plays = list(random_board_plays(seed))
+            for dom, direction in plays:
+                compact.play_domino(dom, direction)
+                states.append((compact.get_board_sum(), compact.get_board_state(), compact.get_out_facing_numbers()))
+            for dom, _ in reversed(plays):
+                states.pop()
+                self.assertIs(compact.undo(), dom)
+                self.assertEqual((compact.get_board_sum(), compact.get_board_state(), compact.get_out_facing_numbers()), states[-1])
+            self.assertTrue(compact.is_empty())
+
+    def test_illegal_play(self):
+        compact = CompactBoard()
+        compact.play_domino(Domino(2, 3, 6), Direction.NORTH)
+        self.assertRaises(AssertionError, compact.play_domino, Domino(4, 5, 6), Direction.NORTH)
+        self.assertRaises(AssertionError, compact.play_domino, Domino(3, 4, 6), Direction.EAST)
+        self.assertEqual(len(compact.history), 1)
+
+
+class TestGame(TestCase):
+    def test_legal_moves(self):
+        rng = random.Random(0)
+        for seed in range(20):
+            board = Board()
+            for dom, direction in random_board_plays(seed):
+                played = {play[0].get_id() for play in board.to_compact().history}
+                unplayed = [Domino(a, b, 6) for a in range(7) for b in range(a, 7) if Domino(a, b, 6).get_id() not in played]
+                hand = rng.sample(unplayed, min(7, len(unplayed)))
+                expected = []
+                for direction_tried in Direction:
+                    for i in range(len(hand)):
+                        trial = copy.deepcopy(board)
+                        try:
+                            trial.play_domino(hand[i], direction_tried)
+                        except AssertionError:
+                            continue
+                        if not board.is_empty() or direction_tried is Direction.NORTH:
+                            expected.append((i, direction_tried))
+                self.assertEqual(Game.legal_moves(hand, board), expected)
+                self.assertEqual(Game.legal_moves(hand, board.to_compact()), expected)
+                board.play_domino(dom, direction)
+
+    def test_action_mask(self):
+        board = Board()
+        board.play_domino(Domino(2, 2, 6), Direction.NORTH)
+        hand = [Domino(1, 2, 6), Domino(3, 4, 6)]
+        mask = Game.action_mask(hand, board, 0, 6)
+        self.assertEqual(len(mask), 28 * 4 + 1)
+        self.assertEqual([i for i in range(len(mask)) if mask[i]],
+                         [hand[0].get_id() * 4 + Direction.NORTH.value, hand[0].get_id() * 4 + Direction.SOUTH.value])
+        self.assertTrue(Game.action_mask(hand, board, 1, 6)[-1])
+
+    def test_observer(self):
+        class CountingObserver(Game.Observer):
+            def __init__(self):
+                self.events = {}
+                self.points = {}
+
+            def count(self, event):
+                self.events[event] = self.events.get(event, 0) + 1
+
+            def on_match_start(self, game):
+                self.count("match_start")
+
+            def on_game_start(self, game):
+                self.count("game_start")
+
+            def on_play(self, game, player_num, dom, direction):
+                self.count("play")
+
+            def on_draw(self, game, player_num):
+                self.count("draw")
+
+            def on_pass(self, game, player_num):
+                self.count("pass")
+
+            def on_score(self, game, player_num, points):
+                self.points[player_num] = self.points.get(player_num, 0) + points
+
+            def on_match_end(self, game):
+                self.count("match_end")
+
+        players = [RandomPlayer(seed=seat) for seat in range(3)]
+        game = Game(6, 150, players, seed=1)
+        observer = CountingObserver()
+        game.subscribe(observer)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            game.play_match()
+        self.assertEqual(output.getvalue(), "")
+        moves = [move for moves in game.history for move in moves]
+        self.assertEqual(observer.events["match_start"], 1)
+        self.assertEqual(observer.events["match_end"], 1)
+        self.assertEqual(observer.events["game_start"], len(game.history))
+        self.assertEqual(observer.events["play"], sum(1 for move in moves if move[1] is not None and move[1] != -1))
+        self.assertEqual(observer.events.get("draw", 0), sum(1 for move in moves if move[1] == -1))
+        self.assertEqual(observer.events.get("pass", 0), sum(1 for move in moves if move[1] is None))
+        self.assertEqual([observer.points.get(i, 0) for i in range(3)], [game.scores[player] for player in players])
+
+    def test_seeded_games_repeat(self):
+        def play(seed):
+            players = [RandomPlayer(seed=seed + seat) for seat in range(3)]
+            game = Game(6, 150, players, seed=seed)
+            game.play_match()
+            return game.history, [game.scores[player] for player in players]
+
+        self.assertEqual(play(4), play(4))
+        self.assertNotEqual(play(4)[0], play(5)[0])
+
+    def test_injected_rng(self):
+        game_1 = Game(6, 150, [RandomPlayer(rng=random.Random(1)), RandomPlayer(rng=random.Random(2))], rng=random.Random(3))
+        game_2 = Game(6, 150, [RandomPlayer(seed=1), RandomPlayer(seed=2)], seed=3)
+        game_1.play_match()
+        game_2.play_match()
+        self.assertEqual(game_1.history, game_2.history)
+
+    def test_replay(self):
+        players = [RandomPlayer(seed=seat) for seat in range(4)]
+        game = Game(6, 150, players, seed=9)
+        game.play_match()
+        replayed = Game.replay(6, 150, 4, game.history, seed=9)
+        self.assertEqual(replayed.history, game.history)
+        self.assertEqual(list(replayed.scores.values()), [game.scores[player] for player in players])
+        with self.assertRaises(ValueError):
+            Game.replay(6, 150, 4, game.history, seed=10)
@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+from domino import Domino
+from domino_tables import get_num_doms, id_table, id_to_nums_table, match_table, nums_table, num_mask_table, pair_index
+
+
+def loop_get_id(num_a: int, num_b: int, num_max: int) -> int:
+    dom_id = 0
+    for i in range(num_a):
+        dom_id += num_max - i + 1
+    return dom_id + num_max - num_b
+
+
+def loop_id_to_nums(domino_id: int, num_max: int) -> (int, int):
+    id_max = get_num_doms(num_max) - 1
+    i = 0
+    while domino_id < id_max - i:
+        id_max -= i + 1
+        i += 1
+    return num_max - i, domino_id - id_max + num_max
+
+
+class TestDominoTables(TestCase):
+    def test_ids(self):
+        for num_max in (0, 6, 9, 12, 15):
+            for num_a in range(num_max + 1):
+                for num_b in range(num_max + 1):
+                    self.assertEqual(id_table(num_max)[pair_index(num_a, num_b, num_max)], loop_get_id(num_a, num_b, num_max))
+            for dom_id in range(get_num_doms(num_max)):
+                self.assertEqual(id_to_nums_table(num_max)[dom_id], loop_id_to_nums(dom_id, num_max))
+                num_a, num_b = nums_table(num_max)[dom_id]
+                self.assertEqual(loop_get_id(num_a, num_b, num_max), dom_id)
+
+    def test_num_masks(self):
+        masks = num_mask_table(6)
+        for dom_id, (num_a, num_b) in enumerate(nums_table(6)):
+            for num in range(7):
+                self.assertEqual(bool(masks[num] >> dom_id & 1), num in (num_a, num_b))
+
+    def test_matches(self):
+        for num_a, num_b in nums_table(6):
+            for other_a, other_b in nums_table(6):
+                match = match_table(6)[pair_index(num_a, num_b, 6)][pair_index(other_a, other_b, 6)]
+                self.assertEqual(Domino(num_a, num_b, 6).check_match(Domino(other_a, other_b, 6)), match)
+                if match is None:
+                    self.assertFalse({num_a, num_b} & {other_a, other_b})
+                elif match[0] == 0:
+                    self.assertIn(num_a, (other_a, other_b))
+                else:
+                    self.assertEqual((num_a, num_b)[match[0] == 1], (other_a, other_b)[match[1] != 1])
@@ -0,0 +1,82 @@
+from unittest import TestCase
+
+import numpy as np
+
+from batch_engine import BatchGame
+from domino import Board, CompactBoard, Domino, Direction, Game, RandomPlayer
+from domino_tables import nums_table
+from encoder import ObservationEncoder
+from replay_buffer import ReplayBuffer, ReplayRecorder
+
+
+class TestObservationEncoder(TestCase):
+    def test_encode(self):
+        encoder = ObservationEncoder(6)
+        board = Board()
+        board.play_domino(Domino(2, 3, 6), Direction.NORTH)
+        board.play_domino(Domino(3, 3, 6), Direction.NORTH)
+        hand = [Domino(0, 2, 6), Domino(5, 6, 6)]
+        out = encoder.allocate()
+        encoder.encode(board, hand, 10, -20, out)
+        self.assertEqual(len(out), encoder.size)
+        self.assertEqual(list(np.flatnonzero(out[:encoder.spinner_offset])),
+                         [Direction.NORTH.value * 7 + 3, Direction.SOUTH.value * 7 + 2])
+        self.assertEqual(list(np.flatnonzero(out[encoder.spinner_offset:encoder.occupied_offset])), [3])
+        self.assertEqual(list(out[encoder.occupied_offset:encoder.double_offset]), [0, 0, 1, 0])
+        self.assertEqual(set(np.flatnonzero(out[encoder.hand_offset:encoder.played_offset])), {dom.get_id() for dom in hand})
+        self.assertEqual(set(np.flatnonzero(out[encoder.played_offset:encoder.pile_offset])),
+                         {Domino(2, 3, 6).get_id(), Domino(3, 3, 6).get_id()})
+        self.assertAlmostEqual(out[encoder.pile_offset], 10 / 28)
+        self.assertAlmostEqual(out[encoder.score_offset], -0.1)
+        self.assertTrue((encoder.encode(board.to_compact(), hand, 10, -20, encoder.allocate()) == out).all())
+
+    def test_uint8(self):
+        encoder = ObservationEncoder(9, dtype=np.uint8)
+        out = encoder.encode(Board(), [Domino(9, 9, 9)], 30, -15, encoder.allocate())
+        self.assertEqual(out.dtype, np.uint8)
+        self.assertEqual((out[encoder.pile_offset], out[encoder.score_offset]), (30, 125))
+
+    def test_batch_game_matches_scalar(self):
+        encoder = ObservationEncoder(6)
+        batch = BatchGame(32, 6, 10 ** 6, 3, seed=4)
+        boards = [CompactBoard() for _ in range(32)]
+        out, expected = encoder.allocate(32), encoder.allocate(32)
+        while not batch.round_over.all():
+            encoder.encode_batch_game(batch, out)
+            hands = [[Domino(*nums_table(6)[i], 6) for i in np.flatnonzero(batch.hands[g, batch.current_turn[g]])]
+                     for g in range(32)]
+            score_diffs = [batch.scores[g, batch.current_turn[g]] - max(np.delete(batch.scores[g], batch.current_turn[g]))
+                           for g in range(32)]
+            encoder.encode_batch(boards, hands, batch.pile_size, score_diffs, expected)
+            self.assertTrue((out == expected).all())
+            legal = batch.legal_actions()
+            actions = batch.random_actions()
+            for g in range(32):
+                if legal[g].any() and actions[g] != batch.draw_action:
+                    boards[g].play_domino(Domino(*nums_table(6)[actions[g] // 4], 6), Direction(actions[g] % 4))
+            batch.step(actions)
+
+    def test_recorder(self):
+        encoder = ObservationEncoder(6)
+        game = Game(6, 50, [RandomPlayer(seed=1), RandomPlayer(seed=2)], seed=0)
+        buffer = ReplayBuffer(500, ReplayRecorder.fields((encoder.size,), 6, np.float32))
+        game.subscribe(ReplayRecorder(buffer, 6, encode=encoder.encode_game))
+        game.play_match()
+        states = buffer.arrays["state"][:len(buffer)]
+        actions = buffer.arrays["action"][:len(buffer)]
+        plays = actions != 28 * 4
+        hands = states[plays, encoder.hand_offset:encoder.played_offset]
+        self.assertTrue((hands[np.arange(plays.sum()), actions[plays] // 4] == 1).all())
+
+    def test_recorder_copies_scratch(self):
+        # encode_game without out reuses encoder.scratch, so a pending state must not change with the next encoding
+        encoder = ObservationEncoder(6)
+        game = Game(6, 50, [RandomPlayer(seed=1), RandomPlayer(seed=2)], seed=0)
+        recorder = ReplayRecorder(ReplayBuffer(10, ReplayRecorder.fields((encoder.size,), 6, np.float32)), 6,
+                                  encode=encoder.encode_game)
+        game._Game__init_round()
+        recorder.on_turn(game, 0)
+        state = recorder.pending["state"].copy()
+        encoder.encode_game(game, 1)
+        self.assertFalse((state == encoder.scratch).all())
+        self.assertTrue((recorder.pending["state"] == state).all())
@@ -0,0 +1,152 @@
+import random
+from unittest import TestCase
+
+from belief import BeliefTracker
+from domino import CompactBoard, Domino, Game, RandomPlayer
+from domino_tables import nums_table
+from endgame import EndgamePlayer, EndgameSolver
+
+
+def _endgame(seed: int, num_players: int, hand_size: int) -> (CompactBoard, list):
+    # A board of randomly played double six dominoes and hand_size unplayed dominoes for each player
+    rng = random.Random(seed)
+    while True:
+        doms = [Domino(a, b, 6) for a, b in nums_table(6)]
+        rng.shuffle(doms)
+        board = CompactBoard()
+        while len(doms) > num_players * hand_size:
+            moves = Game.legal_moves(doms, board)
+            if len(moves) == 0:  # Dead end, start over
+                break
+            dom_index, direction = moves[rng.randrange(len(moves))]
+            board.play_domino(doms.pop(dom_index), direction)
+        else:
+            return board, [doms[seat * hand_size:(seat + 1) * hand_size] for seat in range(num_players)]
+
+
+def _minimax(board: CompactBoard, hands: list, turn: int, root: int, passes: int) -> int:
+    # Root's points minus everyone else's for the rest of the round, root maximizing and everyone else minimizing
+    moves = Game.legal_moves(hands[turn], board)
+    if len(moves) == 0:
+        if passes + 1 == len(hands):
+            return 0
+        return _minimax(board, hands, (turn + 1) % len(hands), root, passes + 1)
+    sign = 1 if turn == root else -1
+    values = []
+    for dom_index, direction in moves:
+        dom = hands[turn].pop(dom_index)
+        board.play_domino(dom, direction)
+        points = board.get_board_sum() if board.get_board_sum() % 5 == 0 else 0
+        if len(hands[turn]) == 0:
+            points += sum(int(5 * round(sum(d.num_a + d.num_b for d in hand) / 5)) for hand in hands)
+            value = sign * points
+        else:
+            value = sign * points + _minimax(board, hands, (turn + 1) % len(hands), root, 0)
+        board.undo()
+        hands[turn].insert(dom_index, dom)
+        values.append(value)
+    return max(values) if turn == root else min(values)
+
+
+class TestEndgameSolver(TestCase):
+    def test_matches_minimax(self):
+        solver = EndgameSolver()
+        for num_players, hand_size in ((2, 4), (3, 3), (4, 2)):
+            for seed in range(15):
+                board, hands = _endgame(seed, num_players, hand_size)
+                state = board.get_board_state(), board.get_board_sum()
+                for root in range(num_players):
+                    value, move = solver.solve(board, hands, 0, root)
+                    self.assertEqual(value, _minimax(board, hands, 0, root, 0), (num_players, seed, root))
+                    self.assertEqual((board.get_board_state(), board.get_board_sum()), state)
+                    moves = Game.legal_moves(hands[0], board)
+                    if len(moves) == 0:
+                        self.assertIsNone(move)
+                    else:
+                        self.assertIn(move, moves)
+        self.assertGreater(solver.get_hit_rate(), 0)
+        self.assertGreater(solver.get_nodes_per_second(), 0)
+
+    def test_best_move(self):
+        # Playing the returned move and solving for the rest gives the solved value
+        solver = EndgameSolver()
+        for seed in range(10):
+            board, hands = _endgame(seed, 2, 5)
+            value, move = solver.solve(board, hands, 0)
+            if move is None:
+                continue
+            self.assertIn(move, [move for move, _ in solver.evaluate_moves(board, hands, 0)])
+            self.assertEqual(value, max(value for _, value in solver.evaluate_moves(board, hands, 0)))
+            dom = hands[0].pop(move[0])
+            board.play_domino(dom, move[1])
+            points = board.get_board_sum() if board.get_board_sum() % 5 == 0 else 0
+            if len(hands[0]) != 0:
+                self.assertEqual(value, points + solver.solve(board, hands, 1, 0)[0])
+
+    def test_fresh_dominoes(self):
+        # Solving a memoized position again with new Domino objects maps the stored move onto the new hands
+        solver = EndgameSolver()
+        for seed in range(5):
+            board, hands = _endgame(seed, 2, 4)
+            value, move = solver.solve(board, hands, 0)
+            copies = [[Domino(dom.num_a, dom.num_b, 6) for dom in reversed(hand)] for hand in hands]
+            value_again, move_again = solver.solve(board, copies, 0)
+            self.assertEqual(value_again, value)
+            if move is None:
+                self.assertIsNone(move_again)
+            else:
+                self.assertEqual((copies[0][move_again[0]].get_id(), move_again[1]), (hands[0][move[0]].get_id(), move[1]))
+
+    def test_passes(self):
+        # Passes since the last play count towards a lock
+        solver = EndgameSolver()
+        for seed in range(30):
+            board, hands = _endgame(seed, 3, 2)
+            for passes in range(3):
+                self.assertEqual(solver.solve(board, hands, 0, passes=passes)[0], _minimax(board, hands, 0, 0, passes))
+
+    def test_solve_game(self):
+        players = [RandomPlayer(seed=1), RandomPlayer(seed=2)]
+        game = Game(6, 10 ** 9, players, seed=0)
+        game._Game__init_round()
+        while len(game.pile) != 0 or sum(len(hand) for hand in game.hands.values()) > 10:
+            self.assertFalse(game.take_turn())
+        value = EndgameSolver().solve_game(game, 0)
+        hands = [list(game.hands[player]) for player in players]
+        self.assertEqual(value, _minimax(game.board.to_compact(), hands, game.current_turn, 0, 0))
+
+
+class TestEndgamePlayer(TestCase):
+    def test_take_turn(self):
+        for num_players in (2, 3):
+            board, hands = _endgame(5, num_players, 3)
+            player = EndgamePlayer(seed=0)
+            players = [player] + [RandomPlayer() for _ in range(num_players - 1)]
+            moves = Game.legal_moves(hands[0], board)
+            move = player.take_turn(board, hands[0], 0, players, {}, 0)
+            if len(moves) != 0:
+                self.assertIn(move, moves)
+            if num_players == 2 and len(moves) > 1:
+                self.assertEqual(move, EndgameSolver().solve(board, hands, 0)[1])
+
+    def test_beats_random(self):
+        # Random play until the endgame, so the solver is the only difference between the players
+        margin = 0
+        for seed in range(20):
+            player = EndgamePlayer(max_dominoes=10, seed=seed)
+            opponent = RandomPlayer(seed=seed + 100)
+            for players in ([player, opponent], [opponent, player]):
+                game = Game(6, 10 ** 9, players, seed=seed)
+                game.subscribe(player)
+                game.play_game()
+                margin += game.scores[player] - game.scores[opponent]
+        self.assertGreater(margin, 0)
+
+    def test_belief(self):
+        for seed in range(5):
+            belief = BeliefTracker(1)
+            player = EndgamePlayer(max_dominoes=9, samples=4, seed=seed, belief=belief)
+            game = Game(6, 10 ** 9, [RandomPlayer(seed=seed), player, RandomPlayer(seed=seed + 1)], seed=seed)
+            game.subscribe(belief)
+            game.subscribe(player)
+            game.play_game()
@@ -0,0 +1,84 @@
+from unittest import TestCase
+
+import numpy as np
+
+from env import AsyncVectorEnv, MATCH, VectorEnv
+from self_play import derive_seed
+
+
+def first_legal(masks: np.ndarray) -> np.ndarray:
+    return np.argmax(masks, axis=1)
+
+
+class TestVectorEnv(TestCase):
+    def test_reset(self):
+        env = VectorEnv(32, num_players=3, agent_seat=1, seed=0)
+        observations, masks = env.reset()
+        self.assertEqual(observations.shape, (32, env.observation_size))
+        self.assertEqual(masks.shape, (32, env.num_actions))
+        self.assertTrue(masks.any(axis=1).all())
+        self.assertTrue((env.batch.current_turn == 1).all())
+        hand = observations[:, env.encoder.hand_offset:env.encoder.played_offset].astype(bool)
+        self.assertTrue((hand == env.batch.hands[:, 1]).all())
+
+    def test_match_rewards(self):
+        # Over a match episode the rewards add up to the agent's final score
+        env = VectorEnv(16, num_players=2, score_to_win=100, episode=MATCH, seed=1)
+        rng = np.random.default_rng(0)
+        _, masks = env.reset()
+        totals, finished = np.zeros(16), []
+        while len(finished) < 40:
+            actions = np.argmax(rng.random(masks.shape) * masks, axis=1)
+            _, masks, rewards, dones, info = env.step(actions)
+            self.assertTrue((rewards % 5 == 0).all() and (rewards >= 0).all())
+            totals += rewards
+            for i in np.flatnonzero(dones):
+                self.assertEqual(totals[i], info["final_scores"][i, 0])
+                self.assertTrue((info["final_scores"][i] >= 100).any())
+                finished.append(i)
+                totals[i] = 0
+            self.assertTrue((env.batch.scores[dones] < 100).all())
+
+    def test_opponent(self):
+        calls = []
+
+        def opponent(observations, masks):
+            self.assertTrue(masks.any(axis=1).all())
+            calls.append(len(masks))
+            return first_legal(masks)
+
+        env = VectorEnv(8, num_players=4, agent_seat=2, opponent=opponent, seed=2)
+        _, masks = env.reset()
+        for _ in range(30):
+            _, masks, _, _, _ = env.step(first_legal(masks))
+        self.assertGreater(sum(calls), 0)
+
+    def test_illegal_action(self):
+        env = VectorEnv(4, seed=3)
+        _, masks = env.reset()
+        self.assertRaises(ValueError, env.step, np.argmin(masks, axis=1))
+
+
+class TestAsyncVectorEnv(TestCase):
+    def test_matches_sync(self):
+        with AsyncVectorEnv(2, 4, seed=5, num_players=3) as env:
+            envs = [VectorEnv(4, num_players=3, seed=derive_seed(5, i)) for i in range(2)]
+            observations, masks = env.reset()
+            expected = [sync.reset() for sync in envs]
+            self.assertTrue((observations == np.concatenate([e[0] for e in expected])).all())
+            for _ in range(40):
+                actions = first_legal(masks)
+                observations, masks, rewards, dones, info = env.step(actions)
+                expected = [envs[i].step(actions[i * 4:(i + 1) * 4]) for i in range(2)]
+                self.assertTrue((masks == np.concatenate([e[1] for e in expected])).all())
+                self.assertTrue((rewards == np.concatenate([e[2] for e in expected])).all())
+                self.assertTrue((dones == np.concatenate([e[3] for e in expected])).all())
+                self.assertTrue((info["final_scores"] == np.concatenate([e[4]["final_scores"] for e in expected])).all())
+
+    def test_illegal_action(self):
+        # The worker's error reaches the caller, and the workers keep serving
+        with AsyncVectorEnv(2, 2, seed=3) as env:
+            _, masks = env.reset()
+            self.assertRaises(ValueError, env.step, np.argmin(masks, axis=1))
+            _, masks = env.reset()
+            env.step(first_legal(masks))
@@ -0,0 +1,127 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from domino import Game, RandomPlayer
+from game_log import GameLogReader, GameLogWriter, INDEX_SUFFIX
+from self_play import derive_seed
+
+
+class RoundRecorder(Game.Observer):
+    # What the log should hold for each round: scores and deal at the start and str(board) after every play
+    def __init__(self):
+        self.rounds = []
+
+    def on_game_start(self, game):
+        self.rounds.append({"scores": [game.scores[player] for player in game.players],
+                            "deal": [[dom.get_id() for dom in game.hands[player]] for player in game.players],
+                            "boards": []})
+
+    def on_play(self, game, player_num, dom, direction):
+        self.rounds[-1]["boards"].append(str(game.board))
+
+
+def play_logged_matches(path: str, num_matches: int, seed: int) -> list:
+    games = []
+    with GameLogWriter(path) as writer:
+        for i in range(num_matches):
+            game = Game(6, 100, [RandomPlayer(seed=seat) for seat in range(2 + i % 3)], seed=seed + i)
+            recorder = RoundRecorder()
+            game.subscribe(writer)
+            game.subscribe(recorder)
+            game.play_match()
+            games.append((game, recorder.rounds))
+    return games
+
+
+class TestGameLog(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "games.dlog")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        games = play_logged_matches(self.path, 3, 7)
+        with GameLogReader(self.path) as reader:
+            self.assertEqual(len(reader), sum(len(game.history) for game, _ in games))
+            n = 0
+            for match in range(len(games)):
+                game, rounds = games[match]
+                for round_number in range(len(game.history)):
+                    record, expected = reader[n], rounds[round_number]
+                    n += 1
+                    self.assertEqual((record.seed, record.match, record.round), (7 + match, match, round_number))
+                    self.assertEqual(record.scores, expected["scores"])
+                    self.assertEqual(record.get_actions(), game.history[round_number])
+                    self.assertEqual([[dom.get_id() for dom in hand] for hand in record.get_hands()], expected["deal"])
+                    self.assertEqual([str(board) for _, board in record.iter_boards()], expected["boards"])
+                    third_play = [i for i, _ in record.iter_boards()][2]
+                    self.assertEqual(str(record.get_board(third_play + 1)), expected["boards"][2])
+                    self.assertTrue(record.get_board(0).is_empty())
+
+    def test_replay_from_log(self):
+        games = play_logged_matches(self.path, 2, 4)
+        with GameLogReader(self.path) as reader:
+            for match in range(len(games)):
+                records = [record for record in reader if record.match == match]
+                game = Game.replay(6, 100, records[0].num_players, [record.get_actions() for record in records],
+                                   records[0].seed)
+                self.assertEqual(game.history, games[match][0].history)
+                self.assertEqual(list(game.scores.values()), list(games[match][0].scores.values()))
+
+    def test_index_rebuilt_and_appending(self):
+        play_logged_matches(self.path, 2, 1)
+        with GameLogReader(self.path) as reader:
+            offsets = reader.offsets.tolist()
+        os.remove(self.path + INDEX_SUFFIX)
+        with GameLogReader(self.path) as reader:
+            self.assertEqual(reader.offsets.tolist(), offsets)
+        play_logged_matches(self.path, 1, 2)  # Appends to the log, but the index now misses the first records
+        with GameLogReader(self.path) as reader:
+            self.assertGreater(len(reader), len(offsets))
+            self.assertEqual(reader.offsets.tolist()[:len(offsets)], offsets)
+            self.assertEqual(reader[-1].seed, 2)
+
+    def test_large_scores_and_negative_seed(self):
+        players = [RandomPlayer(seed=0), RandomPlayer(seed=1)]
+        game = Game(6, 10 ** 9, players, seed=-5)
+        game.scores[players[0]], game.scores[players[1]] = 70000, 3 * 10 ** 8
+        with GameLogWriter(self.path) as writer:
+            game.subscribe(writer)
+            game.play_game()
+            game.play_game()
+        os.remove(self.path + INDEX_SUFFIX)  # Rebuilding the index walks the records by their sizes
+        with GameLogReader(self.path) as reader:
+            self.assertEqual(len(reader), 2)
+            self.assertEqual(reader[0].seed, -5)
+            self.assertEqual(reader[0].scores, [70000, 3 * 10 ** 8])
+            self.assertEqual(reader[1].get_actions(), game.history[1])
+
+    def test_derived_seeds(self):
+        # self_play seeds are unsigned 64 bit, about half of them at or above 2 ** 63
+        seeds = [derive_seed(0, i) for i in range(4)]
+        self.assertTrue(any(seed >= 1 << 63 for seed in seeds))
+        with GameLogWriter(self.path) as writer:
+            for seed in seeds:
+                game = Game(6, 100, [RandomPlayer(seed=0), RandomPlayer(seed=1)], seed=seed)
+                game.subscribe(writer)
+                game.play_game()
+        with GameLogReader(self.path) as reader:
+            self.assertEqual([record.seed for record in reader], seeds)
+            for record in reader:  # The logged seed deals the logged hands again
+                game = Game(6, 100, [RandomPlayer(), RandomPlayer()], seed=record.seed)
+                game._Game__init_round()
+                self.assertEqual([[dom.get_id() for dom in game.hands[player]] for player in game.players],
+                                 record.deal.tolist())
+
+    def test_smaller_than_json(self):
+        games = play_logged_matches(self.path, 5, 3)
+        as_json = json.dumps([{"seed": 3, "match": match, "round": round_number, "scores": expected["scores"],
+                               "deal": expected["deal"],
+                               "actions": [[seat, dom_id, direction.name if direction is not None else None]
+                                           for seat, dom_id, direction in games[match][0].history[round_number]]}
+                              for match in range(len(games)) for round_number, expected in enumerate(games[match][1])])
+        self.assertLess(os.path.getsize(self.path) * 4, len(as_json))
@@ -0,0 +1,118 @@
+import threading
+from unittest import TestCase
+
+import numpy as np
+
+from domino import Game, RandomPlayer
+from domino_tables import get_num_doms
+from encoder import ObservationEncoder
+from inference import Histogram, InferenceServer, NetworkPlayer, position_key
+from model import Model
+
+
+def make_model(max_num: int = 6) -> (Model, ObservationEncoder):
+    encoder = ObservationEncoder(max_num)
+    return Model(encoder.size, get_num_doms(max_num) * 4 + 1, hidden_size=32, seed=0), encoder
+
+
+class TestHistogram(TestCase):
+    def test_percentile(self):
+        histogram = Histogram([1, 2, 4, 8])
+        for value in (0.5, 1.5, 3, 3, 100):
+            histogram.record(value)
+        self.assertEqual(list(histogram.counts), [1, 1, 2, 0, 1])
+        self.assertEqual(histogram.percentile(50), 4)
+        self.assertEqual(histogram.percentile(100), float("inf"))
+        self.assertAlmostEqual(histogram.mean(), 108 / 5)
+
+
+class TestInferenceServer(TestCase):
+    def test_batches_concurrent_requests(self):
+        model, encoder = make_model()
+        observations = np.random.default_rng(0).random((64, encoder.size), dtype=np.float32)
+        expected_logits, expected_values = model.predict(observations)
+        results = [None] * len(observations)
+        server = InferenceServer(model, max_batch_size=16, max_wait=0.05)
+
+        def evaluate(i):
+            results[i] = server.evaluate(observations[i])
+
+        with server:
+            threads = [threading.Thread(target=evaluate, args=(i,)) for i in range(len(observations))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        for i in range(len(observations)):
+            np.testing.assert_allclose(results[i][0], expected_logits[i], rtol=1e-4, atol=1e-5)
+            self.assertAlmostEqual(results[i][1], expected_values[i], places=5)
+        self.assertEqual(server.batch_sizes.count * server.batch_sizes.mean(), len(observations))
+        self.assertGreater(server.batch_sizes.mean(), 1)
+        self.assertLessEqual(server.batch_sizes.percentile(100), 16)
+        self.assertEqual(server.latency.count, len(observations))
+
+    def test_model_error(self):
+        # A failing batch wakes its callers with the error, and later requests fail instead of waiting forever
+        model, encoder = make_model()
+        errors = []
+
+        def evaluate(size):
+            try:
+                server.evaluate(np.ones(size, dtype=np.float32))
+            except ValueError as error:
+                errors.append(error)
+
+        with InferenceServer(model, max_wait=0.05) as server:
+            threads = [threading.Thread(target=evaluate, args=(encoder.size + 1,)) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(10)
+            self.assertFalse(any(thread.is_alive() for thread in threads))
+            self.assertEqual(len(errors), 4)
+            self.assertRaises(ValueError, server.evaluate, np.ones(encoder.size, dtype=np.float32))
+
+    def test_cache(self):
+        model, encoder = make_model()
+        server = InferenceServer(model, cache_size=2)
+        observation = np.ones(encoder.size, dtype=np.float32)
+        first = server.evaluate(observation, "a")
+        self.assertIs(server.evaluate(observation * 0, "a"), first)  # Served from the cache
+        server.evaluate(observation, "b")
+        server.evaluate(observation, "c")  # Evicts "a"
+        self.assertEqual(list(server.cache), ["b", "c"])
+        self.assertEqual((server.hits, server.misses), (1, 3))
+        server.evaluate(observation)
+        self.assertEqual(len(server.cache), 2)
+
+    def test_evaluate_batch(self):
+        model, encoder = make_model()
+        observations = np.random.default_rng(1).random((5, encoder.size), dtype=np.float32)
+        server = InferenceServer(model)
+        cached = server.evaluate(observations[2], 2)
+        logits, values = server.evaluate_batch(observations, list(range(5)))
+        expected_logits, expected_values = model.predict(observations)
+        np.testing.assert_allclose(logits, expected_logits, rtol=1e-4, atol=1e-5)
+        np.testing.assert_allclose(values, expected_values, rtol=1e-4, atol=1e-5)
+        np.testing.assert_array_equal(logits[2], cached[0])
+        self.assertEqual((server.hits, server.misses), (1, 5))
+        self.assertEqual(list(server.batch_sizes.counts[:5]), [1, 0, 0, 1, 0])
+
+
+class TestNetworkPlayer(TestCase):
+    def test_plays_legal_match(self):
+        model, encoder = make_model()
+        with InferenceServer(model) as server:
+            players = [NetworkPlayer(server, encoder, seed=0), RandomPlayer(seed=1), NetworkPlayer(server, encoder, greedy=True)]
+            game = Game(6, 100, players, seed=0)
+            game.play_match()
+        self.assertGreater(server.misses, 0)
+        self.assertTrue(any(score >= 100 for score in game.scores.values()))
+
+    def test_position_key(self):
+        game = Game(6, 100, [RandomPlayer(seed=0), RandomPlayer(seed=1)], seed=1)
+        game._Game__init_round()
+        hand = game.hands[game.players[0]]
+        key = position_key(game.board, hand, len(game.pile), 0)
+        self.assertEqual(key, position_key(game.board.to_compact(), list(reversed(hand)), len(game.pile), 0))
+        self.assertNotEqual(key, position_key(game.board, hand[1:], len(game.pile), 0))
@@ -0,0 +1,60 @@
+from unittest import TestCase
+
+from belief import BeliefTracker
+from domino import CompactBoard, Direction, Domino, Game, RandomPlayer
+from mcts_player import MCTSPlayer
+
+
+class TestMCTSPlayer(TestCase):
+    def test_take_turn(self):
+        player = MCTSPlayer(rollouts=50, seed=0)
+        board = CompactBoard()
+        board.play_domino(Domino(2, 3, 6), Direction.NORTH)
+        board.play_domino(Domino(3, 5, 6), Direction.NORTH)
+        state = board.get_board_state(), board.get_board_sum()
+        hand = [Domino(0, 2, 6), Domino(5, 5, 6), Domino(1, 4, 6)]
+        move = player.take_turn(board, hand, 0, [player, RandomPlayer()], {}, 10)
+        self.assertIn(move, Game.legal_moves(hand, board))
+        self.assertEqual((board.get_board_state(), board.get_board_sum()), state)
+        self.assertEqual(player.total_rollouts, 50)
+        self.assertGreater(player.get_rollouts_per_second(), 0)
+
+    def test_time_limit(self):
+        player = MCTSPlayer(rollouts=None, time_limit=0.05, seed=0)
+        board = CompactBoard()
+        board.play_domino(Domino(1, 1, 6), Direction.NORTH)
+        hand = [Domino(1, 2, 6), Domino(1, 4, 6), Domino(6, 6, 6)]
+        player.take_turn(board, hand, 1, [RandomPlayer(), player, RandomPlayer()], {}, 5)
+        self.assertGreater(player.total_rollouts, 1)
+        self.assertLess(player.total_seconds, 0.5)
+
+    def test_beats_random(self):
+        wins = 0
+        for seed in range(4):
+            player = MCTSPlayer(rollouts=60, seed=seed)
+            game = Game(6, 100, [player, RandomPlayer(seed=seed)], seed=seed)
+            game.subscribe(player)
+            game.play_match()
+            wins += game.scores[player] >= 100
+        self.assertGreaterEqual(wins, 3)
+
+    def test_belief(self):
+        belief = BeliefTracker(0)
+        player = MCTSPlayer(rollouts=30, seed=0, belief=belief)
+        game = Game(6, 10 ** 9, [player, RandomPlayer(seed=1), RandomPlayer(seed=2)], seed=0)
+        game.subscribe(belief)
+        game.subscribe(player)
+        game.play_game()
+        self.assertGreater(player.total_rollouts, 0)
+
+    def test_stale_hand_sizes(self):
+        # Sizes seen in on_turn are only used while they add up to the dominoes not on the board or in the pile
+        player = MCTSPlayer(seed=0)
+        get_hand_sizes = player._MCTSPlayer__get_hand_sizes
+        player.hand_sizes = [3, 6, 4]
+        self.assertEqual(get_hand_sizes(0, 3, 3, 20, 10), [3, 6, 4])
+        player.hand_sizes = [3, 4, 4]  # An opponent drew since
+        self.assertEqual(get_hand_sizes(0, 3, 3, 20, 10), [3, 5, 5])
+        game = Game(6, 100, [player, RandomPlayer()], seed=0)
+        player.on_game_start(game)
+        self.assertIsNone(player.hand_sizes)
@@ -0,0 +1,57 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from model import Model, masked_softmax
+
+
+class TestModel(TestCase):
+    def test_predict_shapes(self):
+        model = Model(10, 7, hidden_size=16, seed=0)
+        logits, values = model.predict(np.ones((3, 10), dtype=np.float32))
+        self.assertEqual(logits.shape, (3, 7))
+        self.assertEqual(values.shape, (3,))
+        self.assertTrue((np.abs(values) <= 1).all())
+
+    def test_masked_softmax(self):
+        probs = masked_softmax(np.array([[1.0, 5.0, 2.0]]), np.array([[True, False, True]]))
+        self.assertEqual(probs[0, 1], 0)
+        self.assertAlmostEqual(probs.sum(), 1)
+
+    def test_train_step_reduces_loss(self):
+        rng = np.random.default_rng(0)
+        model = Model(12, 5, hidden_size=32, seed=0)
+        observations = rng.random((64, 12), dtype=np.float32)
+        masks = np.ones((64, 5), dtype=bool)
+        masks[:, 4] = False
+        actions = (observations[:, 0] * 4).astype(int)
+        targets = observations[:, 1] - 0.5
+        first = model.train_step(observations, masks, actions, targets, learning_rate=0.1)
+        for _ in range(300):
+            last = model.train_step(observations, masks, actions, targets, learning_rate=0.1)
+        self.assertLess(last[0], first[0] * 0.8)
+        self.assertLess(last[1], first[1])
+
+    def test_train_step_weights(self):
+        # Zero weights leave the policy head alone; a negative weight makes the taken action less likely
+        rng = np.random.default_rng(1)
+        observations = rng.random((8, 6), dtype=np.float32)
+        masks, actions, targets = np.ones((8, 3), dtype=bool), np.zeros(8, dtype=int), np.zeros(8)
+        model = Model(6, 3, hidden_size=8, seed=0)
+        wp = model.params["wp"].copy()
+        model.train_step(observations, masks, actions, targets, weights=np.zeros(8))
+        np.testing.assert_array_equal(model.params["wp"], wp)
+        before = masked_softmax(model.predict(observations)[0], masks)[:, 0].mean()
+        for _ in range(20):
+            model.train_step(observations, masks, actions, targets, learning_rate=0.1, weights=-np.ones(8))
+        self.assertLess(masked_softmax(model.predict(observations)[0], masks)[:, 0].mean(), before)
+
+    def test_save_load(self):
+        model = Model(6, 4, hidden_size=8, seed=1)
+        with tempfile.TemporaryDirectory() as path:
+            model.save(os.path.join(path, "model.npz"))
+            loaded = Model.load(os.path.join(path, "model.npz"))
+        observations = np.ones((2, 6), dtype=np.float32)
+        np.testing.assert_array_equal(loaded.predict(observations)[0], model.predict(observations)[0])
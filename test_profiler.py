@@ -0,0 +1,70 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from domino import Game, RandomPlayer
+from profiler import Profiler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        self.now += 1.0
+        return self.now
+
+
+class IllegalFirstPlayer(RandomPlayer):
+    # Tries an out of range domino before every real move
+    def __init__(self, seed: int = None):
+        super().__init__(seed)
+        self.tried = False
+
+    def take_turn(self, current_board, current_hand, curr_player_num, players, scores, pile_size):
+        self.tried = not self.tried
+        if self.tried:
+            return len(current_hand), None
+        return super().take_turn(current_board, current_hand, curr_player_num, players, scores, pile_size)
+
+
+class TestProfiler(TestCase):
+    def test_nested_phases(self):
+        profiler = Profiler(clock=FakeClock())
+        profiler.start("a")  # t = 1
+        profiler.start("b")  # t = 2
+        profiler.stop()  # t = 3
+        with profiler.phase("c"):  # t = 4, 5
+            pass
+        profiler.stop()  # t = 6
+        self.assertEqual(profiler.total, {"a": 5.0, "a;b": 1.0, "a;c": 1.0})
+        self.assertEqual(profiler.self_time, {"a": 3.0, "a;b": 1.0, "a;c": 1.0})
+        self.assertEqual(profiler.to_folded(), "a 3000000\na;b 1000000\na;c 1000000\n")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "profile.folded")
+            profiler.write_folded(path)
+            with open(path) as folded_file:
+                self.assertEqual(folded_file.read(), profiler.to_folded())
+
+    def test_game_counters(self):
+        players = [IllegalFirstPlayer(seed=0), RandomPlayer(seed=1), RandomPlayer(seed=2)]
+        game = Game(6, 100, players, seed=3)
+        game.profiler = Profiler()
+        game.play_match()
+        profiler = game.profiler
+        moves = [move for moves in game.history for move in moves]
+        self.assertEqual(profiler.counters["matches"], 1)
+        self.assertEqual(profiler.counters["rounds"], len(game.history))
+        self.assertEqual(profiler.counters["plays"], sum(1 for move in moves if move[1] not in (-1, None)))
+        self.assertEqual(profiler.counters.get("draws", 0), sum(1 for move in moves if move[1] == -1))
+        self.assertEqual(profiler.counters.get("passes", 0), sum(1 for move in moves if move[1] is None))
+        self.assertEqual(profiler.counters["illegal attempts"], sum(1 for move in moves if move[0] == 0 and move[1] is not None))
+        self.assertEqual(profiler.calls["match;round;play_domino"], profiler.counters["plays"])
+        self.assertEqual(profiler.calls["match;round;player"],
+                         profiler.counters["plays"] + profiler.counters.get("draws", 0) + profiler.counters["illegal attempts"])
+        self.assertLessEqual(sum(profiler.self_time.values()), profiler.total["match"] + 1e-9)
+        summary = profiler.summary()
+        for name in ("match", "round", "player", "play_domino", "get_board_sum", "legal_moves", "illegal attempts"):
+            self.assertIn(name, summary)
+        self.assertTrue(all(len(line.rsplit(" ", 1)) == 2 for line in profiler.to_folded().splitlines()))
+
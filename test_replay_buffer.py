@@ -0,0 +1,78 @@
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from domino import Game, RandomPlayer
+from replay_buffer import ReplayBuffer, ReplayRecorder
+
+FIELDS = {"state": ((3,), np.int16), "action": ((), np.int32)}
+
+
+class TestReplayBuffer(TestCase):
+    def test_ring(self):
+        buffer = ReplayBuffer(5, FIELDS, seed=0)
+        for i in range(7):
+            buffer.append(state=[i, i, i], action=i)
+        self.assertEqual(len(buffer), 5)
+        self.assertEqual(sorted(buffer.arrays["action"]), [2, 3, 4, 5, 6])
+        buffer.extend(state=np.zeros((2, 3)), action=np.array([10, 11]))
+        self.assertEqual(sorted(buffer.arrays["action"]), [4, 5, 6, 10, 11])
+        indices, batch = buffer.sample(100)
+        self.assertTrue((batch["action"] == buffer.arrays["action"][indices]).all())
+
+    def test_reopen(self):
+        with tempfile.TemporaryDirectory() as path:
+            buffer = ReplayBuffer(10, FIELDS, path=path)
+            for i in range(4):
+                buffer.append(state=[i, 0, 0], action=i)
+            buffer.update_priorities(np.array([2]), np.array([5.0]))
+            buffer.flush()
+            reopened = ReplayBuffer.open(path)
+            self.assertIsInstance(reopened.arrays["state"], np.memmap)
+            self.assertEqual(len(reopened), 4)
+            self.assertEqual(list(reopened.arrays["action"][:4]), [0, 1, 2, 3])
+            self.assertTrue(np.allclose(reopened.tree, buffer.tree))
+            reopened.append(state=[9, 9, 9], action=9)
+            self.assertEqual(reopened.arrays["action"][4], 9)
+            del buffer, reopened
+
+    def test_prioritized(self):
+        buffer = ReplayBuffer(4, FIELDS, alpha=1.0, seed=0)
+        for i in range(4):
+            buffer.append(state=[0, 0, 0], action=i)
+        buffer.update_priorities(np.arange(4), np.array([1.0, 0.0, 3.0, 6.0]))
+        indices, batch, weights = buffer.sample_prioritized(10000)
+        counts = np.bincount(indices, minlength=4) / 10000
+        self.assertTrue(np.allclose(counts, [0.1, 0.0, 0.3, 0.6], atol=0.01))
+        self.assertAlmostEqual(weights.max(), 1.0)
+        self.assertTrue((weights[indices == 0] == 1.0).all())
+
+
+class TestReplayRecorder(TestCase):
+    def test_recorded_game(self):
+        players = [RandomPlayer(seed=0), RandomPlayer(seed=1)]
+        game = Game(6, 100, players, seed=2)
+        buffer = ReplayBuffer(1000, ReplayRecorder.fields((5,), 6))
+        game.subscribe(ReplayRecorder(buffer, 6))
+        game.play_match()
+        moves = [move for moves in game.history for move in moves if move[1] is not None]
+        self.assertEqual(len(buffer), len(moves))
+        self.assertEqual(buffer.arrays["reward"][:len(buffer)].sum(), sum(game.scores.values()))
+        for i in range(len(buffer)):
+            self.assertTrue(buffer.arrays["mask"][i, buffer.arrays["action"][i]])
+
+    def test_returns(self):
+        # A round's first decision returns the mover's round points minus the mean of the others'
+        for num_players in (2, 3):
+            players = [RandomPlayer(seed=seat) for seat in range(num_players)]
+            game = Game(6, 10 ** 9, players, seed=num_players)
+            buffer = ReplayBuffer(1000, ReplayRecorder.fields((5,), 6))
+            game.subscribe(ReplayRecorder(buffer, 6))
+            game.play_game()
+            first = next(move[0] for move in game.history[-1] if move[1] is not None)
+            points = [game.scores[player] for player in players]
+            expected = points[first] - (sum(points) - points[first]) / (num_players - 1)
+            self.assertAlmostEqual(float(buffer.arrays["return"][0]), expected, places=4)
+            # Nobody scores after the last decision but its mover
+            self.assertEqual(buffer.arrays["return"][len(buffer) - 1], buffer.arrays["reward"][len(buffer) - 1])
@@ -0,0 +1,50 @@
+import time
+from unittest import TestCase
+
+from domino import Game, RandomPlayer
+from self_play import SelfPlay, derive_seed, make_player
+
+
+class FirstMovePlayer(Game.Player):
+    # A player without a seed keyword
+    def take_turn(self, current_board, current_hand, curr_player_num, players, scores, pile_size):
+        moves = Game.legal_moves(current_hand, current_board)
+        return moves[0] if len(moves) != 0 else (-1, None)
+
+
+class TestSelfPlay(TestCase):
+    def test_play(self):
+        runner = SelfPlay([RandomPlayer, RandomPlayer], score_to_win=100, seed=3, processes=2)
+        records = list(runner.play(8))
+        self.assertEqual(sorted(record.index for record in records), list(range(8)))
+        for record in records:
+            self.assertEqual(record.seed, derive_seed(3, record.index))
+            self.assertGreaterEqual(record.scores[record.winner], 100)
+            self.assertTrue(all(len(moves) > 0 for moves in record.moves))
+        self.assertEqual(sum(matches for matches, _ in runner.worker_stats.values()), 8)
+        self.assertTrue(all(rate > 0 for rate in runner.get_worker_rates().values()))
+
+    def test_reproducible(self):
+        records_1 = sorted(SelfPlay([RandomPlayer] * 3, score_to_win=60, seed=5, processes=1).play(4))
+        records_2 = sorted(SelfPlay([RandomPlayer] * 3, score_to_win=60, seed=5, processes=2).play(4))
+        self.assertEqual([(r.moves, r.scores, r.winner) for r in records_1], [(r.moves, r.scores, r.winner) for r in records_2])
+        records_3 = sorted(SelfPlay([RandomPlayer] * 3, score_to_win=60, seed=6, processes=1).play(4))
+        self.assertNotEqual([r.moves for r in records_1], [r.moves for r in records_3])
+
+    def test_replay_record(self):
+        for record in SelfPlay([RandomPlayer] * 2, score_to_win=60, seed=8, processes=1).play(2):
+            game = Game.replay(6, 60, 2, record.moves, record.seed)
+            self.assertEqual(game.history, record.moves)
+            self.assertEqual([game.scores[player] for player in game.players], record.scores)
+
+    def test_unseeded_player_type(self):
+        self.assertIsInstance(make_player(FirstMovePlayer, 1), FirstMovePlayer)
+        self.assertEqual(make_player(RandomPlayer, 1).rng.random(), RandomPlayer(seed=1).rng.random())
+        records = list(SelfPlay([FirstMovePlayer, RandomPlayer], score_to_win=60, seed=2, processes=1).play(2))
+        self.assertEqual(len(records), 2)
+
+    def test_rate_excludes_consumer(self):
+        runner = SelfPlay([RandomPlayer] * 2, score_to_win=60, seed=1, processes=1)
+        for _ in runner.play(3):
+            time.sleep(0.5)
+        self.assertLess(runner.wall_seconds, 1.0)  # Against 1.5 s spent sleeping
@@ -0,0 +1,132 @@
+import random
+from unittest import TestCase
+
+import numpy as np
+
+from domino import CompactBoard, Direction, Domino, Game, RandomPlayer
+from domino_tables import nums_table
+from encoder import ObservationEncoder
+from inference import InferenceServer, NetworkPlayer
+from symmetry import (IDENTITY, INVERSES, NUM_ALWAYS, PERMUTATIONS, augment, canonical_position_key, canonicalize,
+                      get_transforms, transform_action, transform_actions, transform_direction, transform_ends,
+                      transform_observations)
+from test_inference import make_model
+from zobrist import hash_ends
+
+
+def random_positions(seed: int, count: int) -> list:
+    # (CompactBoard, hand) after random plays from a shuffled double six set, from a few dominoes to most of the set
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        doms = [Domino(a, b, 6) for a, b in nums_table(6)]
+        rng.shuffle(doms)
+        hand, doms = doms[:5], doms[5:]
+        board = CompactBoard()
+        for _ in range(rng.randrange(1, 20)):
+            moves = Game.legal_moves(doms, board)
+            if len(moves) == 0:
+                break
+            dom_index, direction = moves[rng.randrange(len(moves))]
+            board.play_domino(doms.pop(dom_index), direction)
+        positions.append((board, hand))
+    return positions
+
+
+def transformed(board: CompactBoard, t: int) -> CompactBoard:
+    # Copy of board with its arms relabeled by transform t
+    output = CompactBoard()
+    output.spinner, output.spinner_id, output.board_sum = board.spinner, board.spinner_id, board.board_sum
+    output.ends, output.end_ids = transform_ends(board.ends, t), transform_ends(board.end_ids, t)
+    output.end_doubles = transform_ends(board.end_doubles, t)
+    output.history = list(board.history)
+    output.keys, output.played_hash = board.keys, board.played_hash
+    output.hash = board.played_hash ^ hash_ends(output.spinner, output.ends, output.end_doubles, board.keys)
+    return output
+
+
+class TestSymmetry(TestCase):
+    def test_inverses(self):
+        for t in range(len(PERMUTATIONS)):
+            for direction in Direction:
+                self.assertIs(transform_direction(transform_direction(direction, t), INVERSES[t]), direction)
+
+    def test_transforms_keep_rules_and_scoring(self):
+        quarter_turns = 0
+        for board, hand in random_positions(0, 300):
+            mask = np.array(Game.action_mask(hand, board, 3, 6))
+            for t in get_transforms(board):
+                quarter_turns += t >= NUM_ALWAYS
+                other = transformed(board, t)
+                self.assertEqual(other.get_board_sum(), board.get_board_sum())
+                self.assertTrue((np.array(Game.action_mask(hand, other, 3, 6)) == transform_actions(mask, t)).all())
+                for dom_index, direction in Game.legal_moves(hand, board):
+                    board.play_domino(hand[dom_index], direction)
+                    other.play_domino(hand[dom_index], transform_direction(direction, t))
+                    self.assertEqual(other.get_board_sum(), board.get_board_sum())
+                    board.undo()
+                    other.undo()
+        self.assertGreater(quarter_turns, 0)
+
+    def test_quarter_turn_needs_all_arms(self):
+        board = CompactBoard()
+        board.play_domino(Domino(4, 4, 6), Direction.NORTH)
+        board.play_domino(Domino(4, 1, 6), Direction.NORTH)
+        board.play_domino(Domino(4, 2, 6), Direction.SOUTH)
+        board.play_domino(Domino(4, 3, 6), Direction.EAST)
+        self.assertEqual(list(get_transforms(board)), list(range(NUM_ALWAYS)))
+        # A quarter turn moves the north arm east, which is closed while north is empty
+        self.assertEqual(Game.legal_moves([Domino(1, 5, 6)], transformed(board, 4)), [])
+        self.assertNotEqual(Game.legal_moves([Domino(1, 5, 6)], board), [])
+        self.assertEqual(list(get_transforms(CompactBoard())), [IDENTITY])
+
+    def test_canonical_form_is_shared(self):
+        for board, hand in random_positions(1, 100):
+            t, form = canonicalize(board)
+            key, _ = canonical_position_key(board, hand, 4, 10)
+            self.assertEqual(canonical_position_key(board.to_board(), hand, 4, 10), (key, t))
+            for u in get_transforms(board):
+                other = transformed(board, u)
+                self.assertEqual(canonicalize(other)[1], form)
+                self.assertEqual(canonical_position_key(other, hand, 4, 10)[0], key)
+
+    def test_observations(self):
+        encoder = ObservationEncoder(6)
+        for board, hand in random_positions(2, 100):
+            observation = encoder.encode(board, hand, 3, 0, encoder.allocate())
+            for t in get_transforms(board):
+                expected = encoder.encode(transformed(board, t), hand, 3, 0, encoder.allocate())
+                self.assertTrue((transform_observations(observation, encoder, t) == expected).all())
+
+    def test_augment(self):
+        encoder = ObservationEncoder(6)
+        positions = random_positions(3, 50)
+        observations = np.array([encoder.encode(board, hand, 3, 0, encoder.allocate()) for board, hand in positions])
+        masks = np.array([Game.action_mask(hand, board, 3, 6) for board, hand in positions])
+        actions = np.argmax(masks, axis=1)
+        augmented, augmented_masks, augmented_actions, rows = augment(observations, masks, actions, encoder)
+        # One row per distinct (observation, action) that the allowed transforms make of each sample
+        distinct = [len({(encoder.encode(transformed(board, t), hand, 3, 0, encoder.allocate()).tobytes(),
+                          transform_action(int(actions[i]), t, masks.shape[1])) for t in get_transforms(board)})
+                    for i, (board, hand) in enumerate(positions)]
+        self.assertEqual(np.bincount(rows, minlength=len(positions)).tolist(), distinct)
+        self.assertLess(len(augmented), sum(len(get_transforms(board)) for board, _ in positions))
+        self.assertEqual(len({(row, augmented[i].tobytes(), augmented_actions[i]) for i, row in enumerate(rows)}),
+                         len(rows))
+        self.assertTrue((augmented[:len(positions)] == observations).all())
+        self.assertTrue((rows[:len(positions)] == np.arange(len(positions))).all())
+        self.assertTrue(augmented_masks[np.arange(len(rows)), augmented_actions].all())
+
+    def test_network_player_shares_cache(self):
+        model, encoder = make_model()
+        board, hand = next((board, hand) for board, hand in random_positions(4, 100)
+                           if len(get_transforms(board)) == len(PERMUTATIONS) and len(Game.legal_moves(hand, board)) > 1)
+        with InferenceServer(model) as server:
+            player = NetworkPlayer(server, encoder, greedy=True, canonical=True)
+            players = [player, RandomPlayer()]
+            scores = {player: 0, players[1]: 5}
+            dom_index, direction = player.take_turn(board, hand, 0, players, scores, 0)
+            for t in range(len(PERMUTATIONS)):
+                move = player.take_turn(transformed(board, t), hand, 0, players, scores, 0)
+                self.assertEqual(move, (dom_index, transform_direction(direction, t)))
+        self.assertEqual(server.misses, 1)
@@ -0,0 +1,93 @@
+import functools
+from unittest import TestCase
+
+import numpy as np
+
+from domino import Game, RandomPlayer
+from tournament import SWISS, Tournament, _play_pairing, bradley_terry
+
+
+class HoardingPlayer(RandomPlayer):
+    # Draws whenever it can, so it keeps dominoes and hands its opponent the domino bonus
+    def take_turn(self, current_board, current_hand, curr_player_num, players, scores, pile_size):
+        if pile_size > 0:
+            return -1, None
+        return super().take_turn(current_board, current_hand, curr_player_num, players, scores, pile_size)
+
+
+class GreedyPlayer(RandomPlayer):
+    # Plays the move that scores the most right away
+    def take_turn(self, current_board, current_hand, curr_player_num, players, scores, pile_size):
+        moves = Game.legal_moves(current_hand, current_board)
+        if len(moves) == 0:
+            return -1, None
+        board = current_board.to_compact()
+
+        def points(move):
+            board.play_domino(current_hand[move[0]], move[1])
+            board_sum = board.get_board_sum()
+            board.undo()
+            return board_sum if board_sum % 5 == 0 else 0
+
+        return max(moves, key=lambda move: (points(move), self.rng.random()))
+
+
+class TestBradleyTerry(TestCase):
+    def test_ratings(self):
+        wins = np.array([[0, 30, 45], [20, 0, 35], [5, 15, 0]])
+        ratings, errors = bradley_terry(wins)
+        self.assertAlmostEqual(ratings.mean(), 0, places=6)
+        self.assertTrue(ratings[0] > ratings[1] > ratings[2])
+        # Expected wins at the maximum likelihood match the actual wins
+        p = 1 / (1 + 10 ** ((ratings[None, :] - ratings[:, None]) / 400))
+        games = wins + wins.T + 1.0 * (wins + wins.T > 0)
+        np.testing.assert_allclose((games * p).sum(axis=1), wins.sum(axis=1) + 1.0, rtol=1e-6)
+        self.assertTrue((errors > 0).all())
+        _, more_errors = bradley_terry(wins * 4)
+        self.assertTrue((more_errors < errors).all())
+
+    def test_unplayed(self):
+        ratings, errors = bradley_terry(np.array([[0, 3, 0], [1, 0, 0], [0, 0, 0]]))
+        self.assertEqual(errors[2], np.inf)
+        self.assertGreater(ratings[0], ratings[1])
+
+
+class TestTournament(TestCase):
+    def test_round_robin_settles(self):
+        tournament = Tournament({"greedy": GreedyPlayer, "random": RandomPlayer, "hoarder": HoardingPlayer},
+                                score_to_win=60, seed=0, processes=1)
+        standings = tournament.run(max_rounds=20, matches_per_pairing=4)
+        self.assertEqual([standing[0] for standing in standings], ["greedy", "random", "hoarder"])
+        self.assertTrue(tournament.is_settled())
+        self.assertLess(tournament.num_rounds, 20)
+        self.assertEqual(tournament.num_matches, tournament.num_rounds * 3 * 4 * 2)
+        self.assertEqual(tournament.wins.sum(), tournament.num_matches)
+        self.assertIn("settled", tournament.summary())
+
+    def test_seat_rotation(self):
+        # Both seat orders of a pairing share a seed, so the same seat gets the same deals and first turns
+        for seed in range(5):
+            seatings = ([GreedyPlayer(), HoardingPlayer()], [HoardingPlayer(), GreedyPlayer()])
+            games = [Game(6, 60, players, seed) for players in seatings]
+            for game in games:
+                game._Game__init_round()
+            self.assertEqual(games[0].current_turn, games[1].current_turn)
+            for seat in range(2):
+                self.assertEqual([dom.get_id() for dom in games[0].hands[games[0].players[seat]]],
+                                 [dom.get_id() for dom in games[1].hands[games[1].players[seat]]])
+            self.assertEqual(_play_pairing(((0, 1), [GreedyPlayer, HoardingPlayer], seed, 6, 60)),
+                             _play_pairing(((0, 1), [GreedyPlayer, HoardingPlayer], seed, 6, 60)))
+        tournament = Tournament({"a": functools.partial(RandomPlayer), "b": RandomPlayer}, score_to_win=30, seed=1,
+                                processes=1)
+        tournament.run(max_rounds=1, matches_per_pairing=10, min_rounds=1)
+        self.assertEqual(tournament.wins.sum(), 20)
+
+    def test_swiss(self):
+        entrants = {f"random{i}": RandomPlayer for i in range(4)}
+        entrants["hoarder"] = HoardingPlayer
+        tournament = Tournament(entrants, score_to_win=60, seed=2, processes=1, pairing=SWISS)
+        pairings = tournament.get_pairings()
+        self.assertEqual(len(pairings), 2)
+        self.assertEqual(len({i for pair in pairings for i in pair}), 4)
+        tournament.run(max_rounds=6, matches_per_pairing=2, min_rounds=6)
+        self.assertEqual(tournament.get_standings()[-1][0], "hoarder")
@@ -0,0 +1,118 @@
+from unittest import TestCase
+
+import numpy as np
+
+from batch_engine import BatchGame
+from domino import Board, CompactBoard, Game, RandomPlayer
+from test_domino import random_board_plays
+from zobrist import get_zobrist_keys, hash_ends
+
+
+def compact_hash_from_scratch(board: CompactBoard) -> int:
+    keys = get_zobrist_keys(board.history[0][0].num_max)
+    output = hash_ends(board.spinner, board.ends, board.end_doubles, keys)
+    for play in board.history:
+        output ^= keys.played[play[0].get_id()]
+    return output
+
+
+def game_hash_from_scratch(game: Game) -> int:
+    output = CompactBoard.from_board(game.board).get_hash() ^ game.keys.turn[game.current_turn]
+    for seat in range(len(game.players)):
+        for dom in game.hands[game.players[seat]]:
+            output ^= game.keys.hands[seat][dom.get_id()]
+    return output
+
+
+def batch_hashes(batch: BatchGame, keys) -> np.ndarray:
+    # Vectorized Game.get_hash of every game of a BatchGame, XOR-reducing the same keys
+    games = np.arange(batch.num_games)
+    played = np.array(keys.played, dtype=np.uint64)
+    hands = np.array(keys.hands, dtype=np.uint64)
+    ends = np.array(keys.ends, dtype=np.uint64)
+    output = np.bitwise_xor.reduce(np.where(batch.played, played, np.uint64(0)), axis=1)
+    output ^= np.bitwise_xor.reduce(np.where(batch.hands, hands, np.uint64(0)).reshape(batch.num_games, -1), axis=1)
+    for d in range(4):
+        has_end = batch.ends[:, d] != -1
+        output ^= np.where(has_end, ends[d][np.maximum(batch.ends[:, d], 0)], np.uint64(0))
+        output ^= np.where(has_end & batch.end_double[:, d], np.uint64(keys.end_doubles[d]), np.uint64(0))
+    output ^= np.where(batch.spinner != -1, np.array(keys.spinner, dtype=np.uint64)[np.maximum(batch.spinner, 0)],
+                       np.uint64(0))
+    output ^= np.array(keys.turn, dtype=np.uint64)[batch.current_turn[games]]
+    return output
+
+
+def batch_states(batch: BatchGame) -> np.ndarray:
+    # Every feature of the position as one byte row per game
+    return np.concatenate([batch.played, batch.hands.reshape(batch.num_games, -1), batch.ends + 1, batch.end_double,
+                           batch.spinner[:, None] + 1, batch.current_turn[:, None]], axis=1).astype(np.uint8)
+
+
+class TestBoardHash(TestCase):
+    def test_incremental_matches_scratch(self):
+        for seed in range(30):
+            board, compact = Board(), CompactBoard()
+            self.assertEqual(board.get_hash(), 0)
+            for dom, direction in random_board_plays(seed):
+                board.play_domino(dom, direction)
+                compact.play_domino(dom, direction)
+                self.assertEqual(compact.get_hash(), compact_hash_from_scratch(compact))
+                self.assertEqual(board.get_hash(), compact.get_hash())
+                self.assertEqual(CompactBoard.from_board(board).get_hash(), board.get_hash())
+
+    def test_undo_restores_hash(self):
+        compact = CompactBoard()
+        hashes = [compact.get_hash()]
+        for dom, direction in random_board_plays(3, 9):
+            compact.play_domino(dom, direction)
+            hashes.append(compact.get_hash())
+        while not compact.is_empty():
+            hashes.pop()
+            compact.undo()
+            self.assertEqual(compact.get_hash(), hashes[-1])
+
+
+class TestGameHash(TestCase):
+    def test_incremental_matches_scratch(self):
+        for seed in range(10):
+            game = Game(6, 150, [RandomPlayer(seed=seat) for seat in range(2 + seed % 3)], seed=seed)
+            game._Game__init_round()
+            game_over = False
+            while not game_over:
+                self.assertEqual(game.get_hash(), game_hash_from_scratch(game))
+                game_over = game.take_turn()
+
+    def test_batch_hash_matches_game(self):
+        # The vectorized hash used below agrees with Game.get_hash on the same position
+        game = Game(6, 150, [RandomPlayer(seed=seat) for seat in range(3)], seed=5)
+        game._Game__init_round()
+        for _ in range(12):
+            game.take_turn()
+        batch = BatchGame(1, 6, 150, 3)
+        batch.hands[:], batch.current_turn[0] = False, game.current_turn
+        compact = CompactBoard.from_board(game.board)
+        batch.spinner[0], batch.ends[0], batch.end_double[0] = compact.spinner, compact.ends, compact.end_doubles
+        for play in compact.history:
+            batch.played[0, play[0].get_id()] = True
+        for seat in range(3):
+            for dom in game.hands[game.players[seat]]:
+                batch.hands[0, seat, dom.get_id()] = True
+        self.assertEqual(int(batch_hashes(batch, game.keys)[0]), game.get_hash())
+
+    def test_collision_rate(self):
+        # Over a million random self-play positions, distinct positions never share a hash
+        for max_num, num_players in ((6, 2), (9, 4)):
+            batch = BatchGame(4096, max_num, 10 ** 6, num_players, seed=max_num)
+            keys = get_zobrist_keys(max_num, num_players)
+            hashes, states = [], []
+            while sum(len(h) for h in hashes) < 600000:
+                batch.new_round()
+                while not batch.round_over.all():
+                    active = ~batch.round_over
+                    hashes.append(batch_hashes(batch, keys)[active])
+                    states.append(batch_states(batch)[active])
+                    batch.step(batch.random_actions())
+            hashes, states = np.concatenate(hashes), np.concatenate(states)
+            num_states = len(np.unique(states, axis=0))
+            self.assertGreater(num_states, 500000)
+            self.assertEqual(len(np.unique(hashes)), num_states)
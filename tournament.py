@@ -0,0 +1,144 @@
+import math
+import multiprocessing
+import os
+import random
+
+import numpy as np
+
+from domino import Game
+from self_play import derive_seed, make_player
+
+ROUND_ROBIN, SWISS = "round_robin", "swiss"
+ELO_SCALE = 400 / math.log(10)  # Elo points per unit of log strength
+
+
+def _play_pairing(task: tuple) -> (tuple, int, list):
+    # One head to head match. Returns the pair of entrant indices in seat order, the winning seat and the scores
+    pair, factories, seed, max_num, score_to_win = task
+    players = [make_player(factories[seat], derive_seed(seed, seat + 1)) for seat in range(2)]
+    game = Game(max_num, score_to_win, players, seed)
+    game.play_match()
+    scores = [game.scores[player] for player in players]
+    return pair, 0 if scores[0] >= score_to_win else 1, scores
+
+
+def bradley_terry(wins: np.ndarray, prior: float = 0.5, iterations: int = 200) -> (np.ndarray, np.ndarray):
+    # Maximum likelihood Elo ratings (mean 0) and their standard errors from wins[i, j], the number of times i beat j.
+    # prior adds that many virtual wins each way between every pair that has played, so unbeaten players stay finite.
+    # Players without games get an infinite error
+    games = wins + wins.T
+    wins = wins + prior * (games > 0)
+    games = wins + wins.T
+    total_wins = wins.sum(axis=1)
+    strength = np.ones(len(wins))
+    for _ in range(iterations):  # Minorization-maximization updates
+        denominator = (games / (strength[:, None] + strength[None, :])).sum(axis=1)
+        strength = np.where(denominator > 0, total_wins / np.maximum(denominator, 1e-300), strength)
+        strength /= np.exp(np.log(strength).mean())
+    log_strength = np.log(strength)
+    p = 1 / (1 + np.exp(log_strength[None, :] - log_strength[:, None]))
+    information = -games * p * (1 - p)
+    np.fill_diagonal(information, 0)
+    np.fill_diagonal(information, -information.sum(axis=1))
+    variance = np.diag(np.linalg.pinv(information))  # Ratings are only defined up to a shift, hence the pseudo-inverse
+    variance = np.where(games.sum(axis=1) > 0, np.maximum(variance, 0), np.inf)
+    return log_strength * ELO_SCALE, np.sqrt(variance) * ELO_SCALE
+
+
+class Tournament:
+    # Head to head matches between entrants, a dict of name -> player factory called as factory(seed=...), or as
+    # factory() if it takes no seed (a Game.Player class or a functools.partial of one, picklable for the process
+    # pool; see self_play.make_player). Every pairing is played from both seat orders with the same seed, so both
+    # players get the same deals and first turns in turn. Ratings are Bradley-Terry maximum likelihood Elo with z
+    # standard error confidence intervals. run stops early once those intervals separate every pair of neighbours in
+    # the ranking
+    def __init__(self, entrants: dict, max_num: int = 6, score_to_win: int = 150, seed: int = 0, processes: int = None,
+                 pairing: str = ROUND_ROBIN, z: float = 1.96):
+        assert len(entrants) >= 2 and pairing in (ROUND_ROBIN, SWISS)
+        self.names, self.factories = list(entrants), list(entrants.values())
+        self.max_num, self.score_to_win, self.seed, self.pairing, self.z = max_num, score_to_win, seed, pairing, z
+        self.processes = processes if processes is not None else os.cpu_count()
+        self.rng = random.Random(seed)
+        self.wins = np.zeros((len(entrants), len(entrants)), dtype=np.int64)
+        self.points = np.zeros((len(entrants), len(entrants)), dtype=np.int64)  # points[i, j]: i's points against j
+        self.num_matches, self.num_rounds = 0, 0
+
+    def get_pairings(self) -> list:
+        # Pairs of entrant indices for the next round
+        count = len(self.names)
+        if self.pairing == ROUND_ROBIN:
+            return [(i, j) for i in range(count) for j in range(i + 1, count)]
+        # Swiss: everyone plays the closest rated opponent they have met least, the lowest rated odd one out sits out
+        ratings, _ = bradley_terry(self.wins)
+        order = sorted(range(count), key=lambda i: (-ratings[i], self.rng.random()))
+        games = self.wins + self.wins.T
+        pairings = []
+        while len(order) >= 2:
+            i = order.pop(0)
+            j = min(order, key=lambda j: (games[i, j], abs(ratings[i] - ratings[j])))
+            order.remove(j)
+            pairings.append((i, j))
+        return pairings
+
+    def play_round(self, pool, matches_per_pairing: int):
+        tasks = []
+        for i, j in self.get_pairings():
+            for _ in range(matches_per_pairing):
+                seed = derive_seed(self.seed, self.num_matches + len(tasks))
+                for pair in ((i, j), (j, i)):  # Seat rotation
+                    tasks.append((pair, [self.factories[pair[0]], self.factories[pair[1]]], seed, self.max_num,
+                                  self.score_to_win))
+        for pair, winner, scores in pool.imap_unordered(_play_pairing, tasks):
+            self.wins[pair[winner], pair[1 - winner]] += 1
+            self.points[pair[0], pair[1]] += scores[0]
+            self.points[pair[1], pair[0]] += scores[1]
+        self.num_matches += len(tasks)
+        self.num_rounds += 1
+
+    def run(self, max_rounds: int = 100, matches_per_pairing: int = 4, min_rounds: int = 2) -> list:
+        # Plays rounds until the ranking is settled (after at least min_rounds) or max_rounds. Returns get_standings()
+        with multiprocessing.Pool(self.processes) as pool:
+            for round_number in range(max_rounds):
+                self.play_round(pool, matches_per_pairing)
+                if round_number + 1 >= min_rounds and self.is_settled():
+                    break
+        return self.get_standings()
+
+    def get_ratings(self) -> dict:
+        # name -> (rating, low, high), ratings centred on 1500
+        ratings, errors = bradley_terry(self.wins)
+        return {self.names[i]: (1500 + ratings[i], 1500 + ratings[i] - self.z * errors[i],
+                                1500 + ratings[i] + self.z * errors[i]) for i in range(len(self.names))}
+
+    def get_standings(self) -> list:
+        # (name, rating, low, high) from best to worst
+        ratings = self.get_ratings()
+        return sorted(((name, *ratings[name]) for name in self.names), key=lambda standing: -standing[1])
+
+    def is_settled(self) -> bool:
+        standings = self.get_standings()
+        return all(standings[i][2] > standings[i + 1][3] for i in range(len(standings) - 1))
+
+    def summary(self) -> str:
+        rows = [f"{'name':<20} {'elo':>6} {'interval':>15} {'wins':>6} {'games':>6} {'points/game':>11}"]
+        index = {self.names[i]: i for i in range(len(self.names))}
+        for name, rating, low, high in self.get_standings():
+            i = index[name]
+            games = int(self.wins[i].sum() + self.wins[:, i].sum())
+            points = self.points[i].sum() / games if games != 0 else 0.0
+            rows.append(f"{name:<20} {rating:>6.0f} {f'{low:.0f}..{high:.0f}':>15} {int(self.wins[i].sum()):>6} "
+                        f"{games:>6} {points:>11.1f}")
+        rows.append(f"{self.num_matches} matches in {self.num_rounds} rounds, "
+                    f"{'settled' if self.is_settled() else 'not settled'}")
+        return "\n".join(rows)
+
+
+if __name__ == '__main__':
+    import functools
+
+    from domino import RandomPlayer
+    from mcts_player import MCTSPlayer
+
+    tournament = Tournament({"random": RandomPlayer, "mcts_50": functools.partial(MCTSPlayer, rollouts=50)})
+    tournament.run(max_rounds=20)
+    print(tournament.summary())
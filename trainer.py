@@ -1,12 +1,75 @@
-from domino import Board
+import threading
 
-board = Board()
-model = Model()
+import numpy as np
 
+from domino import Direction, Game
+from domino_tables import get_num_doms
+from encoder import ObservationEncoder
+from inference import InferenceServer, NetworkPlayer
+from model import Model
+from replay_buffer import ReplayBuffer, ReplayRecorder
+from symmetry import augment
 
-def parse_board_state(param: (int, int, int, int, int)):
-    pass
+MAX_NUM = 6
+SCORE_TO_WIN = 150
+NUM_PLAYERS = 4
 
 
-for i in range(100):
-    parse_board_state(board.get_board_state())
+def play_games(server: InferenceServer, encoder: ObservationEncoder, buffer: ReplayBuffer, num_games: int, seed: int):
+    # Plays num_games rounds of self-play in one thread, recording every decision into buffer. Each state gets its own
+    # array, as encoder is shared between threads
+    def encode(game: Game, player_num: int) -> np.ndarray:
+        return encoder.encode_game(game, player_num, encoder.allocate())
+
+    for i in range(num_games):
+        game_seed = seed * num_games + i  # Distinct for every game of every thread, as seed is
+        players = [NetworkPlayer(server, encoder, seed=game_seed * NUM_PLAYERS + seat) for seat in range(NUM_PLAYERS)]
+        game = Game(MAX_NUM, SCORE_TO_WIN, players, seed=game_seed)
+        game.subscribe(ReplayRecorder(buffer, MAX_NUM, encode=encode))
+        game.play_game()
+
+
+def train(iterations: int = 10, threads: int = 16, games_per_thread: int = 4, steps: int = 50, batch_size: int = 256,
+          symmetric: bool = False):
+    # The value head learns each decision's round return (see ReplayRecorder) squashed to -1..1, and the policy the
+    # taken actions weighted by their advantage: that target minus the value predicted before the step.
+    # symmetric adds every allowed arm relabeling of each sampled transition to its batch (see symmetry.augment)
+    encoder = ObservationEncoder(MAX_NUM)
+    model = Model(encoder.size, get_num_doms(MAX_NUM) * len(Direction) + 1, seed=0)
+    buffer = ReplayBuffer(1 << 16, ReplayRecorder.fields((encoder.size,), MAX_NUM, np.float32), seed=0)
+    lock = threading.Lock()
+    for iteration in range(iterations):
+        with InferenceServer(model) as server:
+            workers = [threading.Thread(target=play_games, args=(server, encoder, _LockedBuffer(buffer, lock), games_per_thread,
+                                                                 iteration * threads + t)) for t in range(threads)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        policy_loss, value_loss = float("nan"), float("nan")
+        for _ in range(steps):
+            _, batch = buffer.sample(batch_size)
+            states, masks, actions, returns = batch["state"], batch["mask"], batch["action"], batch["return"]
+            if symmetric:
+                states, masks, actions, rows = augment(states, masks, actions, encoder)
+                returns = returns[rows]
+            targets = np.tanh(returns / 50)
+            advantages = targets - model.predict(states)[1]
+            policy_loss, value_loss = model.train_step(states, masks, actions, targets, weights=advantages)
+        print(f"Iteration {iteration}: {len(buffer)} transitions, policy loss {policy_loss:.3f}, value loss {value_loss:.3f}")
+        print(server.summary())
+    return model
+
+
+class _LockedBuffer:
+    # ReplayBuffer.append from many threads
+    def __init__(self, buffer: ReplayBuffer, lock: threading.Lock):
+        self.buffer, self.lock = buffer, lock
+
+    def append(self, **values):
+        with self.lock:
+            self.buffer.append(**values)
+
+
+if __name__ == '__main__':
+    train()
@@ -0,0 +1,50 @@
+from functools import lru_cache
+
+from domino_tables import get_num_doms
+
+NUM_DIRECTIONS = 4
+MASK_64 = (1 << 64) - 1
+
+# Feature kinds mixed into every key, so the same feature always gets the same key whatever the number of players
+PLAYED, HAND, END, END_DOUBLE, SPINNER, TURN, PILE_SIZE = range(7)
+
+
+def _splitmix64(x: int) -> int:
+    x = (x + 0x9E3779B97F4A7C15) & MASK_64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return x ^ (x >> 31)
+
+
+def _key(kind: int, i: int, j: int = 0) -> int:
+    return _splitmix64((kind << 48) | (i << 24) | j)
+
+
+class ZobristKeys:
+    # Random 64 bit keys for every feature of a position. A position's hash is the XOR of the keys of its features, so
+    # adding or removing a feature is one XOR. Keys are a pure function of the feature, not of max_num or num_players
+    def __init__(self, max_num: int, num_players: int):
+        num_doms = get_num_doms(max_num)
+        self.played = [_key(PLAYED, i) for i in range(num_doms)]
+        self.hands = [[_key(HAND, seat, i) for i in range(num_doms)] for seat in range(num_players)]
+        self.ends = [[_key(END, d, num) for num in range(max_num + 1)] for d in range(NUM_DIRECTIONS)]
+        self.end_doubles = [_key(END_DOUBLE, d) for d in range(NUM_DIRECTIONS)]
+        self.spinner = [_key(SPINNER, num) for num in range(max_num + 1)]
+        self.turn = [_key(TURN, seat) for seat in range(num_players)]
+        self.pile_size = [_key(PILE_SIZE, size) for size in range(num_doms + 1)]
+
+
+@lru_cache(maxsize=None)
+def get_zobrist_keys(max_num: int, num_players: int = 0) -> ZobristKeys:
+    return ZobristKeys(max_num, num_players)
+
+
+def hash_ends(spinner: int, ends: list, end_doubles: list, keys: ZobristKeys) -> int:
+    # Hash of the spinner and arm ends, -1 meaning empty, as stored by CompactBoard
+    output = keys.spinner[spinner] if spinner != -1 else 0
+    for d in range(NUM_DIRECTIONS):
+        if ends[d] != -1:
+            output ^= keys.ends[d][ends[d]]
+            if end_doubles[d]:
+                output ^= keys.end_doubles[d]
+    return output